@@ -9,9 +9,140 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 ADMIN_USER_ID = int(os.getenv("ADMIN_USER_ID", "0"))
 LOG_CHANNEL_ID = os.getenv("LOG_CHANNEL_ID") # Nuevo: Canal para reportes de seguridad
 
+# Modo de Ingesta de Updates ("polling" o "webhook")
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE")  # Opcional: servidor Bot API propio/falso (ej: http://127.0.0.1:8081/bot)
+
+# Webhook (Servidor aiohttp local, normalmente detrás de un proxy TLS)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")                            # URL pública; vacío = no registrar en Telegram
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")                      # Cabecera X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))  # Conexiones simultáneas de Telegram
+WEBHOOK_MAX_PENDING = int(os.getenv("WEBHOOK_MAX_PENDING", "1000"))        # Updates sin procesar antes de rechazar
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "30"))    # Segundos de vaciado al apagar
+
+# Procesamiento Concurrente de Updates (orden estricto dentro de cada chat)
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "32"))   # Updates ejecutándose a la vez
+UPDATE_BACKLOG = int(os.getenv("UPDATE_BACKLOG", "1024"))         # Updates admitidos (en espera + en curso)
+
+# Planificador de Salida (Límites de la Bot API)
+OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", "30"))     # Llamadas/s de toda la cuenta (repartidas entre WORKER_PROCESSES)
+OUTBOUND_GLOBAL_BURST = float(os.getenv("OUTBOUND_GLOBAL_BURST", "30"))
+OUTBOUND_GROUP_RATE = float(os.getenv("OUTBOUND_GROUP_RATE", str(20 / 60)))  # Envíos/s por grupo (20/min)
+OUTBOUND_GROUP_BURST = float(os.getenv("OUTBOUND_GROUP_BURST", "5"))
+OUTBOUND_PRIVATE_RATE = float(os.getenv("OUTBOUND_PRIVATE_RATE", "1"))   # Envíos/s por chat privado
+OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "3"))       # Reintentos tras RetryAfter
+NOTICE_COALESCE_WINDOW = float(os.getenv("NOTICE_COALESCE_WINDOW", "3"))  # Segundos agrupando avisos "BANNED"
+NOTICE_MAX_LINES = int(os.getenv("NOTICE_MAX_LINES", "15"))              # Avisos listados por resumen
+
+# Canal de Logs (Digests agrupados)
+LOG_DIGEST_INTERVAL = float(os.getenv("LOG_DIGEST_INTERVAL", "10"))   # Segundos acumulando eventos
+LOG_DIGEST_MAX_EVENTS = int(os.getenv("LOG_DIGEST_MAX_EVENTS", "25"))  # Más eventos -> documento .txt
+LOG_BUFFER_MAX = int(os.getenv("LOG_BUFFER_MAX", "500"))              # Volcado anticipado por canal
+
+# Purga Masiva (/purge)
+PURGE_MAX_MESSAGES = int(os.getenv("PURGE_MAX_MESSAGES", "5000"))        # Tope por comando
+PURGE_CONCURRENCY = int(os.getenv("PURGE_CONCURRENCY", "4"))             # Lotes de 100 en paralelo
+MESSAGE_TRACKER_PER_CHAT = int(os.getenv("MESSAGE_TRACKER_PER_CHAT", "5000"))  # Ids recordados por chat
+MESSAGE_TRACKER_MAX_CHATS = int(os.getenv("MESSAGE_TRACKER_MAX_CHATS", "2000"))
+
+# Despliegue Multi-Proceso (1 = proceso único)
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "1"))      # Workers; cada chat vive en uno solo
+SHARD_QUEUE_SIZE = int(os.getenv("SHARD_QUEUE_SIZE", "1000"))   # Updates en cola por worker
+
+# Base de Datos (Pool de conexiones persistentes)
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "4"))   # Conexiones de solo lectura
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+WRITE_BUFFER_FLUSH_INTERVAL = float(os.getenv("WRITE_BUFFER_FLUSH_INTERVAL", "1.0")) # Segundos entre volcados
+WRITE_BUFFER_MAX_PENDING = int(os.getenv("WRITE_BUFFER_MAX_PENDING", "200"))         # Volcado anticipado
+
+# Caché de Usuarios (Trust Score en memoria)
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "5000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "600"))                    # Segundos
+USER_CACHE_MAX_BYTES = int(os.getenv("USER_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# Caché de Administradores por Chat (Inmunidad)
+ADMIN_CACHE_TTL = float(os.getenv("ADMIN_CACHE_TTL", "900"))                  # Segundos
+ADMIN_CACHE_MAX_CHATS = int(os.getenv("ADMIN_CACHE_MAX_CHATS", "10000"))
+CHAT_SETTINGS_CACHE_TTL = float(os.getenv("CHAT_SETTINGS_CACHE_TTL", "120"))    # Segundos
+# Anti-Flood (Capa 1)
+FLOOD_MAX_MESSAGES = int(os.getenv("FLOOD_MAX_MESSAGES", "5"))         # Mensajes permitidos por ventana
+FLOOD_WINDOW_SECONDS = float(os.getenv("FLOOD_WINDOW_SECONDS", "3"))   # Tamaño de la ventana
+FLOOD_MAX_KEYS = int(os.getenv("FLOOD_MAX_KEYS", "50000"))             # Tope de pares (chat, usuario) rastreados
+FLOOD_IDLE_TTL = float(os.getenv("FLOOD_IDLE_TTL", "60"))              # Barrido de claves inactivas
+
+# Anti-Raid (Lockdown automático)
+RAID_JOIN_THRESHOLD = int(os.getenv("RAID_JOIN_THRESHOLD", "10"))        # Ingresos...
+RAID_JOIN_WINDOW = float(os.getenv("RAID_JOIN_WINDOW", "60"))            # ...en esta ventana (s)
+RAID_MESSAGE_THRESHOLD = int(os.getenv("RAID_MESSAGE_THRESHOLD", "60"))  # Mensajes (no admins)...
+RAID_MESSAGE_WINDOW = float(os.getenv("RAID_MESSAGE_WINDOW", "10"))      # ...en esta ventana (s)
+RAID_LOCKDOWN_SECONDS = int(os.getenv("RAID_LOCKDOWN_SECONDS", "600"))   # Enfriamiento antes de reabrir
+
+SHARED_STATE_SYNC_INTERVAL = float(os.getenv("SHARED_STATE_SYNC_INTERVAL", "30"))  # Admins/reglas: revisión de versión entre procesos
+
 # Configuración Venice AI
 VENICE_API_KEY = os.getenv("VENICE_API_KEY")
-VENICE_API_BASE = "https://api.venice.ai/api/v1"
+VENICE_API_BASE = os.getenv("VENICE_API_BASE", "https://api.venice.ai/api/v1")  # Sobrescribible (servidor falso local)
+
+# Conexiones HTTP a Venice (Sesión compartida con keep-alive)
+VENICE_POOL_LIMIT = int(os.getenv("VENICE_POOL_LIMIT", "100"))                 # Conexiones totales
+VENICE_POOL_LIMIT_PER_HOST = int(os.getenv("VENICE_POOL_LIMIT_PER_HOST", "20"))
+VENICE_KEEPALIVE_TIMEOUT = float(os.getenv("VENICE_KEEPALIVE_TIMEOUT", "60"))  # Segundos
+VENICE_DNS_CACHE_TTL = int(os.getenv("VENICE_DNS_CACHE_TTL", "300"))
+VENICE_CONNECT_TIMEOUT = float(os.getenv("VENICE_CONNECT_TIMEOUT", "10"))
+VENICE_READ_TIMEOUT = float(os.getenv("VENICE_READ_TIMEOUT", "120"))
+
+# Reintentos Venice (Deadline total por tipo de llamada)
+VENICE_DEADLINE_CLASSIFY = float(os.getenv("VENICE_DEADLINE_CLASSIFY", "8"))   # Moderación: el mensaje espera
+VENICE_DEADLINE_CHAT = float(os.getenv("VENICE_DEADLINE_CHAT", "60"))
+VENICE_DEADLINE_IMAGE = float(os.getenv("VENICE_DEADLINE_IMAGE", "180"))
+VENICE_RETRY_BUDGET_RATIO = float(os.getenv("VENICE_RETRY_BUDGET_RATIO", "0.2"))  # Reintentos por petición
+VENICE_RETRY_BUDGET_MIN = float(os.getenv("VENICE_RETRY_BUDGET_MIN", "0.5"))      # Reintentos/s garantizados
+LIMITER_SHED_CHAT = float(os.getenv("LIMITER_SHED_CHAT", "0.10"))    # Cupo restante bajo el cual se descarta chat
+LIMITER_SHED_IMAGE = float(os.getenv("LIMITER_SHED_IMAGE", "0.25"))  # ...y bajo el cual se descartan imágenes
+LIMITER_MAX_QUEUE = int(os.getenv("LIMITER_MAX_QUEUE", "20"))        # Esperas por modelo antes de descartar
+
+# Caché de Veredictos IA (Texto normalizado -> Clasificación)
+VERDICT_CACHE_MAX_ENTRIES = int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "20000"))
+VERDICT_CACHE_TTL_HIGH = float(os.getenv("VERDICT_CACHE_TTL_HIGH", "86400"))  # 24 h
+VERDICT_CACHE_TTL_MED = float(os.getenv("VERDICT_CACHE_TTL_MED", "21600"))    # 6 h
+VERDICT_CACHE_TTL_LOW = float(os.getenv("VERDICT_CACHE_TTL_LOW", "1800"))     # 30 min
+VERDICT_CACHE_PERSIST = os.getenv("VERDICT_CACHE_PERSIST", "1") == "1"       # Nivel SQLite (sobrevive reinicios)
+
+# Micro-lotes de Clasificación (Varios mensajes por petición)
+VENICE_BATCH_ENABLED = os.getenv("VENICE_BATCH_ENABLED", "1") == "1"
+VENICE_BATCH_WINDOW_MS = int(os.getenv("VENICE_BATCH_WINDOW_MS", "100"))     # Espera máxima para llenar un lote
+VENICE_BATCH_MAX_SIZE = int(os.getenv("VENICE_BATCH_MAX_SIZE", "10"))        # Mensajes por lote
+
+# Revisión IA Asíncrona (Modo "permitir y revisar" por chat)
+AI_REVIEW_WORKERS = int(os.getenv("AI_REVIEW_WORKERS", "8"))                  # Tareas concurrentes
+AI_REVIEW_QUEUE_SIZE = int(os.getenv("AI_REVIEW_QUEUE_SIZE", "500"))          # Llena -> solo regex
+
+# Enrutador de Modelos (Circuit breaker + salud por modelo)
+VENICE_MODEL_POOL = os.getenv("VENICE_MODEL_POOL", "")                    # Lista por comas; vacío = principal + respaldo
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "50"))                     # Muestras móviles por modelo
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "5"))            # Mínimo para p95 / error rate
+ROUTER_SAMPLE_TTL = float(os.getenv("ROUTER_SAMPLE_TTL", "120"))          # Segundos que cuenta una muestra
+ROUTER_FAILURE_THRESHOLD = int(os.getenv("ROUTER_FAILURE_THRESHOLD", "3"))  # Fallos seguidos que abren el circuito
+ROUTER_ERROR_RATE = float(os.getenv("ROUTER_ERROR_RATE", "0.5"))          # Error rate que abre el circuito
+ROUTER_OPEN_SECONDS = float(os.getenv("ROUTER_OPEN_SECONDS", "30"))       # Enfriamiento inicial
+ROUTER_MAX_OPEN_SECONDS = float(os.getenv("ROUTER_MAX_OPEN_SECONDS", "600"))
+ROUTER_HEDGE_ENABLED = os.getenv("ROUTER_HEDGE_ENABLED", "1") == "1"      # Petición de cobertura al pasar el p95
+ROUTER_HEDGE_MIN_DELAY = float(os.getenv("ROUTER_HEDGE_MIN_DELAY", "0.5"))
+ROUTER_HEDGE_CHAT = os.getenv("ROUTER_HEDGE_CHAT", "0") == "1"            # Chat: respuestas largas, duplicar cuesta tokens
+
+# Respuestas en Streaming (Edición progresiva del mensaje)
+CHAT_STREAMING_ENABLED = os.getenv("CHAT_STREAMING_ENABLED", "1") == "1"
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.5"))   # Segundos mínimos entre ediciones
+STREAM_EDIT_MIN_CHARS = int(os.getenv("STREAM_EDIT_MIN_CHARS", "30"))    # Texto nuevo mínimo para editar
+
+# Memoria de Conversación (Chat con Velzar)
+CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "1500"))  # Turnos recientes por conversación
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "250")) # Resumen de turnos viejos
+CONVERSATION_MAX_ACTIVE = int(os.getenv("CONVERSATION_MAX_ACTIVE", "1000"))      # En RAM; el resto en SQLite
+CONVERSATION_TTL = float(os.getenv("CONVERSATION_TTL", "86400"))                 # Inactividad antes de olvidar
 
 # Modelos
 VENICE_IMG_MODEL = "venice-sd35"      # Default Imágenes
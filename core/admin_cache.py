@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from config.settings import ADMIN_CACHE_TTL, ADMIN_CACHE_MAX_CHATS
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATUSES = ("creator", "administrator")
+
+class ChatAdminCache:
+    """
+    Roster de administradores por chat, cargado con una sola llamada a
+    get_chat_administrators y renovado por TTL. Los ChatMemberUpdated lo invalidan
+    al instante, así que verificar inmunidad es una búsqueda en un set en memoria.
+    """
+    def __init__(self, ttl: float = ADMIN_CACHE_TTL, max_chats: int = ADMIN_CACHE_MAX_CHATS):
+        self._rosters = TTLCache(max_entries=max_chats, ttl=ttl)  # {chat_id: frozenset(user_ids)}
+        self._inflight = {}  # {chat_id: Future} -> una sola descarga por chat a la vez
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    async def get_admins(self, chat_id: int, bot):
+        """Devuelve el set de admins del chat, o None si Telegram no lo entregó."""
+        roster = self._rosters.get(chat_id)
+        if roster is not None:
+            return roster
+
+        pending = self._inflight.get(chat_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[chat_id] = future
+        try:
+            roster = await self._fetch(chat_id, bot)
+            future.set_result(roster)
+            return roster
+        finally:
+            self._inflight.pop(chat_id, None)
+            if not future.done():
+                future.set_result(None)
+
+    async def is_admin(self, chat_id: int, user_id: int, bot) -> bool:
+        roster = await self.get_admins(chat_id, bot)
+        if roster is not None:
+            return user_id in roster
+
+        # Sin roster (error de API): verificación individual como antes
+        try:
+            member = await bot.get_chat_member(chat_id, user_id)
+            return member.status in ADMIN_STATUSES
+        except Exception as e:
+            logger.warning(f"Error verificando admin del chat: {e}")
+            return False
+
+    def invalidate(self, chat_id: int):
+        self._rosters.pop(chat_id)
+
+    def handle_member_update(self, chat_member_updated) -> bool:
+        """Invalida el roster si el cambio afecta a un admin. Retorna True si invalidó."""
+        old_status = chat_member_updated.old_chat_member.status
+        new_status = chat_member_updated.new_chat_member.status
+        if old_status == new_status:
+            return False
+        if old_status in ADMIN_STATUSES or new_status in ADMIN_STATUSES:
+            self.invalidate(chat_member_updated.chat.id)
+            return True
+        return False
+
+    def stats(self) -> dict:
+        stats = self._rosters.stats()
+        stats.update({"fetches": self.fetches, "fetch_errors": self.fetch_errors})
+        return stats
+
+    async def _fetch(self, chat_id: int, bot):
+        self.fetches += 1
+        try:
+            admins = await bot.get_chat_administrators(chat_id)
+        except Exception as e:
+            self.fetch_errors += 1
+            logger.warning(f"No se pudo obtener admins del chat {chat_id}: {e}")
+            return None
+
+        roster = frozenset(member.user.id for member in admins)
+        self._rosters.set(chat_id, roster)
+        return roster
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from config.settings import (
+    CONVERSATION_TOKEN_BUDGET, CONVERSATION_SUMMARY_TOKENS, CONVERSATION_MAX_ACTIVE, CONVERSATION_TTL
+)
+from services.database_service import save_conversation, load_conversation, purge_conversations
+
+logger = logging.getLogger(__name__)
+
+def estimate_tokens(text: str) -> int:
+    """Aproximación barata (~4 caracteres por token + sobrecosto por mensaje)."""
+    return len(text) // 4 + 4
+
+class Conversation:
+    __slots__ = ("summary", "turns", "tokens", "updated", "compacting")
+
+    def __init__(self, summary: str = "", turns=(), updated: float = None):
+        self.summary = summary or ""
+        self.turns = deque()  # (role, content, tokens)
+        self.tokens = 0
+        self.updated = updated or time.time()
+        self.compacting = False
+        for role, content in turns:
+            self.append(role, content)
+
+    def append(self, role: str, content: str):
+        tokens = estimate_tokens(content)
+        self.turns.append((role, content, tokens))
+        self.tokens += tokens
+
+    def pop_oldest(self):
+        role, content, tokens = self.turns.popleft()
+        self.tokens -= tokens
+        return role, content
+
+class ConversationMemory:
+    """
+    Historial por (chat_id, user_id) para el chat con Velzar.
+    - Cada conversación guarda los turnos recientes dentro de un presupuesto de tokens;
+      al excederlo, los turnos más viejos se resumen (prompt de tamaño acotado).
+    - Como máximo `max_active` conversaciones en RAM; las frías (LRU) se desalojan a SQLite.
+    - Conversaciones inactivas más de `ttl` segundos se olvidan.
+    """
+    def __init__(self, venice, token_budget: int = CONVERSATION_TOKEN_BUDGET,
+                 summary_tokens: int = CONVERSATION_SUMMARY_TOKENS,
+                 max_active: int = CONVERSATION_MAX_ACTIVE, ttl: float = CONVERSATION_TTL):
+        self.venice = venice
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.max_active = max_active
+        self.ttl = ttl
+        self._active = OrderedDict()  # {(chat_id, user_id): Conversation} en orden de último uso
+        self._tasks = set()
+
+        # Métricas
+        self.loads = 0
+        self.spills = 0
+        self.summaries = 0
+        self.summary_failures = 0
+
+    async def start(self):
+        try:
+            removed = await purge_conversations(time.time() - self.ttl)
+            if removed:
+                logger.info(f"💬 {removed} conversaciones inactivas eliminadas.")
+        except Exception as e:
+            logger.warning(f"Error purgando conversaciones: {e}")
+
+    async def build_prompt(self, chat_id: int, user_id: int, text: str) -> list:
+        """Mensajes para el modelo: resumen previo + turnos recientes + mensaje nuevo."""
+        conversation = await self._get(chat_id, user_id)
+        messages = []
+        if conversation.summary:
+            messages.append({"role": "system", "content": f"Resumen de la conversación previa con este usuario: {conversation.summary}"})
+        messages += [{"role": role, "content": content} for role, content, _ in conversation.turns]
+        messages.append({"role": "user", "content": text})
+        return messages
+
+    async def record(self, chat_id: int, user_id: int, user_text: str, reply: str):
+        """Guarda el intercambio y, si se pasó del presupuesto, resume en segundo plano."""
+        key = (chat_id, user_id)
+        conversation = await self._get(chat_id, user_id)
+        conversation.append("user", user_text)
+        conversation.append("assistant", reply)
+        conversation.updated = time.time()
+
+        if conversation.tokens > self.token_budget and not conversation.compacting:
+            conversation.compacting = True
+            task = asyncio.create_task(self._compact(key, conversation))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _get(self, chat_id: int, user_id: int) -> Conversation:
+        key = (chat_id, user_id)
+        conversation = self._active.get(key)
+        if conversation is not None:
+            self._active.move_to_end(key)
+            if time.time() - conversation.updated <= self.ttl:
+                return conversation
+
+        conversation = None
+        try:
+            row = await load_conversation(chat_id, user_id)
+        except Exception as e:
+            logger.warning(f"Error cargando conversación: {e}")
+            row = None
+        if row and time.time() - row["updated_at"] <= self.ttl:
+            conversation = Conversation(row["summary"], json.loads(row["turns"]), row["updated_at"])
+            self.loads += 1
+
+        conversation = conversation or Conversation()
+        self._active[key] = conversation
+        self._active.move_to_end(key)
+        await self._enforce_cap()
+        return conversation
+
+    async def _compact(self, key, conversation: Conversation):
+        """Mueve los turnos más viejos al resumen hasta quedar en la mitad del presupuesto."""
+        try:
+            evicted = []
+            # Los turnos salen en pares (usuario + respuesta) para no dejar respuestas huérfanas
+            while conversation.tokens > self.token_budget // 2 and len(conversation.turns) > 2:
+                evicted.append(conversation.pop_oldest())
+                evicted.append(conversation.pop_oldest())
+
+            summary = await self.venice.summarize_conversation(
+                conversation.summary, evicted, max_tokens=self.summary_tokens
+            )
+            if summary:
+                # Tope duro: el resumen nunca crece más allá de su presupuesto
+                conversation.summary = summary[:self.summary_tokens * 4]
+                self.summaries += 1
+            else:
+                # Sin resumen (IA caída): los turnos viejos se descartan, se conserva el resumen anterior
+                self.summary_failures += 1
+        except Exception as e:
+            self.summary_failures += 1
+            logger.warning(f"Error resumiendo conversación: {e}")
+        finally:
+            conversation.compacting = False
+
+        if key not in self._active:
+            # Se desalojó mientras se resumía: persistir el resumen nuevo
+            await self._spill(key, conversation)
+
+    async def _enforce_cap(self):
+        while len(self._active) > self.max_active:
+            key, conversation = self._active.popitem(last=False)
+            await self._spill(key, conversation)
+
+    async def _spill(self, key, conversation: Conversation):
+        turns = json.dumps([(role, content) for role, content, _ in conversation.turns], ensure_ascii=False)
+        try:
+            await save_conversation(key[0], key[1], conversation.summary, turns, conversation.updated)
+            self.spills += 1
+        except Exception as e:
+            logger.warning(f"Error guardando conversación: {e}")
+
+    async def close(self):
+        """Espera los resúmenes en curso y persiste todas las conversaciones en RAM."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        while self._active:
+            key, conversation = self._active.popitem(last=False)
+            await self._spill(key, conversation)
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._active),
+            "max_active": self.max_active,
+            "loads": self.loads,
+            "spills": self.spills,
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+        }
@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict, deque
+from config.settings import (
+    FLOOD_MAX_MESSAGES, FLOOD_WINDOW_SECONDS, FLOOD_MAX_KEYS, FLOOD_IDLE_TTL
+)
+
+class FloodDetector:
+    """
+    Ventana deslizante por (chat_id, user_id) con buffers circulares de tamaño fijo.
+    - Memoria acotada: como máximo `max_keys` claves (se descartan las menos recientes).
+    - Las claves inactivas se barren periódicamente.
+    - Umbral configurable por chat (mensajes / segundos).
+    """
+    def __init__(self, max_messages: int = FLOOD_MAX_MESSAGES, window: float = FLOOD_WINDOW_SECONDS,
+                 max_keys: int = FLOOD_MAX_KEYS, idle_ttl: float = FLOOD_IDLE_TTL):
+        self.max_messages = max_messages
+        self.window = window
+        self.max_keys = max_keys
+        self.idle_ttl = idle_ttl
+        self._rings = OrderedDict()  # {(chat_id, user_id): deque(timestamps)} en orden de último uso
+        self._last_sweep = time.monotonic()
+
+        # Métricas
+        self.evictions = 0
+        self.sweeps = 0
+
+    def hit(self, chat_id: int, user_id: int, max_messages: int = None, window: float = None) -> bool:
+        """Registra un mensaje. Retorna True si supera `max_messages` dentro de `window` segundos."""
+        max_messages = max_messages or self.max_messages
+        window = window or self.window
+        now = time.monotonic()
+        key = (chat_id, user_id)
+
+        ring = self._rings.get(key)
+        if ring is None or ring.maxlen != max_messages + 1:
+            # Nuevo usuario o el chat cambió su umbral: (re)dimensionar el buffer
+            ring = deque(ring or (), maxlen=max_messages + 1)
+            self._rings[key] = ring
+        # Reasignar una clave existente no la mueve: el orden de uso se actualiza siempre
+        self._rings.move_to_end(key)
+        ring.append(now)
+
+        while len(self._rings) > self.max_keys:
+            self._rings.popitem(last=False)
+            self.evictions += 1
+
+        if now - self._last_sweep >= self.idle_ttl:
+            self.sweep(now)
+
+        # Buffer lleno y el mensaje más viejo aún dentro de la ventana -> flood
+        return len(ring) > max_messages and now - ring[0] < window
+
+    def sweep(self, now: float = None) -> int:
+        """Elimina claves sin actividad en `idle_ttl` segundos. Retorna cuántas se borraron."""
+        now = now or time.monotonic()
+        removed = 0
+        # El OrderedDict está ordenado por último uso: basta recorrer desde el frente
+        while self._rings:
+            key, ring = next(iter(self._rings.items()))
+            if now - ring[-1] < self.idle_ttl:
+                break
+            del self._rings[key]
+            removed += 1
+        self._last_sweep = now
+        self.sweeps += 1
+        return removed
+
+    def forget(self, chat_id: int, user_id: int):
+        self._rings.pop((chat_id, user_id), None)
+
+    def stats(self) -> dict:
+        return {
+            "tracked_keys": len(self._rings),
+            "max_keys": self.max_keys,
+            "evictions": self.evictions,
+            "sweeps": self.sweeps,
+        }
@@ -1,14 +1,21 @@
 import logging
 import asyncio
+import time
 from telegram import Update, ChatPermissions
 from telegram.ext import ContextTypes
 from services.database_service import (
-    add_ban_log, update_chat_log_channel, update_welcome_message
+    add_ban_log, update_chat_log_channel, update_welcome_message, update_ai_review_mode,
+    update_flood_settings, get_chat_rules
 )
-from config.settings import ADMIN_USER_ID
+from core.rule_engine import RULE_ACTIONS, validate_pattern
+from core.message_tracker import message_tracker
+from config.settings import ADMIN_USER_ID, PURGE_MAX_MESSAGES, PURGE_CONCURRENCY
 
 logger = logging.getLogger(__name__)
 
+DELETE_BATCH_SIZE = 100  # Máximo de ids por llamada a deleteMessages
+PURGE_STATUS_TTL = 3     # Segundos que el resumen de /purge queda visible
+
 # --- UTILIDADES ---
 
 async def _get_target_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -32,12 +39,41 @@ async def _check_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bo
     if user.id == int(ADMIN_USER_ID):
         return True
 
+    security_service = context.bot_data.get("security")
+    if security_service:
+        return await security_service.admin_cache.is_admin(chat.id, user.id, context.bot)
+
     try:
         member = await chat.get_chat_member(user.id)
         return member.status in ["creator", "administrator"]
     except Exception:
         return False
 
+def _is_bot_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Dueño del bot o admin autorizado (no basta con administrar el chat)."""
+    user_id = update.effective_user.id
+    if user_id == int(ADMIN_USER_ID):
+        return True
+    security_service = context.bot_data.get("security")
+    return bool(security_service) and user_id in security_service.authorized_admins
+
+async def _check_rule_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Las reglas regex corren en el bucle de eventos compartido por todos los chats: solo admins del bot."""
+    if _is_bot_admin(update, context):
+        return True
+    await update.message.reply_text("⛔ Solo los administradores de Velzar pueden gestionar reglas regex.")
+    return False
+
+async def chat_member_update_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Invalida el roster de admins en caché cuando cambia un miembro del chat."""
+    member_update = update.chat_member or update.my_chat_member
+    security_service = context.bot_data.get("security")
+    if not member_update or not security_service:
+        return
+
+    if security_service.admin_cache.handle_member_update(member_update):
+        logger.info(f"👮 Roster de admins invalidado en chat {member_update.chat.id}")
+
 # --- COMANDOS PUNITIVOS ---
 
 async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -75,33 +111,91 @@ async def mute_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.error(f"Error muting user: {e}")
         await update.message.reply_text("❌ No se pudo mutear al usuario.")
 
+def _purge_targets(chat_id: int, before_id: int, count: int) -> list:
+    """
+    Ids a borrar (más nuevos primero): primero los que el bot vio en el chat (sin huecos);
+    si no alcanzan, se completa con el rango anterior al historial conocido.
+    """
+    if count < 1:
+        return []
+    ids = message_tracker.recent(chat_id, before_id, count)
+    if len(ids) < count:
+        floor = min(ids) if ids else before_id
+        oldest = message_tracker.oldest_seen(chat_id)
+        if oldest is not None:
+            floor = min(floor, oldest)
+        # Los ya borrados (p. ej. por la capa de seguridad) no se vuelven a pedir ni a contar
+        deleted = message_tracker.deleted(chat_id)
+        candidate = floor - 1
+        while len(ids) < count and candidate > 0:
+            if candidate not in deleted:
+                ids.append(candidate)
+            candidate -= 1
+    return ids
+
 async def purge_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await _check_admin(update, context):
         return
 
+    chat_id = update.effective_chat.id
     try:
-        count = int(context.args[0]) if context.args else 10
-        message_id = update.message.message_id
-
-        await update.message.delete()
+        count = min(int(context.args[0]) if context.args else 10, PURGE_MAX_MESSAGES)
+    except ValueError:
+        count = 0
+    if count < 1:
+        await update.message.reply_text("Uso: /purge <cantidad>")
+        return
 
-        deleted_count = 0
-        current_id = message_id - 1
-        for _ in range(count):
-            try:
-                await context.bot.delete_message(update.effective_chat.id, current_id)
-                deleted_count += 1
-            except Exception:
-                pass
-            current_id -= 1
+    message_id = update.message.message_id
+    targets = _purge_targets(chat_id, message_id, count)
+    # El propio comando va en el primer lote
+    batches = [[message_id] + targets[:DELETE_BATCH_SIZE - 1]]
+    batches += [targets[i:i + DELETE_BATCH_SIZE] for i in range(DELETE_BATCH_SIZE - 1, len(targets), DELETE_BATCH_SIZE)]
 
-        msg = await context.bot.send_message(update.effective_chat.id, f"🗑️ Se barrieron {deleted_count} mensajes.")
-        await asyncio.sleep(3)
-        await msg.delete()
+    status = await context.bot.send_message(chat_id, f"🧹 Purgando {len(targets)} mensajes...")
+    semaphore = asyncio.Semaphore(PURGE_CONCURRENCY)
+    progress = {"done": 0, "requested": 0, "failed": 0, "last_edit": time.monotonic()}
 
+    async def _delete_batch(batch):
+        async with semaphore:
+            try:
+                await context.bot.delete_messages(chat_id, batch)
+                # deleteMessages retorna True aunque omita ids inexistentes: se cuentan como solicitados
+                progress["requested"] += len(batch) - (message_id in batch)  # El comando no cuenta
+                message_tracker.discard(chat_id, batch)
+            except Exception as e:
+                progress["failed"] += len(batch) - (message_id in batch)
+                logger.warning(f"Purge: lote de {len(batch)} ids falló en chat {chat_id}: {e}")
+            progress["done"] += 1
+
+            # Progreso real (editado como máximo una vez por segundo)
+            now = time.monotonic()
+            if progress["done"] < len(batches) and now - progress["last_edit"] >= 1:
+                progress["last_edit"] = now
+                try:
+                    await status.edit_text(f"🧹 Purgando... lote {progress['done']}/{len(batches)}")
+                except Exception:
+                    pass
+
+    started = time.monotonic()
+    await asyncio.gather(*(_delete_batch(batch) for batch in batches))
+    elapsed = time.monotonic() - started
+
+    summary = f"🗑️ Se solicitó borrar {progress['requested']} mensajes en {elapsed:.1f}s."
+    if progress["failed"]:
+        summary += f"\n⚠️ {progress['failed']} ids no se pudieron borrar (antiguos o sin permisos)."
+    try:
+        await status.edit_text(summary)
     except Exception as e:
         logger.error(f"Error purging messages: {e}")
-        await context.bot.send_message(update.effective_chat.id, "❌ Error al purgar mensajes.")
+    # Borrar el resumen luego, fuera del handler: esperar aquí retendría el turno del chat
+    context.job_queue.run_once(_delete_status_job, PURGE_STATUS_TTL, data=status, chat_id=chat_id)
+
+async def _delete_status_job(context: ContextTypes.DEFAULT_TYPE):
+    try:
+        await context.job.data.delete()
+    except Exception as e:
+        logger.warning(f"No se pudo borrar el resumen de /purge: {e}")
 
 # --- COMANDOS DE CONFIGURACIÓN ---
 
@@ -138,6 +232,113 @@ async def setwelcome_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await update_welcome_message(update.effective_chat.id, welcome_text, enabled=True)
     await update.message.reply_text("✅ Mensaje de bienvenida actualizado.")
 
+async def aimode_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Cambia el modo de la Capa 4: 'sync' (bloquea hasta el veredicto) o 'async' (permitir y revisar)."""
+    if not await _check_admin(update, context):
+        return
+
+    mode = context.args[0].lower() if context.args else ""
+    if mode not in ("sync", "async"):
+        await update.message.reply_text("Uso: /aimode <sync|async>")
+        return
+
+    await update_ai_review_mode(update.effective_chat.id, mode == "async")
+    if mode == "async":
+        await update.message.reply_text("✅ Modo IA: **Permitir y revisar**. Los mensajes se auditan en segundo plano.", parse_mode="Markdown")
+    else:
+        await update.message.reply_text("✅ Modo IA: **Bloqueante**. Cada mensaje espera el veredicto.", parse_mode="Markdown")
+
+async def setflood_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/setflood <mensajes> <segundos>"""
+    if not await _check_admin(update, context):
+        return
+
+    try:
+        limit = int(context.args[0])
+        window = float(context.args[1])
+        if not (1 <= limit <= 100) or not (0.5 <= window <= 600):
+            raise ValueError
+    except (IndexError, ValueError):
+        await update.message.reply_text("Uso: /setflood <mensajes 1-100> <segundos 0.5-600> (Ej: /setflood 5 3)")
+        return
+
+    await update_flood_settings(update.effective_chat.id, limit, window)
+    await update.message.reply_text(f"✅ Anti-Flood: máximo {limit} mensajes cada {window:g}s.")
+
+# --- REGLAS PERSONALIZADAS (Capa 2) ---
+
+async def addrule_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/addrule <ban|mute|delete> [prioridad] <patrón regex>"""
+    if not await _check_admin(update, context):
+        return
+
+    if not await _check_rule_admin(update, context):
+        return
+
+    security_service = context.bot_data.get("security")
+    if not security_service:
+        return
+
+    usage = "Uso: /addrule <ban|mute|delete> [prioridad] <patrón>\nEj: /addrule delete 50 gana\\s+dinero"
+    if len(context.args) < 2 or context.args[0].lower() not in RULE_ACTIONS:
+        await update.message.reply_text(usage)
+        return
+
+    # Reconstruir el patrón desde el texto original para conservar espacios
+    action = context.args[0].lower()
+    has_priority = context.args[1].isdigit() and len(context.args) > 2
+    priority = int(context.args[1]) if has_priority else 100
+    parts = update.message.text.split(None, 3 if has_priority else 2)
+    pattern = parts[-1].strip()
+
+    error = validate_pattern(pattern)
+    if error:
+        await update.message.reply_text(f"❌ Patrón inválido: {error}")
+        return
+
+    rule_id = await security_service.rules.add_rule(
+        update.effective_chat.id, pattern, action, priority, update.effective_user.id
+    )
+    await update.message.reply_text(f"✅ Regla #{rule_id} activa ({action}, prioridad {priority}).")
+
+async def delrule_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/delrule <id>"""
+    if not await _check_admin(update, context):
+        return
+
+    if not await _check_rule_admin(update, context):
+        return
+
+    security_service = context.bot_data.get("security")
+    if not security_service:
+        return
+
+    if not context.args or not context.args[0].lstrip("#").isdigit():
+        await update.message.reply_text("Uso: /delrule <id>")
+        return
+
+    rule_id = int(context.args[0].lstrip("#"))
+    if await security_service.rules.remove_rule(update.effective_chat.id, rule_id):
+        await update.message.reply_text(f"🗑️ Regla #{rule_id} eliminada.")
+    else:
+        await update.message.reply_text("❌ No existe esa regla en este chat.")
+
+async def rules_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Lista las reglas personalizadas del chat."""
+    if not await _check_admin(update, context):
+        return
+
+    rows = await get_chat_rules(update.effective_chat.id, only_enabled=False)
+    if not rows:
+        await update.message.reply_text("📜 Este chat solo usa el pack de reglas por defecto.")
+        return
+
+    lines = ["📜 Reglas personalizadas:"]
+    for row in rows:
+        status = "" if row["enabled"] else " (off)"
+        lines.append(f"#{row['id']} [{row['action']}, p{row['priority']}]{status}: {row['pattern']}")
+    await update.message.reply_text("\n".join(lines))
+
 # --- COMANDOS DE AUDITORÍA ---
 
 async def check_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
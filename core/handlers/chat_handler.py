@@ -1,10 +1,74 @@
 import logging
+import time
 from telegram import Update, MessageEntity
 from telegram.ext import ContextTypes
 from telegram.constants import ChatType
+from services.venice_limiter import VeniceBusyError
+from config.settings import CHAT_STREAMING_ENABLED, STREAM_EDIT_INTERVAL, STREAM_EDIT_MIN_CHARS
 
 logger = logging.getLogger(__name__)
 
+MESSAGE_LIMIT = 4096  # Límite de caracteres de un mensaje de Telegram
+CURSOR = " ▌"
+BUSY_TEXT = "⏳ Velzar está ocupado protegiendo grupos. Inténtalo de nuevo en un momento."
+
+async def _send_markdown(send, text: str):
+    """Envía/edita con Markdown y, si el formato está roto, en texto plano."""
+    try:
+        # Intentar Markdown primero (V1 es más permisivo que V2)
+        return await send(text, parse_mode="Markdown")
+    except Exception as e:
+        if "not modified" in str(e).lower():
+            return None
+        # Fallback a texto plano si el Markdown está roto
+        logger.warning(f"Error enviando Markdown: {e}. Enviando texto plano.")
+        try:
+            return await send(text)
+        except Exception as e:
+            if "not modified" not in str(e).lower():
+                raise
+
+async def _stream_reply(update: Update, venice, message_history) -> str:
+    """
+    Publica un mensaje provisional y lo edita a medida que llegan fragmentos del modelo.
+    Ediciones en texto plano y espaciadas (límite de ediciones de Telegram); la versión final va con Markdown.
+    """
+    placeholder = await update.message.reply_text("💭 ...")
+    text = ""
+    shown = ""
+    last_edit = time.monotonic()
+
+    try:
+        async for delta in venice.stream_chat_reply(message_history):
+            text += delta
+            now = time.monotonic()
+            if now - last_edit >= STREAM_EDIT_INTERVAL and len(text) - len(shown) >= STREAM_EDIT_MIN_CHARS:
+                shown = text
+                last_edit = now
+                preview = text[:MESSAGE_LIMIT - len(CURSOR)] + CURSOR
+                try:
+                    await placeholder.edit_text(preview)
+                except Exception as e:
+                    logger.debug(f"Edición progresiva omitida: {e}")
+    except VeniceBusyError:
+        # Cupo de Venice reservado para moderación: avisar en lugar de quedarse en "..."
+        await _send_markdown(placeholder.edit_text, BUSY_TEXT)
+        return None
+
+    if not text.strip():
+        try:
+            await placeholder.delete()
+        except Exception:
+            pass
+        return None
+
+    # Versión final: primer bloque en el mensaje provisional, el resto como respuestas nuevas
+    chunks = [text[i:i + MESSAGE_LIMIT] for i in range(0, len(text), MESSAGE_LIMIT)]
+    await _send_markdown(placeholder.edit_text, chunks[0])
+    for chunk in chunks[1:]:
+        await _send_markdown(update.message.reply_text, chunk)
+    return text
+
 async def chat_reply_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Maneja la interacción de chat (Conversación).
@@ -52,7 +116,12 @@ async def chat_reply_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
 
     # --- Generar Respuesta ---
+    # En segundo plano: la respuesta del modelo puede tardar hasta el deadline de CHAT_POLICY
+    # y el handler retiene el turno del chat (los mensajes siguientes esperan su chequeo de seguridad)
+    context.application.create_task(_generate_reply(update, context, text), update=update)
 
+async def _generate_reply(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
+    """Genera la respuesta del modelo, la envía y la registra en la memoria de conversación."""
     # Notificar "Escribiendo..."
     await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
 
@@ -61,16 +130,25 @@ async def chat_reply_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         logger.error("Security Service not initialized in bot_data")
         return
 
-    # Historial de mensajes (Por ahora simple: solo el último mensaje)
-    message_history = [{"role": "user", "content": text}]
+    # Historial de la conversación (resumen + turnos recientes, tamaño acotado)
+    memory = context.bot_data.get("conversations")
+    user_id = update.effective_user.id
+    if memory:
+        message_history = await memory.build_prompt(update.effective_chat.id, user_id, text)
+    else:
+        message_history = [{"role": "user", "content": text}]
 
-    response_text = await security_service.venice.generate_chat_reply(message_history)
-
-    if response_text:
+    if CHAT_STREAMING_ENABLED:
+        # El usuario ve el primer fragmento en lugar de esperar la respuesta completa
+        response_text = await _stream_reply(update, security_service.venice, message_history)
+    else:
         try:
-            # Intentar Markdown primero (V1 es más permisivo que V2)
-            await update.message.reply_text(response_text, parse_mode="Markdown")
-        except Exception as e:
-            # Fallback a texto plano si el Markdown está roto
-            logger.warning(f"Error enviando Markdown: {e}. Enviando texto plano.")
-            await update.message.reply_text(response_text)
+            response_text = await security_service.venice.generate_chat_reply(message_history)
+        except VeniceBusyError:
+            await update.message.reply_text(BUSY_TEXT)
+            return
+        if response_text:
+            await _send_markdown(update.message.reply_text, response_text)
+
+    if response_text and memory:
+        await memory.record(update.effective_chat.id, user_id, text, response_text)
@@ -18,8 +18,13 @@ async def start_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # 1. LÓGICA DE GRUPO
     if chat.type != "private":
         # Solo responder si es admin
-        member = await chat.get_chat_member(user.id)
-        if member.status in ["creator", "administrator"]:
+        security_service = context.bot_data.get("security")
+        if security_service:
+            is_admin = await security_service.admin_cache.is_admin(chat.id, user.id, context.bot)
+        else:
+            member = await chat.get_chat_member(user.id)
+            is_admin = member.status in ["creator", "administrator"]
+        if is_admin:
             await update.message.reply_text("🛡️ **Velzar Active.** System Monitor: ON", parse_mode="Markdown")
         return
 
@@ -55,7 +60,7 @@ async def menu_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
     user = query.from_user
 
     if data == "my_tools":
-        # Obtener datos frescos
+        # Mismo registro en caché que usa el motor de seguridad (write-through)
         db_user = await get_or_create_user(user.id, user.username)
         trust_score = db_user["trust_score"]
         credits = db_user["credits"]
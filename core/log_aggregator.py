@@ -0,0 +1,144 @@
+import asyncio
+import io
+import logging
+import re
+import time
+from collections import Counter
+from telegram import InputFile
+from telegram.error import BadRequest
+from config.settings import (
+    LOG_DIGEST_INTERVAL, LOG_DIGEST_MAX_EVENTS, LOG_BUFFER_MAX
+)
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_NORMAL = "normal"
+SEVERITY_HIGH = "high"       # Se entrega al instante (ej: Lockdown)
+
+MESSAGE_LIMIT = 4096         # Límite de texto de un mensaje de Telegram
+
+class LogAggregator:
+    """
+    Entrega de logs de moderación agrupada por canal.
+    - Eventos normales: se acumulan y se envían como un digest cada `interval` segundos.
+    - Lotes grandes (más de `max_events` o más largos que un mensaje): se envían como documento .txt.
+    - Buffer lleno (`max_buffer`): volcado anticipado.
+    - Severidad alta: envío inmediato.
+    """
+    def __init__(self, interval: float = LOG_DIGEST_INTERVAL, max_events: int = LOG_DIGEST_MAX_EVENTS,
+                 max_buffer: int = LOG_BUFFER_MAX):
+        self.interval = interval
+        self.max_events = max_events
+        self.max_buffer = max_buffer
+        self._buffers = {}     # channel_id -> [(action, línea)]
+        self._tasks = {}       # channel_id -> temporizador del digest
+        self._inflight = set() # Envíos en curso (se esperan al apagar)
+
+        # Métricas
+        self.events = 0
+        self.digests = 0
+        self.documents = 0
+        self.immediate = 0
+        self.failures = 0
+
+    def log(self, bot, channel_id: int, action: str, line: str, severity: str = SEVERITY_NORMAL):
+        self.events += 1
+        if severity == SEVERITY_HIGH:
+            self.immediate += 1
+            self._spawn(self._send_text(bot, channel_id, line))
+            return
+
+        buffer = self._buffers.setdefault(channel_id, [])
+        buffer.append((action, line))
+        if len(buffer) >= self.max_buffer:
+            self._cancel_timer(channel_id)
+            self._spawn(self.flush(bot, channel_id))
+        elif channel_id not in self._tasks:
+            self._tasks[channel_id] = self._spawn(self._flush_later(bot, channel_id))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+        return task
+
+    async def _flush_later(self, bot, channel_id: int):
+        await asyncio.sleep(self.interval)
+        self._tasks.pop(channel_id, None)
+        await self.flush(bot, channel_id)
+
+    def _cancel_timer(self, channel_id: int):
+        task = self._tasks.pop(channel_id, None)
+        if task:
+            task.cancel()
+
+    async def flush(self, bot, channel_id: int):
+        events = self._buffers.pop(channel_id, [])
+        if not events:
+            return
+
+        if len(events) == 1:
+            await self._send_text(bot, channel_id, events[0][1])
+            return
+
+        header = f"📋 **Digest Velzar** | {len(events)} eventos | {_summary(events)}"
+        text = header + "\n\n" + "\n".join(line for _, line in events)
+        if len(events) <= self.max_events and len(text) <= MESSAGE_LIMIT:
+            if await self._send_text(bot, channel_id, text):
+                self.digests += 1
+            return
+
+        # Lote grande: un solo documento en vez de varios mensajes
+        content = "\n".join(_plain(line) for _, line in events).encode("utf-8")
+        filename = f"velzar_log_{time.strftime('%Y%m%d_%H%M%S')}.txt"
+        try:
+            try:
+                await bot.send_document(channel_id, InputFile(io.BytesIO(content), filename=filename),
+                                        caption=header, parse_mode="Markdown")
+            except BadRequest:
+                await bot.send_document(channel_id, InputFile(io.BytesIO(content), filename=filename), caption=header)
+            self.documents += 1
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"No se pudo enviar log al canal {channel_id}: {e}")
+
+    async def flush_all(self, bot):
+        """Vacía todos los buffers y espera los envíos en curso (apagado)."""
+        for channel_id in list(self._tasks):
+            self._cancel_timer(channel_id)
+        for channel_id in list(self._buffers):
+            await self.flush(bot, channel_id)
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def _send_text(self, bot, channel_id: int, text: str) -> bool:
+        try:
+            try:
+                await bot.send_message(channel_id, text, parse_mode="Markdown")
+            except BadRequest as e:
+                # Markdown roto: el lote se entrega en texto plano en vez de perderse
+                logger.warning(f"Log con Markdown inválido ({e}). Enviando texto plano.")
+                await bot.send_message(channel_id, text)
+            return True
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"No se pudo enviar log al canal {channel_id}: {e}")
+            return False
+
+    def stats(self) -> dict:
+        return {
+            "events": self.events,
+            "digests": self.digests,
+            "documents": self.documents,
+            "immediate": self.immediate,
+            "failures": self.failures,
+            "buffered": sum(len(b) for b in self._buffers.values()),
+        }
+
+def _summary(events: list) -> str:
+    counts = Counter(action for action, _ in events)
+    return " ".join(f"#{action.upper()}×{count}" for action, count in counts.most_common())
+
+def _plain(line: str) -> str:
+    """Línea sin marcas de Markdown (para el documento .txt)."""
+    return re.sub(r"\\([_*`\[])", r"\1", line.replace("**", "")).replace("`", "")
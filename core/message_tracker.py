@@ -0,0 +1,86 @@
+import time
+from collections import OrderedDict, deque
+from config.settings import MESSAGE_TRACKER_PER_CHAT, MESSAGE_TRACKER_MAX_CHATS
+
+# Telegram solo permite a los bots borrar mensajes de grupo con menos de 48 horas
+DELETABLE_AGE = 48 * 3600
+
+class MessageTracker:
+    """
+    Registro de los message_id que el bot realmente vio por chat (entrantes y propios).
+    Permite a /purge borrar ids existentes en lugar de barrer rangos con huecos.
+    - Buffer circular por chat (`per_chat` ids) y como máximo `max_chats` chats (LRU).
+    - Los ids con más de 48 h se ignoran: Telegram ya no deja borrarlos.
+    """
+    def __init__(self, per_chat: int = MESSAGE_TRACKER_PER_CHAT, max_chats: int = MESSAGE_TRACKER_MAX_CHATS):
+        self.per_chat = per_chat
+        self.max_chats = max_chats
+        self._chats = OrderedDict()  # {chat_id: deque((message_id, timestamp))} en orden de último uso
+        self._deleted = {}           # {chat_id: deque(message_id)} borrados ya (por seguridad, purge, etc.)
+
+        # Métricas
+        self.recorded = 0
+        self.evictions = 0
+
+    def record(self, chat_id: int, message_id: int):
+        ring = self._chats.get(chat_id)
+        if ring is None:
+            ring = self._chats[chat_id] = deque(maxlen=self.per_chat)
+            while len(self._chats) > self.max_chats:
+                evicted, _ = self._chats.popitem(last=False)
+                self._deleted.pop(evicted, None)
+                self.evictions += 1
+        else:
+            self._chats.move_to_end(chat_id)
+        ring.append((message_id, time.time()))
+        self.recorded += 1
+
+    def record_result(self, result):
+        """Registra un mensaje enviado por el bot a partir de la respuesta cruda de la Bot API."""
+        if isinstance(result, dict) and "message_id" in result and isinstance(result.get("chat"), dict):
+            self.record(result["chat"]["id"], result["message_id"])
+
+    def recent(self, chat_id: int, before_id: int, count: int) -> list:
+        """Hasta `count` ids vistos anteriores a `before_id` (más nuevos primero) y aún borrables."""
+        ring = self._chats.get(chat_id)
+        if not ring:
+            return []
+        oldest = time.time() - DELETABLE_AGE
+        ids = set()
+        for message_id, timestamp in reversed(ring):
+            if timestamp < oldest:
+                break
+            if message_id < before_id:
+                ids.add(message_id)
+        return sorted(ids, reverse=True)[:count]
+
+    def oldest_seen(self, chat_id: int):
+        ring = self._chats.get(chat_id)
+        return min(message_id for message_id, _ in ring) if ring else None
+
+    def discard(self, chat_id: int, message_ids):
+        """Olvida ids ya borrados y los recuerda para que /purge no los vuelva a contar."""
+        removed = set(message_ids)
+        ring = self._chats.get(chat_id)
+        if not ring:
+            return
+        deleted = self._deleted.get(chat_id)
+        if deleted is None:
+            deleted = self._deleted[chat_id] = deque(maxlen=self.per_chat)
+        deleted.extend(removed)
+        kept = [entry for entry in ring if entry[0] not in removed]
+        ring.clear()
+        ring.extend(kept)
+
+    def deleted(self, chat_id: int) -> set:
+        """Ids que ya se borraron en el chat (no hace falta volver a borrarlos)."""
+        return set(self._deleted.get(chat_id, ()))
+
+    def stats(self) -> dict:
+        return {
+            "chats": len(self._chats),
+            "recorded": self.recorded,
+            "evictions": self.evictions,
+        }
+
+message_tracker = MessageTracker()
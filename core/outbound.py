@@ -0,0 +1,278 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import timedelta
+from telegram.error import BadRequest, RetryAfter
+from telegram.ext import BaseRateLimiter
+from config.settings import (
+    OUTBOUND_GLOBAL_RATE, OUTBOUND_GLOBAL_BURST, OUTBOUND_GROUP_RATE, OUTBOUND_GROUP_BURST,
+    OUTBOUND_PRIVATE_RATE, OUTBOUND_MAX_RETRIES, NOTICE_COALESCE_WINDOW, NOTICE_MAX_LINES,
+    WORKER_PROCESSES
+)
+from utils.cache import TTLCache
+from core.message_tracker import message_tracker
+
+logger = logging.getLogger(__name__)
+
+# --- PRIORIDADES (menor = antes) ---
+
+PRIORITY_CRITICAL = 0     # Borrar y castigar: frenan el daño
+PRIORITY_INTERACTIVE = 1  # Respuestas a botones y ediciones
+PRIORITY_NOTIFY = 2       # Mensajes nuevos (avisos, respuestas, logs)
+
+CRITICAL_ENDPOINTS = {
+    "deleteMessage", "deleteMessages", "banChatMember", "banChatSenderChat",
+    "restrictChatMember", "setChatPermissions", "unbanChatMember",
+}
+INTERACTIVE_ENDPOINTS = {
+    "answerCallbackQuery", "editMessageText", "editMessageReplyMarkup",
+    "editMessageCaption", "sendChatAction",
+}
+
+def endpoint_priority(endpoint: str) -> int:
+    if endpoint in CRITICAL_ENDPOINTS:
+        return PRIORITY_CRITICAL
+    if endpoint in INTERACTIVE_ENDPOINTS:
+        return PRIORITY_INTERACTIVE
+    return PRIORITY_NOTIFY
+
+def _is_send(endpoint: str) -> bool:
+    """Métodos que publican en el chat (sujetos al límite por chat de Telegram)."""
+    return endpoint.startswith("send") and endpoint != "sendChatAction"
+
+def account_share(value: float) -> float:
+    """
+    Parte del límite de la cuenta que le toca a este proceso. Con WORKER_PROCESSES > 1 cada worker
+    envía por su lado (el frontal solo hace llamadas de arranque), así que el cupo se reparte.
+    """
+    return value / max(1, WORKER_PROCESSES)
+
+class TokenBucket:
+    """Cubeta de tokens: `rate` por segundo con ráfagas de hasta `capacity`."""
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def consume(self) -> float:
+        """Toma un token. Retorna 0 si lo consiguió, o los segundos a esperar."""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def block(self, seconds: float):
+        """Pausa la cubeta (RetryAfter de Telegram)."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+def _retry_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+class OutboundScheduler(BaseRateLimiter):
+    """
+    Planificador central de llamadas a la Bot API (se conecta con `ApplicationBuilder.rate_limiter`).
+    Toda llamada del bot pasa por aquí, venga del handler que venga:
+    - Cubeta global (límite de la cuenta del bot, dividido entre los workers) repartida por prioridad:
+      borrados y castigos primero.
+    - Cubeta por chat para envíos (grupos ~20/min, privados ~1/s).
+    - RetryAfter: pausa la cubeta afectada y reintenta.
+    Las lecturas (get*) no consumen cupo.
+    """
+    def __init__(self, global_rate: float = None, global_burst: float = None,
+                 group_rate: float = OUTBOUND_GROUP_RATE, group_burst: float = OUTBOUND_GROUP_BURST,
+                 private_rate: float = OUTBOUND_PRIVATE_RATE, max_retries: int = OUTBOUND_MAX_RETRIES):
+        # Los chats están repartidos entre workers (cubetas por chat exactas); la cuenta no
+        global_rate = global_rate or account_share(OUTBOUND_GLOBAL_RATE)
+        global_burst = global_burst or max(1.0, account_share(OUTBOUND_GLOBAL_BURST))
+        self._global = TokenBucket(global_rate, global_burst)
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.private_rate = private_rate
+        self.max_retries = max_retries
+
+        self._chats = TTLCache(max_entries=20000, ttl=600)  # chat_id -> TokenBucket
+        self._waiting = []   # heap [prioridad, secuencia, future]
+        self._seq = itertools.count()
+        self._dispatcher = None
+
+        # Métricas
+        self.sent = {PRIORITY_CRITICAL: 0, PRIORITY_INTERACTIVE: 0, PRIORITY_NOTIFY: 0}
+        self.retries = 0
+        self.flood_waits = 0
+        self.dropped = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._dispatcher:
+            self._dispatcher.cancel()
+        for _, _, future in self._waiting:
+            if not future.done():
+                future.cancel()
+        self._waiting.clear()
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if endpoint.startswith("get"):
+            return await callback(*args, **kwargs)
+
+        priority = endpoint_priority(endpoint)
+        max_retries = self.max_retries
+        if isinstance(rate_limit_args, dict):
+            priority = rate_limit_args.get("priority", priority)
+            max_retries = rate_limit_args.get("max_retries", max_retries)
+
+        chat_id = data.get("chat_id")
+        chat_bucket = self._chat_bucket(chat_id) if chat_id is not None and _is_send(endpoint) else None
+
+        for attempt in range(max_retries + 1):
+            if chat_bucket:
+                await self._wait_bucket(chat_bucket)
+            await self._acquire_global(priority)
+            try:
+                result = await callback(*args, **kwargs)
+                self.sent[priority] = self.sent.get(priority, 0) + 1
+                if chat_bucket:
+                    # Mensajes propios: también cuentan para /purge
+                    message_tracker.record_result(result)
+                elif endpoint in ("deleteMessage", "deleteMessages") and chat_id is not None:
+                    # Borrados de cualquier capa (seguridad, purge): /purge no los vuelve a contar
+                    message_tracker.discard(chat_id, data.get("message_ids") or [data.get("message_id")])
+                return result
+            except RetryAfter as e:
+                seconds = _retry_seconds(e)
+                self.flood_waits += 1
+                # Con chat identificado la pausa es local; sin él afecta a toda la cuenta
+                (chat_bucket or self._global).block(seconds)
+                if attempt >= max_retries:
+                    self.dropped += 1
+                    raise
+                self.retries += 1
+                logger.warning(f"⏳ Flood control ({endpoint}, chat {chat_id}): reintento en {seconds:.0f}s.")
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            is_group = isinstance(chat_id, str) or int(chat_id) < 0
+            if is_group:
+                bucket = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                bucket = TokenBucket(self.private_rate, 1)
+            self._chats.set(chat_id, bucket)
+        return bucket
+
+    @staticmethod
+    async def _wait_bucket(bucket: TokenBucket):
+        while True:
+            wait = bucket.consume()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _acquire_global(self, priority: int):
+        """Turno en la cubeta global: se concede por prioridad y, dentro de ella, por llegada."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, [priority, next(self._seq), future])
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        while self._waiting:
+            if self._waiting[0][2].done():
+                heapq.heappop(self._waiting)  # Petición cancelada mientras esperaba
+                continue
+            wait = self._global.consume()
+            if wait > 0:
+                # Durante la espera pueden llegar peticiones más urgentes: el heap las adelanta
+                await asyncio.sleep(wait)
+                continue
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "sent": dict(self.sent),
+            "waiting": len(self._waiting),
+            "retries": self.retries,
+            "flood_waits": self.flood_waits,
+            "dropped": self.dropped,
+            "chats_tracked": len(self._chats),
+        }
+
+class NoticeCoalescer:
+    """
+    Agrupa avisos no críticos ("BANNED: x") por chat.
+    El primer aviso abre una ventana; al cerrarla se envía un solo mensaje
+    (el aviso tal cual si fue uno, o un resumen si hubo varios).
+    """
+    def __init__(self, window: float = NOTICE_COALESCE_WINDOW, max_lines: int = NOTICE_MAX_LINES):
+        self.window = window
+        self.max_lines = max_lines
+        self._pending = {}  # chat_id -> [líneas]
+        self._tasks = {}
+
+        # Métricas
+        self.notices = 0
+        self.messages = 0
+
+    def announce(self, bot, chat_id: int, line: str):
+        self.notices += 1
+        lines = self._pending.setdefault(chat_id, [])
+        lines.append(line)
+        if chat_id not in self._tasks:
+            self._tasks[chat_id] = asyncio.create_task(self._flush_later(bot, chat_id))
+
+    async def _flush_later(self, bot, chat_id: int):
+        await asyncio.sleep(self.window)
+        self._tasks.pop(chat_id, None)
+        lines = self._pending.pop(chat_id, [])
+        if lines:
+            await self._send(bot, chat_id, lines)
+
+    async def _send(self, bot, chat_id: int, lines: list):
+        if len(lines) == 1:
+            text = lines[0]
+        else:
+            shown = lines[:self.max_lines]
+            text = f"🛡️ **Resumen de Seguridad:** {len(lines)} acciones\n\n" + "\n\n".join(shown)
+            if len(lines) > len(shown):
+                text += f"\n\n... y {len(lines) - len(shown)} más."
+        try:
+            try:
+                await bot.send_message(chat_id, text, parse_mode="Markdown")
+            except BadRequest as e:
+                # Markdown roto: el resumen se entrega en texto plano en vez de perderse entero
+                logger.warning(f"Aviso con Markdown inválido ({e}). Enviando texto plano.")
+                await bot.send_message(chat_id, text)
+            self.messages += 1
+        except Exception as e:
+            logger.error(f"Error enviando aviso agrupado: {e}")
+
+    async def flush_all(self, bot):
+        """Envía los avisos pendientes sin esperar la ventana (apagado)."""
+        pending, self._pending = self._pending, {}
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._tasks.clear()
+        for chat_id, lines in pending.items():
+            await self._send(bot, chat_id, lines)
+
+    def stats(self) -> dict:
+        return {"notices": self.notices, "messages": self.messages, "pending_chats": len(self._pending)}
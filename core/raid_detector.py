@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from telegram import ChatPermissions
+from config.settings import (
+    RAID_JOIN_THRESHOLD, RAID_JOIN_WINDOW, RAID_MESSAGE_THRESHOLD,
+    RAID_MESSAGE_WINDOW, RAID_LOCKDOWN_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+class _RateWindow:
+    """Cuenta eventos en una ventana deslizante usando un buffer circular de `threshold` marcas."""
+    __slots__ = ("threshold", "window", "ring")
+
+    def __init__(self, threshold: int, window: float):
+        self.threshold = threshold
+        self.window = window
+        self.ring = deque(maxlen=threshold)
+
+    def add(self, now: float, count: int = 1) -> bool:
+        """Registra eventos. True si hubo `threshold` eventos dentro de la ventana."""
+        for _ in range(min(count, self.threshold)):
+            self.ring.append(now)
+        return len(self.ring) >= self.threshold and now - self.ring[0] <= self.window
+
+class RaidDetector:
+    """
+    Detector de raids por chat: vigila la tasa de ingresos (NEW_CHAT_MEMBERS) y de mensajes.
+    Al superar un umbral activa Lockdown (set_chat_permissions sin permisos) y lo levanta
+    solo tras el enfriamiento, restaurando los permisos leídos del chat. Mientras dure el raid
+    la Capa 4 (IA) queda suspendida, así que el Lockdown solo cuenta si Telegram lo aplicó.
+    """
+    def __init__(self):
+        self._joins = {}      # {chat_id: _RateWindow}
+        self._messages = {}   # {chat_id: _RateWindow}
+        self._lockdowns = {}  # {chat_id: {"until": float, "permissions": ChatPermissions, "task": Task}}
+        self._activating = set()  # Chats con un Lockdown en curso de aplicarse (evita duplicados)
+
+        # Métricas
+        self.lockdown_count = 0
+
+    # --- DETECCIÓN ---
+
+    def record_join(self, chat_id: int, count: int = 1) -> bool:
+        window = self._joins.get(chat_id)
+        if window is None:
+            window = self._joins[chat_id] = _RateWindow(RAID_JOIN_THRESHOLD, RAID_JOIN_WINDOW)
+        return window.add(time.monotonic(), count)
+
+    def record_message(self, chat_id: int) -> bool:
+        window = self._messages.get(chat_id)
+        if window is None:
+            window = self._messages[chat_id] = _RateWindow(RAID_MESSAGE_THRESHOLD, RAID_MESSAGE_WINDOW)
+        return window.add(time.monotonic())
+
+    def is_active(self, chat_id: int) -> bool:
+        """True mientras el chat esté en Lockdown (incluye el enfriamiento)."""
+        return chat_id in self._lockdowns
+
+    # --- LOCKDOWN ---
+
+    async def lockdown(self, chat_id: int, bot, reason: str) -> bool:
+        """Cierra el chat. Retorna True solo si Telegram aplicó la restricción."""
+        if chat_id in self._lockdowns or chat_id in self._activating:
+            return False
+
+        self._activating.add(chat_id)
+        logger.warning(f"🚨 RAID en chat {chat_id} ({reason}). Activando Lockdown por {RAID_LOCKDOWN_SECONDS}s.")
+        try:
+            # Sin los permisos originales no hay forma segura de reabrir: no se cierra el chat
+            # (la Capa 4 sigue activa en vez de quedar suspendida sin restricción real)
+            chat = await bot.get_chat(chat_id)
+            if chat.permissions is None:
+                raise ValueError("el chat no informa sus permisos")
+            permissions = chat.permissions
+            await bot.set_chat_permissions(chat_id, ChatPermissions.no_permissions())
+        except Exception as e:
+            logger.error(f"No se pudo activar Lockdown en {chat_id}: {e}")
+            # Sin reiniciar las ventanas, cada mensaje del raid repetiría el intento fallido
+            self._joins.pop(chat_id, None)
+            self._messages.pop(chat_id, None)
+            return False
+        finally:
+            self._activating.discard(chat_id)
+
+        state = {"until": time.monotonic() + RAID_LOCKDOWN_SECONDS, "permissions": permissions, "task": None}
+        self._lockdowns[chat_id] = state
+        self.lockdown_count += 1
+        state["task"] = asyncio.create_task(self._lift_later(chat_id, bot))
+
+        try:
+            await bot.send_message(
+                chat_id,
+                f"🚨 **LOCKDOWN ACTIVADO**\n📝 **Motivo:** {reason}\n⏳ El chat se reabrirá en {max(1, RAID_LOCKDOWN_SECONDS // 60)} min.",
+                parse_mode="Markdown"
+            )
+        except Exception as e:
+            logger.warning(f"Lockdown activo en {chat_id}, pero no se pudo avisar: {e}")
+        return True
+
+    async def _lift_later(self, chat_id: int, bot):
+        state = self._lockdowns.get(chat_id)
+        if not state:
+            return
+        await asyncio.sleep(max(0, state["until"] - time.monotonic()))
+        await self.lift(chat_id, bot)
+
+    async def lift(self, chat_id: int, bot):
+        state = self._lockdowns.pop(chat_id, None)
+        if not state:
+            return
+
+        # Reiniciar ventanas: el tráfico acumulado del raid no debe re-disparar el bloqueo
+        self._joins.pop(chat_id, None)
+        self._messages.pop(chat_id, None)
+
+        try:
+            await bot.set_chat_permissions(chat_id, state["permissions"])
+            await bot.send_message(chat_id, "✅ **Lockdown finalizado.** El chat vuelve a la normalidad.", parse_mode="Markdown")
+            logger.info(f"🔓 Lockdown levantado en chat {chat_id}.")
+        except Exception as e:
+            logger.error(f"No se pudo levantar Lockdown en {chat_id}: {e}")
+
+    async def lift_all(self, bot):
+        """Levanta todos los Lockdowns activos (apagado): ningún chat queda cerrado sin vigilancia."""
+        for chat_id in list(self._lockdowns):
+            task = self._lockdowns[chat_id].get("task")
+            if task:
+                task.cancel()
+            await self.lift(chat_id, bot)
+
+    def stats(self) -> dict:
+        return {
+            "active_lockdowns": len(self._lockdowns),
+            "lockdowns_total": self.lockdown_count,
+            "tracked_chats": len(set(self._joins) | set(self._messages)),
+        }
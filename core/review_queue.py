@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from config.settings import AI_REVIEW_WORKERS, AI_REVIEW_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+class AIReviewQueue:
+    """
+    Revisión IA en segundo plano (modo "permitir y revisar").
+    El mensaje pasa de inmediato y un pool acotado de workers lo clasifica después;
+    si el veredicto es HIGH/MED el castigo se aplica retroactivamente.
+    Con la cola llena, submit() devuelve False y el llamador se queda solo con regex.
+    """
+    def __init__(self, security, workers: int = AI_REVIEW_WORKERS, max_queue: int = AI_REVIEW_QUEUE_SIZE):
+        self.security = security
+        self.worker_count = max(1, workers)
+        self.max_queue = max_queue
+        self._queue = None
+        self._workers = []
+
+        # Métricas
+        self.submitted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        logger.info(f"🕵️ Revisión IA asíncrona lista ({self.worker_count} workers, cola {self.max_queue}).")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, update, context, text: str) -> bool:
+        """Encola un mensaje para revisión. False si no hay workers o la cola está llena."""
+        if not self._workers:
+            return False
+        try:
+            self._queue.put_nowait((update, context, text))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.submitted += 1
+        return True
+
+    async def _worker(self):
+        while True:
+            update, context, text = await self._queue.get()
+            try:
+                analysis = await self.security.venice.classify_message(text)
+                await self.security._apply_verdict(update, context, analysis)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error en revisión IA asíncrona: {e}")
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.depth,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
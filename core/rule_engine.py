@@ -0,0 +1,310 @@
+import logging
+import re
+from collections import namedtuple
+from services.database_service import (
+    add_rule, remove_rule, get_chat_rules, get_versions, RULES_VERSION_PREFIX
+)
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+# name: identificador del patrón | action: ban/mute/delete | priority: menor = más prioritaria
+Rule = namedtuple("Rule", ["name", "pattern", "action", "priority"], defaults=("ban", 100))
+
+RULE_ACTIONS = ("ban", "mute", "delete")
+
+# --- PACK INICIAL (Capa 2) ---
+DEFAULT_RULES = (
+    # Links de Estafa Comunes
+    Rule("scam_link", r'(https?://)?(t\.me/\+|bit\.ly|tinyurl\.com|is\.gd)'),
+    # Palabras Clave de Crypto Scam (Español/Inglés)
+    Rule("crypto_scam", r'(inversión|ganancia|rentabilidad|profit|bitcoin|crypto|usdt).*(garantizada|segura|gratis|giveaway)'),
+    Rule("money_scheme", r'(invest|make money|passive income|doubling)'),
+    # Insultos Graves (Español Latino/MX)
+    Rule("insult", r'\b(est[uú]pido|idiota|pendejo|imb[eé]cil|mierda|puto|verga|chinga|zorra|malparido)\b'),
+)
+
+_REPEAT_OPS = ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+
+def _fold_char(char: str):
+    """
+    Representante de `char` entre los caracteres que re.IGNORECASE considera iguales
+    (ej: 'S', 's' y 'ſ' -> 's'; 'I', 'i' y 'ı' -> 'i'). None si su plegado ocupa varios
+    caracteres ('İ', 'ß', ligaduras): esos no pueden formar parte de un literal del prefiltro.
+    """
+    if len(char.casefold()) != 1:
+        return None
+    lowered = char.lower()
+    upper = lowered.upper()
+    return upper.lower() if len(upper) == 1 and len(upper.lower()) == 1 else lowered
+
+def _required_literals(parsed):
+    """
+    Conjunto de literales (plegados con _fold_char) tal que todo match del patrón
+    contiene al menos uno de ellos. None si no se puede garantizar ninguno.
+    """
+    best = None
+    run = []
+
+    def consider(candidate):
+        nonlocal best
+        if candidate and (best is None or min(map(len, candidate)) > min(map(len, best))):
+            best = candidate
+
+    for op, av in parsed:
+        name = str(op)
+        folded = _fold_char(chr(av)) if name == "LITERAL" else None
+        if folded is not None:
+            run.append(folded)
+            continue
+
+        # Cualquier otro nodo corta la secuencia de literales consecutivos
+        consider({"".join(run)} if run else None)
+        run = []
+
+        if name == "SUBPATTERN":
+            consider(_required_literals(av[-1]))
+        elif name == "ATOMIC_GROUP":
+            consider(_required_literals(av))
+        elif name == "BRANCH":
+            options = [_required_literals(branch) for branch in av[1]]
+            if all(options):
+                consider(set().union(*options))
+        elif name in _REPEAT_OPS:
+            min_count, _, item = av
+            if min_count >= 1:
+                consider(_required_literals(item))
+
+    consider({"".join(run)} if run else None)
+    return best
+
+def extract_literals(pattern: str):
+    """Literales requeridos por un patrón (ver _required_literals), o None."""
+    try:
+        return _required_literals(sre_parse.parse(pattern))
+    except Exception:
+        return None
+
+def _trie_regex(node: dict, ends: list) -> str:
+    """
+    Alternancia factorizada por prefijos comunes (las ramas más largas se prueban primero).
+    Cada fin de literal deja un grupo vacío '()'; `ends` recibe los literales en el orden
+    de esos grupos, de modo que `match.lastindex` identifica el literal más largo encontrado.
+    """
+    marker = ""
+    if "" in node:
+        ends.append(node[""])
+        marker = "()"
+    branches = [re.escape(char) + _trie_regex(child, ends) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return marker
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if marker:
+        # Aquí termina un literal: lo que sigue es opcional (codicioso -> el más largo gana)
+        return marker + ("(?:" + body + ")" if len(branches) == 1 and len(body) > 1 else body) + "?"
+    return body
+
+class RuleMatcher:
+    """
+    Evalúa un pack de reglas sin que el costo crezca linealmente con su tamaño.
+    Prefiltro: de cada patrón se extraen los literales que todo match debe contener.
+    Todos los literales del pack se compilan en UNA alternancia (una sola pasada sobre
+    el texto) que decide qué reglas son candidatas; solo esas ejecutan su regex, en orden
+    de prioridad. Las reglas sin literales extraíbles se evalúan siempre.
+    """
+    def __init__(self, rules):
+        self.rules = sorted(rules, key=lambda rule: rule.priority)
+        self._compiled = [re.compile(rule.pattern, re.IGNORECASE) for rule in self.rules]
+        self._by_literal = {}  # {literal: [índices de regla]}
+        self._always = []      # Reglas sin prefiltro posible
+        self._hits = {}        # {literal: reglas que lo requieren (él o uno de sus prefijos)}
+        self._ends = []        # Literal de cada grupo marcador del prefiltro (grupo i -> _ends[i - 1])
+
+        for index, rule in enumerate(self.rules):
+            literals = extract_literals(rule.pattern)
+            if not literals:
+                self._always.append(index)
+                continue
+            for literal in literals:
+                self._by_literal.setdefault(literal, []).append(index)
+        self._prefilter = self._compile_prefilter()
+
+        # Métricas
+        self.checks = 0
+        self.regex_runs = 0
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _compile_prefilter(self):
+        """
+        Un solo regex con todos los literales, factorizados como trie (costo por posición
+        proporcional a la longitud del literal, no al número de reglas), dentro de un lookahead
+        para probar cada posición. En cada una reporta el literal más largo que empieza ahí;
+        los literales que son prefijo de otro (ej: 'bit' y 'bitcoin') heredan sus reglas.
+        Se compila con re.IGNORECASE y corre sobre el texto original, igual que las reglas:
+        text.lower() no equivale al plegado del motor de regex ('İ', 'ſ', 'ı').
+        """
+        if not self._by_literal:
+            return None
+        self._hits = {
+            literal: frozenset(
+                index for prefix, indexes in self._by_literal.items()
+                if literal.startswith(prefix) for index in indexes
+            )
+            for literal in self._by_literal
+        }
+        trie = {}
+        for literal in self._by_literal:
+            node = trie
+            for char in literal:
+                node = node.setdefault(char, {})
+            node[""] = literal  # Fin de literal
+        self._ends = []
+        return re.compile("(?=" + _trie_regex(trie, self._ends) + ")", re.IGNORECASE)
+
+    def candidates(self, text: str):
+        """Índices de reglas cuyo prefiltro coincide con el texto (ordenados por prioridad)."""
+        found = set(self._always)
+        if self._prefilter is not None:
+            for group in {m.lastindex for m in self._prefilter.finditer(text)}:
+                found.update(self._hits[self._ends[group - 1]])
+        return sorted(found)
+
+    def match(self, text: str):
+        """Devuelve la Rule de mayor prioridad que coincide, o None."""
+        if not self.rules or not text:
+            return None
+
+        self.checks += 1
+        for index in self.candidates(text):
+            self.regex_runs += 1
+            if self._compiled[index].search(text):
+                return self.rules[index]
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "rules": len(self.rules),
+            "unfiltered_rules": len(self._always),
+            "checks": self.checks,
+            "regex_runs": self.regex_runs,
+            "avg_regex_per_check": round(self.regex_runs / self.checks, 3) if self.checks else 0.0,
+        }
+
+MAX_PATTERN_LENGTH = 200  # Las reglas de usuario corren en el bucle compartido por todos los chats
+
+def _catastrophic_construct(parsed, repeated=False):
+    """
+    Busca construcciones con backtracking exponencial: cuantificadores anidados ((a+)+),
+    alternativas repetidas ((a|aa)+) y referencias a grupos. Retorna la descripción o None.
+    """
+    for op, av in parsed:
+        name = str(op)
+        if name in ("GROUPREF", "GROUPREF_EXISTS"):
+            return "referencias a grupos"
+        if name == "SUBPATTERN":
+            found = _catastrophic_construct(av[-1], repeated)
+        elif name == "ATOMIC_GROUP":
+            found = _catastrophic_construct(av, repeated)
+        elif name == "BRANCH":
+            if repeated:
+                return "alternativas dentro de un cuantificador"
+            found = next(filter(None, (_catastrophic_construct(branch, repeated) for branch in av[1])), None)
+        elif name in _REPEAT_OPS:
+            _, max_count, item = av
+            if max_count > 1:
+                if repeated:
+                    return "cuantificadores anidados"
+                found = _catastrophic_construct(item, True)
+            else:
+                found = _catastrophic_construct(item, repeated)
+        else:
+            found = None
+        if found:
+            return found
+    return None
+
+def validate_pattern(pattern: str):
+    """Retorna None si el patrón es utilizable, o el mensaje de error."""
+    if len(pattern) > MAX_PATTERN_LENGTH:
+        return f"Máximo {MAX_PATTERN_LENGTH} caracteres."
+    try:
+        re.compile(pattern)
+        construct = _catastrophic_construct(sre_parse.parse(pattern))
+    except re.error as e:
+        return str(e)
+    if construct:
+        return f"No se permiten {construct} (backtracking exponencial)."
+    return None
+
+# --- REGISTRO DE REGLAS POR CHAT ---
+
+class ChatRuleRegistry:
+    """
+    Un RuleMatcher compilado por chat: pack inicial + reglas propias del chat (tabla rules).
+    Los chats sin reglas propias comparten el matcher por defecto. Cuando las reglas de
+    un chat cambian solo se recompila ese chat; el resto de matchers se reutiliza.
+    Otros procesos detectan cambios por los contadores de versión 'rules:<chat_id>'.
+    """
+    def __init__(self, base_rules=DEFAULT_RULES):
+        self.base_rules = tuple(base_rules)
+        self.default_matcher = RuleMatcher(self.base_rules)
+        self._matchers = {}  # {chat_id: RuleMatcher} (solo chats con reglas propias)
+        self._versions = {}  # {chat_id: versión compilada}
+        self.rebuilds = 0
+
+    def matcher_for(self, chat_id: int) -> RuleMatcher:
+        """Matcher del chat (O(1), sin I/O)."""
+        return self._matchers.get(chat_id, self.default_matcher)
+
+    async def load_all(self):
+        """Compila los matchers de todos los chats con reglas registradas."""
+        await self.sync()
+        logger.info(f"📜 Reglas personalizadas cargadas para {len(self._matchers)} chats.")
+
+    async def sync(self):
+        """Recompila solo los chats cuya versión cambió desde la última compilación."""
+        versions = await get_versions(RULES_VERSION_PREFIX)
+        for key, version in versions.items():
+            chat_id = int(key[len(RULES_VERSION_PREFIX):])
+            if self._versions.get(chat_id) != version:
+                await self.rebuild(chat_id, version)
+
+    async def rebuild(self, chat_id: int, version: int = None):
+        rows = await get_chat_rules(chat_id)
+        chat_rules = [
+            Rule(f"#{row['id']}", row["pattern"], row["action"], row["priority"])
+            for row in rows if validate_pattern(row["pattern"]) is None
+        ]
+
+        if chat_rules:
+            self._matchers[chat_id] = RuleMatcher(self.base_rules + tuple(chat_rules))
+        else:
+            self._matchers.pop(chat_id, None)
+
+        if version is not None:
+            self._versions[chat_id] = version
+        self.rebuilds += 1
+
+    async def add_rule(self, chat_id: int, pattern: str, action: str, priority: int, created_by: int) -> int:
+        rule_id = await add_rule(chat_id, pattern, action, priority, created_by)
+        await self._refresh(chat_id)
+        return rule_id
+
+    async def remove_rule(self, chat_id: int, rule_id: int) -> bool:
+        removed = await remove_rule(chat_id, rule_id)
+        if removed:
+            await self._refresh(chat_id)
+        return removed
+
+    async def _refresh(self, chat_id: int):
+        versions = await get_versions(f"{RULES_VERSION_PREFIX}{chat_id}")
+        await self.rebuild(chat_id, versions.get(f"{RULES_VERSION_PREFIX}{chat_id}"))
+
+    def stats(self) -> dict:
+        return {"custom_chats": len(self._matchers), "rebuilds": self.rebuilds}
@@ -1,34 +1,111 @@
 import logging
-import re
 import time
 import asyncio
 from telegram import Update, ChatPermissions
 from telegram.ext import ContextTypes
+from telegram.helpers import escape_markdown
 from services.venice_service import VeniceService
+from core.admin_cache import ChatAdminCache
+from core.review_queue import AIReviewQueue
+from core.rule_engine import ChatRuleRegistry
+from core.flood_detector import FloodDetector
+from core.raid_detector import RaidDetector
+from core.outbound import NoticeCoalescer
+from core.log_aggregator import LogAggregator, SEVERITY_HIGH
 from services.database_service import (
     get_or_create_user, update_trust_score, add_ban_log,
-    get_authorized_admins, get_chat_settings
+    get_authorized_admins, get_chat_settings, get_version,
+    add_authorized_admin, remove_authorized_admin, AUTHORIZED_ADMINS_VERSION_KEY
 )
-from config.settings import ADMIN_USER_ID
+from config.settings import ADMIN_USER_ID, SHARED_STATE_SYNC_INTERVAL
 
 logger = logging.getLogger(__name__)
 
 class SecurityService:
     def __init__(self):
         self.venice = VeniceService()
-        self.flood_control = {} # Estructura: {user_id: [timestamp1, timestamp2, ...]}
-
-        # --- COMPILADOR DE REGEX (Capa 2) ---
-        # Patrones de Estafa e Insultos (Pack Inicial)
-        self.regex_patterns = [
-            # Links de Estafa Comunes
-            re.compile(r'(https?://)?(t\.me/\+|bit\.ly|tinyurl\.com|is\.gd)', re.IGNORECASE),
-            # Palabras Clave de Crypto Scam (Español/Inglés)
-            re.compile(r'(inversión|ganancia|rentabilidad|profit|bitcoin|crypto|usdt).*(garantizada|segura|gratis|giveaway)', re.IGNORECASE),
-            re.compile(r'(invest|make money|passive income|doubling)', re.IGNORECASE),
-            # Insultos Graves (Español Latino/MX)
-            re.compile(r'\b(est[uú]pido|idiota|pendejo|imb[eé]cil|mierda|puto|verga|chinga|zorra|malparido)\b', re.IGNORECASE)
-        ]
+        self.admin_cache = ChatAdminCache()
+        self.review_queue = AIReviewQueue(self)
+        self.authorized_admins = frozenset()  # Se reemplaza completo (nunca se muta) -> lecturas atómicas
+        self.authorized_admins_version = -1
+        self._sync_task = None
+        self.flood = FloodDetector()  # Ventanas por (chat_id, user_id), memoria acotada
+        self.raid = RaidDetector()    # Velocidad agregada por chat (Anti-Raid / Lockdown)
+        self.notices = NoticeCoalescer()  # Avisos "BANNED/MUTED" agrupados por chat
+        self.logs = LogAggregator()       # Logs de moderación en digests por canal
+        self._bot = None
+
+        # --- MOTOR DE REGLAS (Capa 2) ---
+        # Pack inicial + reglas por chat (tabla rules), recompiladas en caliente
+        self.rules = ChatRuleRegistry()
+
+    # --- CICLO DE VIDA ---
+
+    async def start(self, bot=None):
+        """Carga el estado compartido e inicia la sincronización en segundo plano."""
+        self._bot = bot
+        await self.load_authorized_admins()
+        await self.rules.load_all()
+        await self.review_queue.start()
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        await self.review_queue.stop()
+        logger.info(f"🛡️ Seguridad detenida. {self.stats()}")
+        if self._bot:
+            await self.notices.flush_all(self._bot)
+            await self.logs.flush_all(self._bot)
+            await self.raid.lift_all(self._bot)
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+
+    def stats(self) -> dict:
+        """Métricas de las capas de seguridad en memoria."""
+        return {
+            "flood": self.flood.stats(),
+            "raid": self.raid.stats(),
+            "rules": self.rules.stats(),
+            "admin_cache": self.admin_cache.stats(),
+            "review_queue": self.review_queue.stats(),
+        }
+
+    async def _sync_loop(self):
+        """Detecta cambios hechos por otros procesos comparando contadores de versión."""
+        while True:
+            await asyncio.sleep(SHARED_STATE_SYNC_INTERVAL)
+            try:
+                version = await get_version(AUTHORIZED_ADMINS_VERSION_KEY)
+                if version != self.authorized_admins_version:
+                    await self.load_authorized_admins()
+                await self.rules.sync()
+            except Exception as e:
+                logger.warning(f"Error sincronizando estado compartido: {e}")
+
+    # --- ADMINS AUTORIZADOS (En memoria) ---
+
+    async def load_authorized_admins(self):
+        # Leer la versión antes que el conjunto: si cambia en medio, el próximo ciclo recarga
+        version = await get_version(AUTHORIZED_ADMINS_VERSION_KEY)
+        admins = await get_authorized_admins()
+        self.authorized_admins = frozenset(admins)
+        self.authorized_admins_version = version
+        logger.info(f"🔑 {len(admins)} admins autorizados cargados (v{version}).")
+
+    async def add_authorized_admin(self, user_id: int, added_by: int):
+        version = await add_authorized_admin(user_id, added_by)
+        self.authorized_admins = self.authorized_admins | {user_id}
+        self.authorized_admins_version = version
+
+    async def remove_authorized_admin(self, user_id: int):
+        version = await remove_authorized_admin(user_id)
+        self.authorized_admins = self.authorized_admins - {user_id}
+        self.authorized_admins_version = version
 
     async def check_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
         """
@@ -50,18 +127,24 @@ class SecurityService:
         if await self._is_immune(user.id, chat.id, context):
             return True
 
+        settings = await get_chat_settings(chat.id)
+
+        # --- ANTI-RAID (Velocidad del chat) ---
+        if self.raid.record_message(chat.id) and not self.raid.is_active(chat.id):
+            await self._lockdown(chat.id, context.bot, reason="Ráfaga masiva de mensajes")
+
         # --- CAPA 1: ANTI-FLOOD Y MEDIOS ---
-        if await self._check_flood(user.id):
+        if await self._check_flood(chat.id, user.id, settings):
             await self._punish_user(update, context, reason="Flood Detectado", action="mute")
             return False
 
         # (Futuro: Aquí iría filtro de medios/reenviados si se habilita)
 
         # --- CAPA 2: REGEX (Patrones Locales) ---
-        for pattern in self.regex_patterns:
-            if pattern.search(text):
-                await self._punish_user(update, context, reason="Patrón Prohibido (Regex)", action="ban")
-                return False
+        rule = self.rules.matcher_for(chat.id).match(text)
+        if rule:
+            await self._punish_user(update, context, reason=f"Patrón Prohibido (Regex: {rule.name})", action=rule.action)
+            return False
 
         # --- CAPA 3: TRUST SCORE (Ahorro de Costos) ---
         db_user = await get_or_create_user(user.id, user.username)
@@ -75,68 +158,78 @@ class SecurityService:
         # --- CAPA 4: IA VENICE (Clasificación Quirúrgica) ---
         # Solo analizamos si hay texto suficiente (más de 3 caracteres)
         if len(text) > 3:
-            analysis = await self.venice.classify_message(text)
-            risk = analysis.get("risk", "LOW")
-            reason = analysis.get("reason", "Análisis IA")
-
-            if risk == "HIGH":
-                await self._punish_user(update, context, reason=f"IA High Risk: {reason}", action="ban")
-                await update_trust_score(user.id, reset=True)
-                return False
-            elif risk == "MED":
-                await self._punish_user(update, context, reason=f"IA Medium Risk: {reason}", action="mute")
-                await update_trust_score(user.id, reset=True)
-                return False
-            else:
-                # Riesgo BAJO -> Permitir y subir reputación
-                await update_trust_score(user.id, increment=True)
+            if self.raid.is_active(chat.id):
+                # Raid en curso: IA suspendida, solo reglas locales (Capas 1-2)
                 return True
 
-        return True
+            if settings.get("ai_async_review"):
+                # Modo "permitir y revisar": el mensaje pasa y la IA lo juzga en segundo plano
+                if not self.review_queue.submit(update, context, text):
+                    # Backpressure: cola llena -> solo reglas locales (Regex ya aplicado)
+                    logger.warning(f"⚠️ Cola de revisión IA llena. Chat {chat.id} en modo solo-regex.")
+                return True
+
+            analysis = await self.venice.classify_message(text)
+            return await self._apply_verdict(update, context, analysis)
 
-    async def check_join(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Verifica nuevos miembros."""
-        # Por ahora solo pasamos, la lógica de bienvenida se maneja en el handler principal si pasa
         return True
 
+    async def check_join(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+        """
+        Verifica nuevos miembros (Anti-Raid).
+        Retorna False durante un Lockdown para omitir bienvenidas y ahorrar envíos.
+        """
+        chat = update.effective_chat
+        if not chat or chat.type == "private" or not update.message:
+            return True
+
+        joined = [m for m in update.message.new_chat_members if m.id != context.bot.id]
+        if joined and self.raid.record_join(chat.id, len(joined)) and not self.raid.is_active(chat.id):
+            await self._lockdown(chat.id, context.bot, reason="Ingreso masivo de cuentas")
+
+        return not self.raid.is_active(chat.id)
+
     # --- MÉTODOS PRIVADOS ---
 
+    async def _apply_verdict(self, update: Update, context: ContextTypes.DEFAULT_TYPE, analysis: dict) -> bool:
+        """Aplica el veredicto de la IA. Retorna True si el mensaje es SEGURO."""
+        user = update.effective_user
+        risk = analysis.get("risk", "LOW")
+        reason = analysis.get("reason", "Análisis IA")
+
+        if risk == "HIGH":
+            await self._punish_user(update, context, reason=f"IA High Risk: {reason}", action="ban")
+            await update_trust_score(user.id, reset=True)
+            return False
+        elif risk == "MED":
+            await self._punish_user(update, context, reason=f"IA Medium Risk: {reason}", action="mute")
+            await update_trust_score(user.id, reset=True)
+            return False
+        else:
+            # Riesgo BAJO -> Permitir y subir reputación
+            await update_trust_score(user.id, increment=True)
+            return True
+
     async def _is_immune(self, user_id: int, chat_id: int, context: ContextTypes.DEFAULT_TYPE) -> bool:
         """Verifica si el usuario es inmune (Dueño, Admin del Bot o Admin del Chat)."""
         # 1. Dueño del Bot
         if user_id == int(ADMIN_USER_ID):
             return True
 
-        # 2. Admins Autorizados del Bot (DB)
-        authorized_admins = await get_authorized_admins()
-        if user_id in authorized_admins:
+        # 2. Admins Autorizados del Bot (Set en memoria, sin I/O)
+        if user_id in self.authorized_admins:
             return True
 
-        # 3. Admins del Chat actual
-        try:
-            chat_member = await context.bot.get_chat_member(chat_id, user_id)
-            if chat_member.status in ["creator", "administrator"]:
-                return True
-        except Exception as e:
-            logger.warning(f"Error verificando admin del chat: {e}")
-
-        return False
-
-    async def _check_flood(self, user_id: int) -> bool:
-        """Retorna True si el usuario está haciendo flood (>5 mensajes en 3s)."""
-        now = time.time()
-        timestamps = self.flood_control.get(user_id, [])
-
-        # Limpiar timestamps viejos (> 3 segundos)
-        timestamps = [t for t in timestamps if now - t < 3.0]
-
-        # Agregar actual
-        timestamps.append(now)
-        self.flood_control[user_id] = timestamps
+        # 3. Admins del Chat actual (Roster en caché)
+        return await self.admin_cache.is_admin(chat_id, user_id, context.bot)
 
-        if len(timestamps) > 5:
-            return True
-        return False
+    async def _check_flood(self, chat_id: int, user_id: int, settings: dict) -> bool:
+        """Retorna True si el usuario está haciendo flood (umbral del chat o 5 mensajes en 3s)."""
+        return self.flood.hit(
+            chat_id, user_id,
+            max_messages=settings.get("flood_limit"),
+            window=settings.get("flood_window"),
+        )
 
     async def _punish_user(self, update: Update, context: ContextTypes.DEFAULT_TYPE, reason: str, action: str):
         """Ejecuta el castigo y loguea la acción."""
@@ -152,17 +245,18 @@ class SecurityService:
         try:
             if action == "ban":
                 await chat.ban_member(user.id)
-                await context.bot.send_message(chat.id, f"🛡️ **BANNED:** {user.first_name}\n📝 **Razón:** {reason}", parse_mode="Markdown")
+                self.notices.announce(context.bot, chat.id, f"🛡️ **BANNED:** {escape_markdown(user.first_name)}\n📝 **Razón:** {escape_markdown(reason)}")
             elif action == "mute":
                 permissions = ChatPermissions(can_send_messages=False)
                 # Mute por 1 hora por defecto
                 until_date = time.time() + 3600
                 await chat.restrict_member(user.id, permissions, until_date=until_date)
-                await context.bot.send_message(chat.id, f"🛡️ **MUTED:** {user.first_name}\n📝 **Razón:** {reason}", parse_mode="Markdown")
+                self.notices.announce(context.bot, chat.id, f"🛡️ **MUTED:** {escape_markdown(user.first_name)}\n📝 **Razón:** {escape_markdown(reason)}")
 
-            # Registrar en DB
+            # Registrar en DB (solo castigos: una regla "delete" no banea ni silencia)
             # (Asumimos admin_id 0 para el bot)
-            await add_ban_log(user.id, chat.id, reason, 0)
+            if action != "delete":
+                await add_ban_log(user.id, chat.id, reason, 0)
 
             # Loguear a Canal de Auditoría
             await self._log_action(context, chat.id, user, action, reason)
@@ -172,15 +266,17 @@ class SecurityService:
             await context.bot.send_message(chat.id, "⚠️ Error de permisos. Hazme Admin para protegerte.")
 
     async def _log_action(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int, user, action: str, reason: str):
-        """Envía el log al canal configurado."""
+        """Encola el log para el canal configurado (se entrega agrupado en digests)."""
+        settings = await get_chat_settings(chat_id)  # Caché en memoria
+        if settings and settings["log_channel_id"]:
+            log_text = f"#{action.upper()} | User: {escape_markdown(user.full_name)} | ID: `{user.id}` | Reason: {escape_markdown(reason)}"
+            self.logs.log(context.bot, settings["log_channel_id"], action, log_text)
+
+    async def _lockdown(self, chat_id: int, bot, reason: str):
+        """Activa el Lockdown y lo reporta de inmediato al canal de logs."""
+        if not await self.raid.lockdown(chat_id, bot, reason=reason):
+            return
         settings = await get_chat_settings(chat_id)
         if settings and settings["log_channel_id"]:
-            log_channel = settings["log_channel_id"]
-            log_text = (
-                f"#{action.upper()} | User: {user.full_name} | ID: `{user.id}`\n"
-                f"Reason: {reason} | By: Velzar"
-            )
-            try:
-                await context.bot.send_message(log_channel, log_text, parse_mode="Markdown")
-            except Exception as e:
-                logger.warning(f"No se pudo enviar log al canal {log_channel}: {e}")
+            log_text = f"🚨 #LOCKDOWN | Chat: `{chat_id}` | Reason: {escape_markdown(reason)} | By: Velzar"
+            self.logs.log(bot, settings["log_channel_id"], "lockdown", log_text, severity=SEVERITY_HIGH)
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import signal
+from telegram import Update
+from telegram.ext import ApplicationBuilder, TypeHandler
+from config.settings import SHARD_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# --- ENRUTAMIENTO ---
+
+def shard_key(update: Update) -> int:
+    """Clave de reparto: el chat (o el usuario si no hay chat). Todo un chat cae en el mismo worker."""
+    if update.effective_chat:
+        return update.effective_chat.id
+    if update.effective_user:
+        return update.effective_user.id
+    return 0
+
+def shard_for(update: Update, shards: int) -> int:
+    return shard_key(update) % shards
+
+class ShardRouter:
+    """
+    Proceso frontal: recibe updates y los reparte por hash de chat_id entre N procesos worker.
+    El estado por chat (flood, raid, cachés) queda local a un solo worker; el estado compartido
+    entre chats (admins autorizados, reglas) vive en SQLite con contadores de versión.
+    """
+    def __init__(self, workers: int, queue_size: int = SHARD_QUEUE_SIZE):
+        self.worker_count = workers
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queues = [self._ctx.Queue(maxsize=queue_size) for _ in range(workers)]
+        self._processes = [None] * workers
+        self._stopping = False
+
+        # Métricas
+        self.routed = [0] * workers
+        self.restarts = 0
+
+    def start(self):
+        for index in range(self.worker_count):
+            self._spawn(index)
+        logger.info(f"🧩 {self.worker_count} workers iniciados.")
+
+    def _spawn(self, index: int):
+        process = self._ctx.Process(
+            target=_worker_main, args=(index, self._queues[index]),
+            name=f"velzar-worker-{index}", daemon=False
+        )
+        process.start()
+        self._processes[index] = process
+
+    async def route(self, update: Update, context):
+        """Handler del proceso frontal: serializa el update y lo envía a su worker."""
+        index = shard_for(update, self.worker_count)
+
+        process = self._processes[index]
+        if not self._stopping and (process is None or not process.is_alive()):
+            logger.error(f"⚠️ Worker {index} caído. Reiniciando...")
+            self.restarts += 1
+            self._spawn(index)
+
+        # put() bloquea si la cola está llena (backpressure hacia el fetch de updates)
+        payload = update.to_json()
+        await asyncio.get_running_loop().run_in_executor(None, self._queues[index].put, payload)
+        self.routed[index] += 1
+
+    def stop(self, timeout: float = 30.0):
+        """Pide a cada worker terminar (tras procesar su cola) y espera su salida."""
+        self._stopping = True
+        for queue in self._queues:
+            queue.put(None)
+        for index, process in enumerate(self._processes):
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"Worker {index} no terminó a tiempo. Forzando cierre.")
+                process.terminate()
+        logger.info("🧩 Workers detenidos.")
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.worker_count,
+            "routed": list(self.routed),
+            "alive": [bool(p and p.is_alive()) for p in self._processes],
+            "restarts": self.restarts,
+        }
+
+def run_sharded(workers: int, builder: ApplicationBuilder, runner, front_post_init=None):
+    """
+    Arranca los workers y el proceso frontal que les reparte los updates.
+    `runner` arranca la aplicación frontal en el modo de ingesta configurado (polling/webhook).
+    """
+    router = ShardRouter(workers)
+    router.start()
+
+    async def _front_post_stop(application):
+        await asyncio.get_running_loop().run_in_executor(None, router.stop)
+
+    builder = builder.post_stop(_front_post_stop)
+    if front_post_init:
+        builder = builder.post_init(front_post_init)
+    front = builder.build()
+    front.bot_data["router"] = router
+    front.add_handler(TypeHandler(Update, router.route))
+
+    runner(front)
+
+# --- PROCESO WORKER ---
+
+def _worker_main(index: int, queue):
+    """Punto de entrada de cada worker (proceso separado)."""
+    # El frontal coordina el apagado: Ctrl+C no debe cortar al worker a mitad de un update
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_worker_loop(index, queue))
+
+async def _worker_loop(index: int, queue):
+    # Import tardío: main configura logging y construye la aplicación completa
+    import main as velzar
+
+    app = velzar.build_application(velzar.application_builder().updater(None), publish=False)
+    await app.initialize()
+    await app.post_init(app)
+    await app.start()
+    logger.info(f"🧩 Worker {index} listo.")
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            payload = await loop.run_in_executor(None, queue.get)
+            if payload is None:
+                break
+            try:
+                update = Update.de_json(json.loads(payload), app.bot)
+                await app.update_queue.put(update)
+            except Exception as e:
+                logger.error(f"Worker {index}: update inválido descartado: {e}")
+    finally:
+        await app.stop()
+        await app.post_stop(app)
+        await app.shutdown()
+        await app.post_shutdown(app)
+        logger.info(f"🧩 Worker {index} detenido.")
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from telegram.ext import BaseUpdateProcessor
+from config.settings import UPDATE_CONCURRENCY, UPDATE_BACKLOG
+from core.sharding import shard_key
+
+logger = logging.getLogger(__name__)
+
+DEPTH_WARNING = 50  # Updates en espera de un solo chat que ameritan aviso (posible raid/flood)
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Procesa updates de chats distintos en paralelo, pero los de un mismo chat en orden estricto.
+
+    - Semáforo base de PTB (`backlog`): updates admitidos dentro del procesador (en espera o en curso).
+    - Candado por chat: el siguiente update del chat espera a que termine el anterior
+      (el conteo de flood y los castigos ven los mensajes en orden de llegada).
+    - Semáforo global (`concurrency`): handlers ejecutándose a la vez entre todos los chats.
+    Un chat lento solo retrasa sus propios updates, no los del resto.
+    """
+    def __init__(self, concurrency: int = UPDATE_CONCURRENCY, backlog: int = UPDATE_BACKLOG):
+        super().__init__(max(backlog, concurrency))
+        self.concurrency = concurrency
+        self._workers = asyncio.Semaphore(concurrency)
+        self._locks = {}   # chat_id -> asyncio.Lock (solo chats con updates pendientes)
+        self._depth = {}   # chat_id -> updates del chat dentro del procesador
+
+        # Métricas
+        self.pending = 0
+        self.running = 0
+        self.processed = 0
+        self.max_depth = 0
+
+    async def do_process_update(self, update, coroutine) -> None:
+        key = shard_key(update) if hasattr(update, "effective_chat") else 0
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        depth = self._depth.get(key, 0) + 1
+        self._depth[key] = depth
+        self.max_depth = max(self.max_depth, depth)
+        if depth == DEPTH_WARNING:
+            logger.warning(f"🐢 Chat {key}: {depth} updates en cola. Más cargados: {self.queue_depths(5)}")
+        self.pending += 1
+
+        try:
+            # asyncio.Lock es FIFO: el orden de adquisición es el orden de llegada del chat
+            async with lock:
+                async with self._workers:
+                    self.running += 1
+                    try:
+                        await coroutine
+                    finally:
+                        self.running -= 1
+        finally:
+            self.pending -= 1
+            self.processed += 1
+            depth = self._depth[key] - 1
+            if depth:
+                self._depth[key] = depth
+            else:
+                # Chat sin pendientes: liberamos su estado (la memoria no crece con chats inactivos)
+                del self._depth[key]
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        logger.info(f"⚡ Procesador concurrente: {self.concurrency} en paralelo, orden estricto por chat.")
+
+    async def shutdown(self) -> None:
+        if self.pending:
+            logger.warning(f"Procesador cerrado con {self.pending} updates pendientes.")
+        logger.info(f"⚡ Procesador detenido. {self.stats()}")
+
+    def queue_depths(self, top: int = 10) -> list:
+        """Chats con más updates esperando (chat_id, profundidad)."""
+        return sorted(self._depth.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "running": self.running,
+            "processed": self.processed,
+            "active_chats": len(self._depth),
+            "max_depth": self.max_depth,
+            "top_depths": self.queue_depths(5),
+        }
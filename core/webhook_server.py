@@ -0,0 +1,170 @@
+import asyncio
+import hmac
+import json
+import logging
+import signal
+import time
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+from config.settings import (
+    WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET,
+    WEBHOOK_MAX_CONNECTIONS, WEBHOOK_MAX_PENDING, WEBHOOK_DRAIN_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+class WebhookServer:
+    """
+    Receptor HTTP de updates (aiohttp).
+    Cada POST se valida, se deserializa y se encola en `application.update_queue`,
+    por lo que pasa por el mismo procesador de updates que el modo polling.
+    Si hay demasiados updates pendientes responde 503: Telegram reintenta más tarde.
+    Sin `secret_token` rechaza todo: cualquiera que alcance el puerto podría inyectar updates.
+    """
+    def __init__(self, application: Application, host: str = WEBHOOK_LISTEN, port: int = WEBHOOK_PORT,
+                 path: str = WEBHOOK_PATH, secret_token: str = WEBHOOK_SECRET,
+                 max_pending: int = WEBHOOK_MAX_PENDING):
+        self.application = application
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.max_pending = max_pending
+
+        self._runner = None
+        self._draining = False
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        # Métricas
+        self.accepted = 0
+        self.rejected_auth = 0
+        self.rejected_busy = 0
+        self.rejected_invalid = 0
+
+    async def start(self):
+        web_app = web.Application()
+        web_app.router.add_post(self.path, self._handle)
+        self._runner = web.AppRunner(web_app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"🌐 Webhook escuchando en http://{self.host}:{self.port}{self.path}")
+
+    def pending(self) -> int:
+        # Cola de entrada + updates dentro del procesador concurrente (si lo hay)
+        processing = getattr(self.application.update_processor, "pending", 0)
+        return self.application.update_queue.qsize() + processing + self._in_flight
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if not self.secret_token or not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ""), self.secret_token
+        ):
+            self.rejected_auth += 1
+            return web.Response(status=403)
+
+        if self._draining or self.pending() >= self.max_pending:
+            self.rejected_busy += 1
+            return web.Response(status=503)
+
+        self._in_flight += 1
+        self._idle.clear()
+        try:
+            try:
+                data = await request.json(loads=json.loads)
+                update = Update.de_json(data, self.application.bot)
+            except Exception as e:
+                self.rejected_invalid += 1
+                logger.warning(f"Webhook: update inválido descartado: {e}")
+                return web.Response(status=400)
+
+            await self.application.update_queue.put(update)
+            self.accepted += 1
+            return web.Response(status=200)
+        finally:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._idle.set()
+
+    async def drain(self, timeout: float = WEBHOOK_DRAIN_TIMEOUT):
+        """Deja de aceptar updates, espera a las peticiones en curso y cierra el listener."""
+        self._draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook: {self._in_flight} peticiones sin terminar tras {timeout}s.")
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        logger.info("🌐 Webhook detenido.")
+
+    def stats(self) -> dict:
+        return {
+            "accepted": self.accepted,
+            "rejected_auth": self.rejected_auth,
+            "rejected_busy": self.rejected_busy,
+            "rejected_invalid": self.rejected_invalid,
+            "pending": self.pending(),
+        }
+
+async def _serve(application: Application):
+    server = WebhookServer(application)
+    application.bot_data["webhook"] = server
+    stop_event = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass  # Windows
+
+    try:
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        await server.start()
+        if WEBHOOK_URL:
+            await application.bot.set_webhook(
+                url=WEBHOOK_URL,
+                secret_token=WEBHOOK_SECRET,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+                allowed_updates=Update.ALL_TYPES,
+            )
+            logger.info(f"🌐 Webhook registrado en Telegram: {WEBHOOK_URL}")
+        else:
+            logger.warning("WEBHOOK_URL vacío: el webhook no se registra en Telegram (modo local).")
+
+        await stop_event.wait()
+    finally:
+        # Orden de vaciado: listener -> updates en cola (stop) -> servicios
+        # El webhook sigue registrado: Telegram retiene los updates mientras reiniciamos
+        started = time.monotonic()
+        await server.drain()
+        if application.running:
+            await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        logger.info(f"🌐 Apagado completo en {time.monotonic() - started:.1f}s. {server.stats()}")
+
+def webhook_config_error():
+    """Motivo por el que el modo webhook no puede arrancar, o None."""
+    if not WEBHOOK_SECRET:
+        return "WEBHOOK_SECRET no configurado: sin él cualquiera que alcance el puerto podría inyectar updates."
+    return None
+
+def run_webhook(application: Application):
+    """Equivalente a `run_polling()` para el modo webhook."""
+    error = webhook_config_error()
+    if error:
+        logger.error(f"❌ {error}")
+        return
+    asyncio.run(_serve(application))
@@ -5,16 +5,21 @@ from telegram import (
     BotCommandScopeAllChatAdministrators
 )
 from telegram.ext import (
-    ApplicationBuilder, Application, CommandHandler,
-    CallbackQueryHandler, MessageHandler, filters, ContextTypes, ApplicationHandlerStop
+    ApplicationBuilder, Application, CommandHandler, CallbackQueryHandler,
+    ChatMemberHandler, MessageHandler, filters, ContextTypes, ApplicationHandlerStop
 )
-from config.settings import BOT_TOKEN, LOG_LEVEL
-from services.database_service import init_db
+from config.settings import BOT_TOKEN, LOG_LEVEL, WORKER_PROCESSES, BOT_MODE, TELEGRAM_API_BASE
+from services.database_service import init_db, db_pool, write_buffer, close_db
 from core.security_service import SecurityService
+from core.update_processor import ChatOrderedUpdateProcessor
+from core.outbound import OutboundScheduler
+from core.message_tracker import message_tracker
+from core.conversation_memory import ConversationMemory
 from core.handlers.menu_handler import start_menu, menu_callback_handler, welcome_new_member
 from core.handlers.admin_handler import (
     ban_command, mute_command, purge_command,
-    setlog_command, setwelcome_command, check_command
+    setlog_command, setwelcome_command, check_command, aimode_command, setflood_command,
+    addrule_command, delrule_command, rules_command, chat_member_update_handler
 )
 from core.handlers.guide_handler import guide_callback_handler
 from core.handlers.help_handler import help_command, help_callback_handler
@@ -33,6 +38,12 @@ logger = logging.getLogger(__name__)
 
 # --- MIDDLEWARE DE SEGURIDAD ---
 
+async def track_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Registra el message_id en el rastreador de /purge."""
+    message = update.effective_message
+    if message and update.effective_chat:
+        message_tracker.record(update.effective_chat.id, message.message_id)
+
 async def security_middleware(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Interceptor de tráfico. Ejecuta la lógica de seguridad antes que cualquier otro handler.
@@ -49,25 +60,46 @@ async def security_middleware(update: Update, context: ContextTypes.DEFAULT_TYPE
         # Si no es seguro (fue borrado/baneado), detener el procesamiento de otros handlers
         raise ApplicationHandlerStop
 
+async def join_middleware(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Interceptor de ingresos (Anti-Raid). En Lockdown detiene las bienvenidas."""
+    security_service = context.bot_data.get("security")
+    if not security_service:
+        return
+
+    if not await security_service.check_join(update, context):
+        raise ApplicationHandlerStop
+
 # --- INICIALIZACIÓN ---
 
-async def post_init(application: Application):
+async def init_services(application: Application):
     logger.info("⚙️ Iniciando Servicios de Velzar...")
 
-    # 1. Base de Datos
+    # 1. Base de Datos (Pool persistente + Tablas)
+    await db_pool.start()
     await init_db()
+    await write_buffer.start()
 
     # 2. Servicio de Seguridad (Motor Principal)
     security_service = SecurityService()
+    await security_service.start(application.bot)
     application.bot_data["security"] = security_service
     logger.info("🛡️ Motor de Seguridad: ONLINE")
 
-    # 3. Identidad del Bot
+    # 3. Conexión a Venice AI (Sesión HTTP compartida)
+    await security_service.venice.start()
+
+    # Memoria de conversación del chat (RAM acotada + SQLite)
+    conversations = ConversationMemory(security_service.venice)
+    await conversations.start()
+    application.bot_data["conversations"] = conversations
+
+    # 4. Identidad del Bot
     me = await application.bot.get_me()
     application.bot_data["username"] = me.username
     logger.info(f"✅ Identidad confirmada: @{me.username}")
 
-    # 4. Registrar Comandos Nativos (UX)
+async def publish_commands(application: Application):
+    """Registra los menús nativos de Telegram (una vez por despliegue)."""
     # Scope: Usuarios (Privado)
     commands_private = [
         BotCommand("start", "Iniciar sistema"),
@@ -86,23 +118,53 @@ async def post_init(application: Application):
         BotCommand("purge", "Borrar mensajes (Ej: /purge 10)"),
         BotCommand("setlog", "Vincular canal de reportes"),
         BotCommand("setwelcome", "Configurar bienvenida"),
+        BotCommand("aimode", "Modo IA: sync o async"),
+        BotCommand("setflood", "Umbral anti-flood"),
+        BotCommand("addrule", "Agregar regla regex"),
+        BotCommand("delrule", "Eliminar regla"),
+        BotCommand("rules", "Ver reglas del chat"),
         BotCommand("info", "Ver info de usuario"),
     ]
     await application.bot.set_my_commands(commands_admin, scope=BotCommandScopeAllChatAdministrators())
     logger.info("📱 Menús nativos actualizados.")
 
-def main():
-    if not BOT_TOKEN:
-        logger.error("❌ BOT_TOKEN no encontrado en variables de entorno.")
-        return
+async def post_init(application: Application):
+    await init_services(application)
+    await publish_commands(application)
+
+async def post_stop(application: Application):
+    # El bot sigue operativo aquí: levantar Lockdowns y detener tareas en segundo plano
+    security_service = application.bot_data.get("security")
+    if security_service:
+        await security_service.stop()
+
+    # Persistir conversaciones (usa Venice y la DB: antes de cerrarlas)
+    conversations = application.bot_data.get("conversations")
+    if conversations:
+        await conversations.close()
+
+async def post_shutdown(application: Application):
+    logger.info("🔌 Apagando Servicios de Velzar...")
 
-    app = ApplicationBuilder().token(BOT_TOKEN).post_init(post_init).build()
+    # Venice AI (Cerrar sesión HTTP y conexiones keep-alive)
+    security_service = application.bot_data.get("security")
+    if security_service:
+        await security_service.venice.close()
 
-    # --- REGISTRO DE HANDLERS ---
+    # Base de Datos (Volcar write-behind y cerrar conexiones del pool)
+    await close_db()
+
+def register_handlers(app: Application):
+    """Registra todos los handlers del bot en la aplicación."""
+
+    # GRUPO -2: Registro de ids vistos (para /purge), antes de que Seguridad borre nada
+    app.add_handler(MessageHandler(filters.ALL, track_message), group=-2)
 
     # GRUPO -1: Seguridad (Prioridad Máxima)
     # Filtra textos y captions para análisis
     app.add_handler(MessageHandler(filters.TEXT | filters.CAPTION, security_middleware), group=-1)
+    # Ingresos al chat: detector Anti-Raid
+    app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, join_middleware), group=-1)
 
     # GRUPO 0: Comandos y Lógica Principal
 
@@ -121,17 +183,86 @@ def main():
     app.add_handler(CommandHandler("purge", purge_command))
     app.add_handler(CommandHandler("setlog", setlog_command))
     app.add_handler(CommandHandler("setwelcome", setwelcome_command))
+    app.add_handler(CommandHandler("aimode", aimode_command))
+    app.add_handler(CommandHandler("setflood", setflood_command))
+    app.add_handler(CommandHandler("addrule", addrule_command))
+    app.add_handler(CommandHandler("delrule", delrule_command))
+    app.add_handler(CommandHandler("rules", rules_command))
     app.add_handler(CommandHandler("check", check_command)) # Auditoría Manual
 
     # 3. Bienvenidas (Eventos de Chat)
     app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, welcome_new_member))
 
+    # Cambios de rango (Invalida el roster de admins en caché)
+    app.add_handler(ChatMemberHandler(chat_member_update_handler, ChatMemberHandler.ANY_CHAT_MEMBER))
+
     # 4. Chat Conversacional (Velzar Guardián)
     # Atrapa texto que no sea comando (Menciones y DMs se filtran dentro del handler)
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, chat_reply_handler))
 
-    logger.info("🚀 Velzar Security Bot (Versión Comercial) Operativo.")
-    app.run_polling()
+def application_builder() -> ApplicationBuilder:
+    """Builder base con token y, si se configuró, un servidor Bot API alternativo."""
+    builder = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(ChatOrderedUpdateProcessor())
+        .rate_limiter(OutboundScheduler())
+    )
+    if TELEGRAM_API_BASE:
+        builder = builder.base_url(TELEGRAM_API_BASE)
+    return builder
+
+def run_application(app: Application):
+    """Arranca la aplicación en el modo de ingesta configurado (BOT_MODE)."""
+    if BOT_MODE == "webhook":
+        from core.webhook_server import run_webhook
+        run_webhook(app)
+    else:
+        # ALL_TYPES: necesario para recibir actualizaciones chat_member
+        app.run_polling(allowed_updates=Update.ALL_TYPES)
+
+def build_application(builder=None, publish: bool = True) -> Application:
+    """
+    Construye la aplicación con servicios y handlers.
+    `publish=False` omite el registro de menús nativos (workers del modo multi-proceso).
+    """
+    builder = builder or application_builder()
+    app = (
+        builder
+        .post_init(post_init if publish else init_services)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+    register_handlers(app)
+    return app
+
+def main():
+    if not BOT_TOKEN:
+        logger.error("❌ BOT_TOKEN no encontrado en variables de entorno.")
+        return
+
+    if BOT_MODE == "webhook":
+        from core.webhook_server import webhook_config_error
+        error = webhook_config_error()
+        if error:
+            logger.error(f"❌ {error}")
+            return
+
+    # Modo multi-proceso: un proceso frontal reparte updates por chat_id entre N workers
+    if WORKER_PROCESSES > 1:
+        from core.sharding import run_sharded
+        logger.info(f"🚀 Velzar Security Bot (Versión Comercial) Operativo en {WORKER_PROCESSES} workers.")
+        run_sharded(
+            WORKER_PROCESSES, application_builder(), run_application,
+            front_post_init=publish_commands
+        )
+        return
+
+    app = build_application()
+
+    logger.info(f"🚀 Velzar Security Bot (Versión Comercial) Operativo. Modo: {BOT_MODE}")
+    run_application(app)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from config.settings import VENICE_BATCH_WINDOW_MS, VENICE_BATCH_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+class BatchClassifier:
+    """
+    Agrupa clasificaciones que llegan dentro de una ventana corta (o hasta N mensajes)
+    en una sola petición a la IA y reparte los veredictos a cada llamada en espera.
+    Si la respuesta del lote no se puede interpretar, clasifica mensaje por mensaje;
+    si la API falló, todos reciben el veredicto de fallo sin más peticiones.
+    """
+    def __init__(self, venice, window_ms: int = VENICE_BATCH_WINDOW_MS, max_size: int = VENICE_BATCH_MAX_SIZE):
+        self.venice = venice
+        self.window = window_ms / 1000
+        self.max_size = max(1, max_size)
+        self._pending = {}  # {model: [(text, future)]}
+        self._timers = {}   # {model: TimerHandle}
+        self._tasks = set()
+
+        # Métricas
+        self.batches = 0
+        self.batched_messages = 0
+        self.fallbacks = 0
+
+    async def classify(self, text: str, model: str, deadline: float = None) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        queue = self._pending.setdefault(model, [])
+        queue.append((text, future, deadline))
+
+        if len(queue) >= self.max_size:
+            self._dispatch(model)
+        elif model not in self._timers:
+            self._timers[model] = asyncio.get_running_loop().call_later(self.window, self._dispatch, model)
+
+        return await future
+
+    def _dispatch(self, model: str):
+        timer = self._timers.pop(model, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(model, [])
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run(batch, model))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list, model: str):
+        try:
+            texts = [text for text, _, _ in batch]
+            # El lote respeta el plazo más urgente de sus mensajes (la espera de la ventana ya cuenta)
+            deadlines = [deadline for _, _, deadline in batch if deadline is not None]
+            deadline = min(deadlines) if deadlines else None
+            if len(batch) == 1:
+                verdicts = [await self.venice._classify_uncached(texts[0], model, deadline)]
+            else:
+                self.batches += 1
+                self.batched_messages += len(batch)
+                verdicts = await self.venice._classify_batch(texts, model, deadline)
+
+                # Respuesta parcial o ilegible (no fallo de API): completar uno por uno
+                missing = [i for i, verdict in enumerate(verdicts) if verdict is None]
+                if missing:
+                    self.fallbacks += 1
+                    logger.warning(f"⚠️ Lote incompleto ({len(missing)}/{len(batch)}). Clasificando individualmente...")
+                    singles = await asyncio.gather(
+                        *(self.venice._classify_uncached(texts[i], model, deadline) for i in missing)
+                    )
+                    for i, verdict in zip(missing, singles):
+                        verdicts[i] = verdict
+
+            for (_, future, _), verdict in zip(batch, verdicts):
+                if not future.done():
+                    future.set_result(verdict)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def flush(self):
+        """Despacha los lotes abiertos sin esperar su ventana y espera los que están en curso (apagado)."""
+        for model in list(self._pending):
+            self._dispatch(model)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "batched_messages": self.batched_messages,
+            "avg_batch_size": round(self.batched_messages / self.batches, 2) if self.batches else 0.0,
+            "fallbacks": self.fallbacks,
+            "waiting": sum(len(q) for q in self._pending.values()),
+        }
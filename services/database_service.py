@@ -1,16 +1,304 @@
 import aiosqlite
+import asyncio
 import logging
 import os
-from config.settings import DATABASE_URL, ADMIN_USER_ID
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from config.settings import (
+    DATABASE_URL, ADMIN_USER_ID, DB_READ_POOL_SIZE, DB_BUSY_TIMEOUT_MS,
+    WRITE_BUFFER_FLUSH_INTERVAL, WRITE_BUFFER_MAX_PENDING,
+    USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL, USER_CACHE_MAX_BYTES,
+    CHAT_SETTINGS_CACHE_TTL
+)
+from utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 # Extraer ruta limpia (remover sqlite:///)
 DB_PATH = DATABASE_URL.replace("sqlite:///", "")
 
+# Pragmas aplicados a cada conexión del pool
+_CONNECTION_PRAGMAS = (
+    f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous = NORMAL",     # Seguro con WAL, evita fsync por commit
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",       # ~8 MB de caché de páginas por conexión
+    "PRAGMA mmap_size = 67108864",     # 64 MB mapeados en memoria
+)
+
+# --- POOL DE CONEXIONES ---
+
+class DatabasePool:
+    """
+    Conexiones SQLite persistentes: un único escritor serializado y un pool de lectores.
+    Evita abrir un hilo y un descriptor de archivo nuevos en cada consulta.
+    """
+    def __init__(self, path: str, readers: int = DB_READ_POOL_SIZE):
+        self.path = path
+        self.reader_count = max(1, readers)
+        self._writer = None
+        self._write_lock = asyncio.Lock()
+        self._start_lock = asyncio.Lock()
+        self._readers = None
+        self._all_readers = []
+
+    @property
+    def started(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self, read_only: bool = False):
+        db = await aiosqlite.connect(self.path)
+        db.row_factory = aiosqlite.Row
+        for pragma in _CONNECTION_PRAGMAS:
+            async with db.execute(pragma):
+                pass
+        if read_only:
+            async with db.execute("PRAGMA query_only = ON"):
+                pass
+        return db
+
+    async def start(self):
+        """Abre el escritor (activando WAL) y los lectores. Idempotente."""
+        async with self._start_lock:
+            if self.started:
+                return
+
+            writer = await self._connect()
+            # WAL permite lecturas concurrentes mientras el escritor trabaja
+            async with writer.execute("PRAGMA journal_mode = WAL"):
+                pass
+
+            readers = asyncio.Queue()
+            for _ in range(self.reader_count):
+                reader = await self._connect(read_only=True)
+                self._all_readers.append(reader)
+                readers.put_nowait(reader)
+
+            self._readers = readers
+            self._writer = writer
+            logger.info(f"🗄️ Pool SQLite listo (1 escritor, {self.reader_count} lectores, WAL).")
+
+    async def close(self):
+        """Cierra todas las conexiones del pool."""
+        async with self._start_lock:
+            if not self.started:
+                return
+            async with self._write_lock:
+                await self._writer.close()
+                self._writer = None
+            for reader in self._all_readers:
+                await reader.close()
+            self._all_readers = []
+            self._readers = None
+            logger.info("🗄️ Pool SQLite cerrado.")
+
+    @asynccontextmanager
+    async def writer(self):
+        """Conexión de escritura exclusiva. Hace rollback si el bloque falla o se cancela."""
+        if not self.started:
+            await self.start()
+        async with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                # También CancelledError: la transacción no puede quedar abierta en el escritor compartido
+                await self._writer.rollback()
+                raise
+
+    @asynccontextmanager
+    async def reader(self):
+        """Toma prestada una conexión de solo lectura del pool."""
+        if not self.started:
+            await self.start()
+        readers = self._readers
+        db = await readers.get()
+        try:
+            yield db
+        finally:
+            readers.put_nowait(db)
+
+db_pool = DatabasePool(DB_PATH)
+
+# --- COLA WRITE-BEHIND (Trust Score y Baneos) ---
+
+class WriteBehindBuffer:
+    """
+    Saca las escrituras frecuentes del camino crítico de moderación.
+    - Trust Score: los cambios por usuario se fusionan (N incrementos -> un solo UPDATE).
+    - Baneos: los registros se insertan en lote con executemany.
+    Todo se vuelca en una sola transacción por tamaño, por tiempo o al apagar.
+    """
+    def __init__(self, pool: DatabasePool,
+                 flush_interval: float = WRITE_BUFFER_FLUSH_INTERVAL,
+                 max_pending: int = WRITE_BUFFER_MAX_PENDING):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._trust = {}  # {user_id: (reset, delta)}
+        self._flushing = {}  # Cambios de trust del volcado en curso (aún sin commit)
+        self._bans = []   # [(user_id, chat_id, reason, admin_id, timestamp)]
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._pending_flush = None
+
+        # Métricas
+        self.flush_count = 0
+        self.rows_flushed = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def depth(self) -> int:
+        """Operaciones pendientes de escribir."""
+        return len(self._trust) + len(self._bans)
+
+    def stats(self) -> dict:
+        avg = self._total_flush_ms / self.flush_count if self.flush_count else 0.0
+        return {
+            "queue_depth": self.depth,
+            "pending_trust_users": len(self._trust),
+            "pending_bans": len(self._bans),
+            "flushes": self.flush_count,
+            "rows_flushed": self.rows_flushed,
+            "flush_errors": self.flush_errors,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(avg, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+            logger.info(f"📝 Write-behind activo (cada {self.flush_interval}s o {self.max_pending} ops).")
+
+    async def stop(self):
+        """Detiene el volcado periódico y escribe todo lo pendiente."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pending_flush is not None:
+            await asyncio.gather(self._pending_flush, return_exceptions=True)
+        await self.flush()
+        logger.info(f"📝 Write-behind detenido. {self.stats()}")
+
+    def pending_trust(self, user_id: int, trust_score: int) -> int:
+        """Trust Score leído de la DB más los cambios de `user_id` que aún no se escribieron."""
+        for pending in (self._flushing, self._trust):
+            change = pending.get(user_id)
+            if change is not None:
+                reset, delta = change
+                trust_score = max(0, delta if reset else trust_score + delta)
+        return trust_score
+
+    async def add_trust_change(self, user_id: int, delta: int = 0, reset: bool = False):
+        if reset:
+            self._trust[user_id] = (True, 0)
+        else:
+            prev_reset, prev_delta = self._trust.get(user_id, (False, 0))
+            self._trust[user_id] = (prev_reset, prev_delta + delta)
+        await self._after_enqueue()
+
+    async def add_ban(self, user_id: int, chat_id: int, reason: str, admin_id: int):
+        # Conservamos la hora real del evento (mismo formato que CURRENT_TIMESTAMP)
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        self._bans.append((user_id, chat_id, reason, admin_id, timestamp))
+        await self._after_enqueue()
+
+    async def _after_enqueue(self):
+        if not self.running:
+            # Sin bucle activo (scripts, mantenimiento): escritura inmediata
+            await self.flush()
+        elif self.depth >= self.max_pending and self._pending_flush is None:
+            self._pending_flush = asyncio.create_task(self._flush_now())
+
+    async def _flush_now(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error volcando write-behind: {e}")
+        finally:
+            self._pending_flush = None
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error volcando write-behind: {e}")
+
+    async def flush(self):
+        """Escribe todas las operaciones pendientes en una única transacción."""
+        async with self._flush_lock:
+            if not self._trust and not self._bans:
+                return
+
+            trust, self._trust = self._trust, {}
+            bans, self._bans = self._bans, []
+
+            resets = [(delta, uid) for uid, (reset, delta) in trust.items() if reset]
+            deltas = [(delta, uid) for uid, (reset, delta) in trust.items() if not reset and delta]
+
+            start = time.perf_counter()
+            self._flushing = trust
+            try:
+                async with self.pool.writer() as db:
+                    if resets:
+                        await db.executemany("UPDATE users SET trust_score = MAX(0, ?) WHERE user_id = ?", resets)
+                    if deltas:
+                        await db.executemany("UPDATE users SET trust_score = MAX(0, trust_score + ?) WHERE user_id = ?", deltas)
+                    if bans:
+                        await db.executemany(
+                            "INSERT INTO bans (user_id, chat_id, reason, admin_id, timestamp) VALUES (?, ?, ?, ?, ?)",
+                            bans
+                        )
+                    await db.commit()
+            except BaseException:
+                # También si se cancela el volcado: el lote vuelve a la cola para el volcado final
+                self.flush_errors += 1
+                self._requeue(trust, bans)
+                raise
+            finally:
+                self._flushing = {}
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.flush_count += 1
+            self.rows_flushed += len(resets) + len(deltas) + len(bans)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+
+    def _requeue(self, trust: dict, bans: list):
+        """Devuelve a la cola un lote fallido sin pisar cambios más recientes."""
+        for user_id, (reset, delta) in trust.items():
+            newer = self._trust.get(user_id)
+            if newer is None:
+                self._trust[user_id] = (reset, delta)
+            elif not newer[0]:
+                self._trust[user_id] = (reset, delta + newer[1])
+        self._bans = bans + self._bans
+
+write_buffer = WriteBehindBuffer(db_pool)
+
+async def close_db():
+    """Vuelca escrituras pendientes y cierra el pool (llamar al apagar el bot)."""
+    await write_buffer.stop()
+    await db_pool.close()
+
 async def init_db():
     """Inicializa las tablas de la base de datos."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with db_pool.writer() as db:
         # Tabla de Usuarios (Identidad Básica y Reputación)
         await db.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -62,110 +350,320 @@ async def init_db():
                 welcome_enabled BOOLEAN DEFAULT 0
             )
         """)
+        try:
+            await db.execute("ALTER TABLE chat_settings ADD COLUMN ai_async_review BOOLEAN DEFAULT 0")
+        except:
+            pass
+        try:
+            await db.execute("ALTER TABLE chat_settings ADD COLUMN flood_limit INTEGER")
+        except:
+            pass
+        try:
+            await db.execute("ALTER TABLE chat_settings ADD COLUMN flood_window REAL")
+        except:
+            pass
+
+        # Tabla de Veredictos IA (Caché persistente de clasificaciones)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS verdict_cache (
+                text_hash TEXT PRIMARY KEY,
+                verdict TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+        # Tabla de Reglas por Chat (Capa 2 personalizada)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                pattern TEXT NOT NULL,
+                action TEXT DEFAULT 'ban',
+                priority INTEGER DEFAULT 100,
+                enabled BOOLEAN DEFAULT 1,
+                created_by INTEGER,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_rules_chat ON rules (chat_id)")
+
+        # Tabla de Conversaciones (Memoria de chat desalojada de RAM)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                chat_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                summary TEXT,
+                turns TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (chat_id, user_id)
+            )
+        """)
+
+        # Tabla de Versiones (Detección de cambios entre procesos)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS meta_versions (
+                key TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
 
         await db.commit()
         logger.info("✅ Base de datos inicializada.")
 
 # --- GESTIÓN DE USUARIOS ---
 
+# Registros de usuario en memoria (LRU + TTL). Write-through con update_trust_score.
+user_cache = TTLCache(
+    max_entries=USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_TTL, max_bytes=USER_CACHE_MAX_BYTES
+)
+
 async def get_or_create_user(user_id: int, username: str):
-    """Obtiene un usuario o lo crea si es nuevo."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    """Obtiene un usuario (caché primero) o lo crea si es nuevo."""
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    async with db_pool.reader() as db:
         async with db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)) as cursor:
-            user = await cursor.fetchone()
-
-            if not user:
-                await db.execute(
-                    "INSERT INTO users (user_id, username, trust_score, credits) VALUES (?, ?, 0, 0)",
-                    (user_id, username)
-                )
-                await db.commit()
-                async with db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)) as cursor:
-                    user = await cursor.fetchone()
-            return user
+            row = await cursor.fetchone()
+
+    if not row:
+        async with db_pool.writer() as db:
+            await db.execute(
+                "INSERT OR IGNORE INTO users (user_id, username, trust_score, credits) VALUES (?, ?, 0, 0)",
+                (user_id, username)
+            )
+            await db.commit()
+            async with db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)) as cursor:
+                row = await cursor.fetchone()
+
+    return _cache_user(row)
+
+def _cache_user(row) -> dict:
+    """Guarda la fila en caché con los cambios de Trust Score aún en el write-behind."""
+    user = dict(row)
+    user["trust_score"] = write_buffer.pending_trust(user["user_id"], user["trust_score"] or 0)
+    user_cache.set(user["user_id"], user)
+    return user
 
 async def get_user(user_id: int):
     """Obtiene datos de un usuario por ID."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    async with db_pool.reader() as db:
         async with db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)) as cursor:
-            return await cursor.fetchone()
+            row = await cursor.fetchone()
+    if not row:
+        return None
+    return _cache_user(row)
 
 async def update_trust_score(user_id: int, increment: bool = True, reset: bool = False):
-    """Actualiza el nivel de confianza (Trust Score) de un usuario."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        if reset:
-            await db.execute("UPDATE users SET trust_score = 0 WHERE user_id = ?", (user_id,))
-        elif increment:
-            # Tope máximo opcional, pero por ahora infinito
-            await db.execute("UPDATE users SET trust_score = trust_score + 1 WHERE user_id = ?", (user_id,))
-        else:
-             # Decremento (no especificado en plan, pero útil)
-             await db.execute("UPDATE users SET trust_score = MAX(0, trust_score - 1) WHERE user_id = ?", (user_id,))
+    """Actualiza el nivel de confianza (Trust Score) de un usuario (vía write-behind)."""
+    cached = user_cache.get(user_id, touch=False)
 
-        await db.commit()
+    if reset:
+        await write_buffer.add_trust_change(user_id, reset=True)
+        if cached is not None:
+            cached["trust_score"] = 0
+    elif increment:
+        # Tope máximo opcional, pero por ahora infinito
+        await write_buffer.add_trust_change(user_id, delta=1)
+        if cached is not None:
+            cached["trust_score"] += 1
+    else:
+        # Decremento (no especificado en plan, pero útil)
+        await write_buffer.add_trust_change(user_id, delta=-1)
+        if cached is not None:
+            cached["trust_score"] = max(0, cached["trust_score"] - 1)
 
 # --- GESTIÓN DE CONFIGURACIÓN DE CHAT ---
 
+# Configuración por chat en memoria ({} = chat sin configuración). Se invalida al escribir.
+chat_settings_cache = TTLCache(max_entries=10000, ttl=CHAT_SETTINGS_CACHE_TTL)
+
 async def get_chat_settings(chat_id: int):
-    """Obtiene la configuración de un chat."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    """Obtiene la configuración de un chat (caché primero)."""
+    settings = chat_settings_cache.get(chat_id)
+    if settings is not None:
+        return settings
+
+    async with db_pool.reader() as db:
         async with db.execute("SELECT * FROM chat_settings WHERE chat_id = ?", (chat_id,)) as cursor:
-            return await cursor.fetchone()
+            row = await cursor.fetchone()
+
+    settings = dict(row) if row else {}
+    chat_settings_cache.set(chat_id, settings)
+    return settings
 
 async def update_chat_log_channel(chat_id: int, log_channel_id: int):
     """Establece el canal de logs para un grupo."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with db_pool.writer() as db:
         await db.execute("""
             INSERT INTO chat_settings (chat_id, log_channel_id) VALUES (?, ?)
             ON CONFLICT(chat_id) DO UPDATE SET log_channel_id = excluded.log_channel_id
         """, (chat_id, log_channel_id))
         await db.commit()
+    chat_settings_cache.pop(chat_id)
 
 async def update_welcome_message(chat_id: int, message: str, enabled: bool = True):
     """Establece el mensaje de bienvenida."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with db_pool.writer() as db:
         await db.execute("""
             INSERT INTO chat_settings (chat_id, welcome_message, welcome_enabled) VALUES (?, ?, ?)
             ON CONFLICT(chat_id) DO UPDATE SET welcome_message = excluded.welcome_message, welcome_enabled = excluded.welcome_enabled
         """, (chat_id, message, enabled))
         await db.commit()
+    chat_settings_cache.pop(chat_id)
+
+async def update_ai_review_mode(chat_id: int, enabled: bool):
+    """Activa/desactiva la revisión IA asíncrona (permitir y revisar) en un chat."""
+    async with db_pool.writer() as db:
+        await db.execute("""
+            INSERT INTO chat_settings (chat_id, ai_async_review) VALUES (?, ?)
+            ON CONFLICT(chat_id) DO UPDATE SET ai_async_review = excluded.ai_async_review
+        """, (chat_id, enabled))
+        await db.commit()
+    chat_settings_cache.pop(chat_id)
+
+async def update_flood_settings(chat_id: int, limit: int, window: float):
+    """Establece el umbral anti-flood del chat (mensajes por ventana de segundos)."""
+    async with db_pool.writer() as db:
+        await db.execute("""
+            INSERT INTO chat_settings (chat_id, flood_limit, flood_window) VALUES (?, ?, ?)
+            ON CONFLICT(chat_id) DO UPDATE SET flood_limit = excluded.flood_limit, flood_window = excluded.flood_window
+        """, (chat_id, limit, window))
+        await db.commit()
+    chat_settings_cache.pop(chat_id)
 
 # --- SEGURIDAD Y BANEOS (Registro Velzar) ---
 
 async def add_ban_log(user_id: int, chat_id: int, reason: str, admin_id: int):
-    """Registra una acción de baneo."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            "INSERT INTO bans (user_id, chat_id, reason, admin_id) VALUES (?, ?, ?, ?)",
-            (user_id, chat_id, reason, admin_id)
-        )
-        await db.commit()
+    """Registra una acción de baneo (vía write-behind)."""
+    await write_buffer.add_ban(user_id, chat_id, reason, admin_id)
 
 async def get_ban_list(limit: int = 10):
     """Obtiene baneos recientes."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    await write_buffer.flush()  # Incluir registros aún en cola
+    async with db_pool.reader() as db:
         async with db.execute("SELECT * FROM bans ORDER BY timestamp DESC LIMIT ?", (limit,)) as cursor:
             return await cursor.fetchall()
 
+# --- CONTADORES DE VERSIÓN ---
+
+async def _bump_version(db, key: str) -> int:
+    """Incrementa un contador de versión dentro de la transacción abierta."""
+    await db.execute("""
+        INSERT INTO meta_versions (key, version) VALUES (?, 1)
+        ON CONFLICT(key) DO UPDATE SET version = version + 1
+    """, (key,))
+    async with db.execute("SELECT version FROM meta_versions WHERE key = ?", (key,)) as cursor:
+        row = await cursor.fetchone()
+        return row[0]
+
+async def get_version(key: str) -> int:
+    """Versión actual de un recurso compartido (0 si nunca cambió)."""
+    async with db_pool.reader() as db:
+        async with db.execute("SELECT version FROM meta_versions WHERE key = ?", (key,)) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else 0
+
+async def get_versions(prefix: str) -> dict:
+    """Todas las versiones cuya clave empieza con `prefix` -> {clave: versión}."""
+    async with db_pool.reader() as db:
+        async with db.execute(
+            "SELECT key, version FROM meta_versions WHERE key LIKE ? || '%'", (prefix,)
+        ) as cursor:
+            return {row[0]: row[1] for row in await cursor.fetchall()}
+
+# --- REGLAS POR CHAT (Capa 2) ---
+
+RULES_VERSION_PREFIX = "rules:"
+
+async def add_rule(chat_id: int, pattern: str, action: str, priority: int, created_by: int) -> int:
+    """Agrega una regla al chat. Retorna el ID de la regla."""
+    async with db_pool.writer() as db:
+        cursor = await db.execute(
+            "INSERT INTO rules (chat_id, pattern, action, priority, created_by) VALUES (?, ?, ?, ?, ?)",
+            (chat_id, pattern, action, priority, created_by)
+        )
+        rule_id = cursor.lastrowid
+        await cursor.close()
+        await _bump_version(db, f"{RULES_VERSION_PREFIX}{chat_id}")
+        await db.commit()
+        return rule_id
+
+async def remove_rule(chat_id: int, rule_id: int) -> bool:
+    """Elimina una regla del chat. Retorna False si no existía."""
+    async with db_pool.writer() as db:
+        cursor = await db.execute("DELETE FROM rules WHERE id = ? AND chat_id = ?", (rule_id, chat_id))
+        removed = cursor.rowcount > 0
+        await cursor.close()
+        if removed:
+            await _bump_version(db, f"{RULES_VERSION_PREFIX}{chat_id}")
+        await db.commit()
+        return removed
+
+async def get_chat_rules(chat_id: int, only_enabled: bool = True):
+    """Reglas de un chat ordenadas por prioridad."""
+    query = "SELECT * FROM rules WHERE chat_id = ?"
+    if only_enabled:
+        query += " AND enabled = 1"
+    async with db_pool.reader() as db:
+        async with db.execute(query + " ORDER BY priority, id", (chat_id,)) as cursor:
+            return await cursor.fetchall()
+
 # --- GESTIÓN DE ADMINS AUTORIZADOS ---
 
-async def add_authorized_admin(user_id: int, added_by: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+AUTHORIZED_ADMINS_VERSION_KEY = "authorized_admins"
+
+async def add_authorized_admin(user_id: int, added_by: int) -> int:
+    """Autoriza un admin. Retorna la nueva versión del conjunto."""
+    async with db_pool.writer() as db:
         await db.execute("INSERT OR IGNORE INTO authorized_admins (user_id, added_by) VALUES (?, ?)", (user_id, added_by))
+        version = await _bump_version(db, AUTHORIZED_ADMINS_VERSION_KEY)
         await db.commit()
+        return version
 
-async def remove_authorized_admin(user_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+async def remove_authorized_admin(user_id: int) -> int:
+    """Revoca un admin. Retorna la nueva versión del conjunto."""
+    async with db_pool.writer() as db:
         await db.execute("DELETE FROM authorized_admins WHERE user_id = ?", (user_id,))
+        version = await _bump_version(db, AUTHORIZED_ADMINS_VERSION_KEY)
         await db.commit()
+        return version
 
 async def get_authorized_admins():
     """Devuelve un conjunto de user_ids autorizados."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with db_pool.reader() as db:
         async with db.execute("SELECT user_id FROM authorized_admins") as cursor:
             rows = await cursor.fetchall()
             return {row[0] for row in rows}
+
+# --- MEMORIA DE CONVERSACIÓN (Chat con Velzar) ---
+
+async def save_conversation(chat_id: int, user_id: int, summary: str, turns: str, updated_at: float):
+    """Guarda (o reemplaza) una conversación desalojada de memoria. `turns` va en JSON."""
+    async with db_pool.writer() as db:
+        await db.execute("""
+            INSERT OR REPLACE INTO conversations (chat_id, user_id, summary, turns, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (chat_id, user_id, summary, turns, updated_at))
+        await db.commit()
+
+async def load_conversation(chat_id: int, user_id: int):
+    async with db_pool.reader() as db:
+        async with db.execute(
+            "SELECT summary, turns, updated_at FROM conversations WHERE chat_id = ? AND user_id = ?",
+            (chat_id, user_id)
+        ) as cursor:
+            row = await cursor.fetchone()
+    return dict(row) if row else None
+
+async def purge_conversations(older_than: float) -> int:
+    """Elimina conversaciones inactivas desde antes de `older_than` (epoch). Retorna cuántas."""
+    async with db_pool.writer() as db:
+        cursor = await db.execute("DELETE FROM conversations WHERE updated_at < ?", (older_than,))
+        await db.commit()
+        return cursor.rowcount
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from config.settings import (
+    ROUTER_WINDOW, ROUTER_MIN_SAMPLES, ROUTER_FAILURE_THRESHOLD, ROUTER_ERROR_RATE,
+    ROUTER_OPEN_SECONDS, ROUTER_MAX_OPEN_SECONDS, ROUTER_HEDGE_ENABLED, ROUTER_HEDGE_MIN_DELAY,
+    ROUTER_SAMPLE_TTL
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"        # Sano: recibe tráfico
+OPEN = "open"            # Fallando: se omite hasta que pase el enfriamiento
+HALF_OPEN = "half_open"  # Enfriamiento cumplido: una sola petición de prueba
+
+UNKNOWN_LATENCY = 2.0    # Latencia supuesta de un modelo sin muestras (s)
+PREFERENCE_BIAS = 0.5    # Penalización por posición en la lista (el primario gana en empate)
+ERROR_PENALTY = 10.0     # Segundos equivalentes por cada 100% de errores
+
+class ModelHealth:
+    """Estadísticas móviles (latencia y errores) y circuit breaker de un modelo."""
+    def __init__(self, name: str, window: int = ROUTER_WINDOW):
+        self.name = name
+        self.samples = deque(maxlen=window)  # (timestamp, latencia, ok)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.cooldown = ROUTER_OPEN_SECONDS
+        self.probing = False
+
+        # Métricas
+        self.requests = 0
+        self.failures = 0
+        self.trips = 0
+
+    def _recent(self) -> list:
+        """Muestras vigentes: las viejas caducan para que un modelo penalizado vuelva a competir."""
+        oldest = time.monotonic() - ROUTER_SAMPLE_TTL
+        return [(latency, ok) for timestamp, latency, ok in self.samples if timestamp >= oldest]
+
+    def error_rate(self) -> float:
+        samples = self._recent()
+        if not samples:
+            return 0.0
+        return sum(1 for _, ok in samples if not ok) / len(samples)
+
+    def p95(self):
+        latencies = sorted(latency for latency, ok in self._recent() if ok)
+        if len(latencies) < ROUTER_MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def available(self, now: float) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now >= self.open_until:
+            self.state = HALF_OPEN
+        return self.state == HALF_OPEN and not self.probing
+
+    def score(self, position: int) -> float:
+        """Menor = más sano (errores pesan más que latencia; el orden configurado desempata)."""
+        p95 = self.p95()
+        return self.error_rate() * ERROR_PENALTY + (p95 if p95 is not None else UNKNOWN_LATENCY) + position * PREFERENCE_BIAS
+
+    def record(self, ok: bool, latency: float):
+        self.requests += 1
+        sample = (time.monotonic(), latency, ok)
+        self.samples.append(sample)
+        if ok:
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                logger.info(f"✅ Modelo {self.name} recuperado. Circuito cerrado.")
+                self.samples.clear()
+                self.samples.append(sample)
+            self.state = CLOSED
+            self.cooldown = ROUTER_OPEN_SECONDS
+            return
+
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            # La prueba falló: de vuelta a abierto con enfriamiento más largo
+            self.cooldown = min(self.cooldown * 2, ROUTER_MAX_OPEN_SECONDS)
+            self._trip()
+        elif self.state == CLOSED and (
+            self.consecutive_failures >= ROUTER_FAILURE_THRESHOLD
+            or (len(self._recent()) >= ROUTER_MIN_SAMPLES and self.error_rate() >= ROUTER_ERROR_RATE)
+        ):
+            self._trip()
+
+    def _trip(self):
+        self.state = OPEN
+        self.open_until = time.monotonic() + self.cooldown
+        self.trips += 1
+        logger.warning(f"🔌 Circuito abierto para {self.name} ({self.cooldown:.0f}s). Error rate {self.error_rate():.0%}.")
+
+    def stats(self) -> dict:
+        p95 = self.p95()
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate(), 3),
+            "p95_ms": round(p95 * 1000) if p95 is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "trips": self.trips,
+        }
+
+class ModelRouter:
+    """
+    Enruta cada petición al modelo más sano de la lista.
+    - Modelos con el circuito abierto se omiten (sin gastar segundos en un modelo caído).
+    - Fallo -> siguiente modelo de inmediato.
+    - Hedging: si el elegido tarda más que su p95, se lanza la misma petición al siguiente
+      y se usa la primera respuesta válida.
+    `func(model)` debe devolver el resultado, o None si falló.
+    Con `deadline` (loop.time() absoluto) no se prueban más modelos una vez vencido el plazo.
+    """
+    def __init__(self, models: list, hedge: bool = ROUTER_HEDGE_ENABLED):
+        self.models = list(dict.fromkeys(models))  # Orden de preferencia, sin duplicados
+        self.health = {model: ModelHealth(model) for model in self.models}
+        self.hedge = hedge
+        self._background = set()
+
+        # Métricas
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.rejected = 0
+
+    def ranked(self) -> list:
+        """Modelos disponibles, del más sano al menos sano."""
+        now = time.monotonic()
+        available = [(h.score(i), model) for i, (model, h) in enumerate(self.health.items()) if h.available(now)]
+        return [model for _, model in sorted(available)]
+
+    def begin(self, model: str) -> bool:
+        """
+        Reserva `model` para una petición. En half-open solo se admite una prueba a la vez:
+        retorna False si otra petición ya la está haciendo (o el circuito sigue abierto).
+        """
+        health = self.health.get(model)
+        if health is None:
+            return True  # Modelo fuera del pool (elegido explícitamente)
+        if not health.available(time.monotonic()):
+            return False
+        if health.state == HALF_OPEN:
+            health.probing = True
+        return True
+
+    def release(self, model: str):
+        """Libera la prueba de `model` sin registrar resultado (petición abandonada)."""
+        health = self.health.get(model)
+        if health:
+            health.probing = False
+
+    def record(self, model: str, ok: bool, latency: float):
+        health = self.health.get(model)
+        if health:
+            health.probing = False
+            health.record(ok, latency)
+
+    async def call(self, func, hedge: bool = None, deadline: float = None):
+        hedge = self.hedge if hedge is None else hedge
+        candidates = self.ranked()
+        if not candidates:
+            self.rejected += 1
+            logger.warning("⛔ Todos los modelos con circuito abierto. Petición rechazada sin llamar a la API.")
+            return None
+
+        pending = {}  # task -> (modelo, inicio)
+        hedged = set()
+        queue = list(candidates)
+
+        def launch_next():
+            """Lanza el siguiente modelo que se pueda reservar (la lista pudo cambiar mientras tanto)."""
+            while queue:
+                model = queue.pop(0)
+                if self.begin(model):
+                    task = asyncio.create_task(func(model))
+                    pending[task] = (model, time.monotonic())
+                    return model
+            return None
+
+        loop = asyncio.get_running_loop()
+        if launch_next() is None:
+            self.rejected += 1
+            logger.warning("⛔ Modelos disponibles ya en prueba. Petición rechazada sin llamar a la API.")
+            return None
+        try:
+            while pending:
+                timeout = None
+                if hedge and queue and len(pending) == 1:
+                    (model, started), = pending.values()
+                    p95 = self.health[model].p95()
+                    if p95 is not None:
+                        timeout = max(max(p95, ROUTER_HEDGE_MIN_DELAY) - (time.monotonic() - started), 0)
+                        if deadline is not None and loop.time() + timeout >= deadline:
+                            timeout = None  # Sin tiempo para una cobertura útil
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # El elegido superó su p95: petición de cobertura al siguiente modelo
+                    backup = launch_next()
+                    if backup is not None:
+                        self.hedges += 1
+                        hedged.add(backup)
+                        logger.info(f"⏱️ Hedge: {model} supera su p95. Consultando también {backup}.")
+                    continue
+
+                for task in done:
+                    model, started = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.error(f"Excepción en modelo {model}: {e}")
+                        result = None
+                    self.record(model, result is not None, time.monotonic() - started)
+                    if result is not None:
+                        if model in hedged:
+                            self.hedge_wins += 1
+                        return result
+
+                if not pending and queue:
+                    if deadline is not None and loop.time() >= deadline:
+                        logger.warning("⏱️ Deadline agotado: no se prueban más modelos.")
+                        break
+                    launch_next()
+            return None
+        finally:
+            # Las peticiones perdedoras terminan en segundo plano: su latencia real alimenta las estadísticas
+            for task, (model, started) in pending.items():
+                self._background.add(task)
+                task.add_done_callback(lambda t, m=model, s=started: self._finish_background(t, m, s))
+
+    def _finish_background(self, task, model: str, started: float):
+        self._background.discard(task)
+        ok = not task.cancelled() and task.exception() is None and task.result() is not None
+        self.record(model, ok, time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            "models": {model: health.stats() for model, health in self.health.items()},
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,115 @@
+import logging
+import random
+import time
+from utils.ratelimit_headers import reset_seconds
+from config.settings import (
+    VENICE_DEADLINE_CLASSIFY, VENICE_DEADLINE_CHAT, VENICE_DEADLINE_IMAGE,
+    VENICE_RETRY_BUDGET_RATIO, VENICE_RETRY_BUDGET_MIN
+)
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Turno en el limitador de Venice (menor = antes): la moderación nunca espera detrás del chat
+PRIORITY_MODERATION = 0
+PRIORITY_CHAT = 1
+PRIORITY_IMAGE = 2
+
+class RetryPolicy:
+    """
+    Política de reintentos de una llamada a Venice.
+    - `deadline`: tiempo total máximo (incluye esperas y reintentos) -> peor caso acotado.
+    - Backoff exponencial con jitter completo: espera aleatoria en [0, min(max_delay, base * 2^intento)].
+    - `priority`: turno en el limitador de Venice (menor = antes).
+    """
+    __slots__ = ("name", "deadline", "max_attempts", "base_delay", "max_delay", "priority")
+
+    def __init__(self, name: str, deadline: float, max_attempts: int = 3, base_delay: float = 0.25, max_delay: float = 4.0, priority: int = PRIORITY_CHAT):
+        self.name = name
+        self.priority = priority
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+# Moderación: pocos segundos (el mensaje espera veredicto). Imágenes: generosas.
+CLASSIFY_POLICY = RetryPolicy("classify", VENICE_DEADLINE_CLASSIFY, max_attempts=3, base_delay=0.2, max_delay=2.0, priority=PRIORITY_MODERATION)
+CHAT_POLICY = RetryPolicy("chat", VENICE_DEADLINE_CHAT, max_attempts=3, base_delay=0.5, max_delay=5.0, priority=PRIORITY_CHAT)
+IMAGE_POLICY = RetryPolicy("image", VENICE_DEADLINE_IMAGE, max_attempts=2, base_delay=1.0, max_delay=10.0, priority=PRIORITY_IMAGE)
+
+class RetryBudget:
+    """
+    Presupuesto de reintentos compartido: cada petición deposita `ratio` tokens y cada reintento gasta uno.
+    Si la API cae, los reintentos quedan acotados a ~`ratio` del tráfico (sin tormentas de reintentos).
+    `min_per_second` asegura algunos reintentos con poco tráfico.
+    """
+    def __init__(self, ratio: float = VENICE_RETRY_BUDGET_RATIO, min_per_second: float = VENICE_RETRY_BUDGET_MIN):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = max(10.0, min_per_second * 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+        # Métricas
+        self.retries = 0
+        self.denied = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.min_per_second)
+        self.updated = now
+
+    def deposit(self):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.retries += 1
+            return True
+        self.denied += 1
+        return False
+
+    def stats(self) -> dict:
+        return {"retries": self.retries, "denied": self.denied, "tokens": round(self.tokens, 2)}
+
+def retry_after_seconds(headers) -> float:
+    """Espera sugerida por la API en una respuesta 429/503 (Retry-After o reinicio del límite)."""
+    for name in ("Retry-After", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        if headers.get(name):
+            return reset_seconds(headers[name])
+    return 0.0
+
+class RateLimitThrottle:
+    """
+    Freno global tras un 429: todas las llamadas esperan el Retry-After indicado por Venice
+    (o fallan al instante si la espera no cabe en su deadline).
+    El cupo por modelo de las cabeceras x-ratelimit-* lo gestiona `AdaptiveLimiter`.
+    """
+    def __init__(self):
+        self.blocked_until = 0.0
+
+        # Métricas
+        self.throttled = 0
+
+    def block(self, seconds: float):
+        until = time.monotonic() + seconds
+        if until > self.blocked_until:
+            self.blocked_until = until
+            self.throttled += 1
+            logger.warning(f"🚦 Límite de Venice agotado. Pausando llamadas {seconds:.1f}s.")
+
+    def wait_time(self) -> float:
+        return max(0.0, self.blocked_until - time.monotonic())
+
+    def stats(self) -> dict:
+        return {
+            "throttled": self.throttled,
+            "blocked_for": round(self.wait_time(), 2),
+        }
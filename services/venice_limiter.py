@@ -0,0 +1,223 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from services.retry_policy import PRIORITY_MODERATION, PRIORITY_CHAT, PRIORITY_IMAGE
+from utils.ratelimit_headers import parse_int, reset_seconds
+from config.settings import LIMITER_SHED_CHAT, LIMITER_SHED_IMAGE, LIMITER_MAX_QUEUE
+
+logger = logging.getLogger(__name__)
+
+# Fracción mínima de presupuesto restante para admitir trabajo de cada prioridad (moderación: nunca se descarta)
+SHED_THRESHOLDS = {
+    PRIORITY_MODERATION: 0.0,
+    PRIORITY_CHAT: LIMITER_SHED_CHAT,
+    PRIORITY_IMAGE: LIMITER_SHED_IMAGE,
+}
+
+class VeniceBusyError(Exception):
+    """Señal de descarte: el presupuesto de Venice se reserva para la moderación."""
+
+def estimate_request_tokens(payload: dict) -> int:
+    """Tokens estimados de una petición (prompt ~4 caracteres/token + max_tokens)."""
+    prompt = sum(len(str(m.get("content", ""))) for m in payload.get("messages", ()))
+    return prompt // 4 + int(payload.get("max_tokens", 0))
+
+def _header(headers, name, parse):
+    value = headers.get(name)
+    return parse(value) if value is not None else None
+
+class _Bucket:
+    """Cupo de una ventana de Venice (peticiones o tokens): límite, restante y reinicio."""
+    __slots__ = ("limit", "remaining", "reset_at")
+
+    def __init__(self):
+        self.limit = None      # None = límite aún desconocido (sin freno)
+        self.remaining = None
+        self.reset_at = 0.0
+
+    def refresh(self, now: float):
+        if self.limit is not None and now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = float("inf")  # Hasta que una respuesta informe la próxima ventana
+
+    def fraction(self):
+        if not self.limit or self.remaining is None:
+            return None
+        return self.remaining / self.limit
+
+    def update(self, limit, remaining, reset):
+        if limit is not None:
+            self.limit = limit
+        if remaining is not None:
+            # Dentro de una ventana conocida solo se baja: la cabecera no cuenta las peticiones en vuelo
+            known_window = self.remaining is not None and self.reset_at != float("inf")
+            self.remaining = min(self.remaining, remaining) if known_window else remaining
+        if reset is not None:
+            self.reset_at = time.monotonic() + reset
+
+class ModelBudget:
+    """Cubetas de peticiones y tokens de un modelo, más su cola de espera por prioridad."""
+    def __init__(self, model: str):
+        self.model = model
+        self.requests = _Bucket()
+        self.tokens = _Bucket()
+        self.waiters = []   # heap [prioridad, secuencia, tokens, future]
+        self.timer = None
+
+    def try_take(self, tokens: int) -> bool:
+        now = time.monotonic()
+        self.requests.refresh(now)
+        self.tokens.refresh(now)
+        if self.requests.remaining is not None and self.requests.remaining < 1:
+            return False
+        if self.tokens.remaining is not None:
+            # Una petición más grande que la ventana completa no debe bloquearse para siempre
+            needed = min(tokens, self.tokens.limit or tokens)
+            if self.tokens.remaining < needed:
+                return False
+            self.tokens.remaining -= needed
+        if self.requests.remaining is not None:
+            self.requests.remaining -= 1
+        return True
+
+    def give_back(self, tokens: int):
+        """Devuelve el cupo de un turno concedido que no llegó a usarse."""
+        for bucket, amount in ((self.requests, 1), (self.tokens, min(tokens, self.tokens.limit or tokens))):
+            if bucket.remaining is None:
+                continue
+            bucket.remaining += amount
+            if bucket.limit is not None:
+                bucket.remaining = min(bucket.remaining, bucket.limit)
+
+    def fraction(self):
+        known = [f for f in (self.requests.fraction(), self.tokens.fraction()) if f is not None]
+        return min(known) if known else None
+
+    def wait_time(self) -> float:
+        resets = [b.reset_at for b in (self.requests, self.tokens) if b.reset_at != float("inf")]
+        return max(0.05, min(resets) - time.monotonic()) if resets else 1.0
+
+class AdaptiveLimiter:
+    """
+    Limitador del lado cliente para Venice, aprendido de las cabeceras x-ratelimit-* de cada respuesta.
+    - Cubetas de peticiones y de tokens por modelo (contabilidad local corregida por cada respuesta).
+    - Sin cupo: las llamadas esperan turno por prioridad (moderación > chat > imágenes).
+    - Cupo casi agotado: chat e imágenes se descartan con VeniceBusyError (la moderación sigue).
+    """
+    def __init__(self, max_queue: int = LIMITER_MAX_QUEUE):
+        self.max_queue = max_queue
+        self._budgets = {}
+        self._seq = itertools.count()
+
+        # Métricas
+        self.waited = 0
+        self.timeouts = 0
+        self.shed = {PRIORITY_CHAT: 0, PRIORITY_IMAGE: 0}
+
+    def _budget(self, model: str) -> ModelBudget:
+        budget = self._budgets.get(model)
+        if budget is None:
+            budget = self._budgets[model] = ModelBudget(model)
+        return budget
+
+    def admit(self, priority: int, models) -> None:
+        """Lanza VeniceBusyError si ningún modelo tiene presupuesto para esta prioridad."""
+        threshold = SHED_THRESHOLDS.get(priority, 0.0)
+        if not threshold:
+            return
+        for model in models:
+            budget = self._budget(model)
+            now = time.monotonic()
+            budget.requests.refresh(now)
+            budget.tokens.refresh(now)
+            fraction = budget.fraction()
+            if (fraction is None or fraction >= threshold) and len(budget.waiters) < self.max_queue:
+                return
+        self.shed[priority] = self.shed.get(priority, 0) + 1
+        logger.warning(f"🧯 Presupuesto de Venice casi agotado: trabajo de prioridad {priority} descartado.")
+        raise VeniceBusyError("Presupuesto de Venice reservado para moderación")
+
+    async def acquire(self, model: str, priority: int, tokens: int, timeout: float) -> bool:
+        """Espera turno para `model`. Retorna False si no hubo cupo antes de `timeout`."""
+        budget = self._budget(model)
+        if not budget.waiters and budget.try_take(tokens):
+            return True
+
+        self.waited += 1
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), tokens, future]
+        heapq.heappush(budget.waiters, entry)
+        self._pump(budget)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            # Concedido justo al vencer: no desperdiciar el cupo
+            return self._withdraw(budget, entry)
+        except asyncio.CancelledError:
+            # La tarea que esperaba se canceló: el turno ya concedido vuelve a la cubeta
+            if self._withdraw(budget, entry):
+                budget.give_back(tokens)
+                self._pump(budget)
+            raise
+
+    def _withdraw(self, budget: ModelBudget, entry) -> bool:
+        """Saca de la cola a un waiter que deja de esperar. Retorna True si ya tenía turno concedido."""
+        future = entry[3]
+        if future.done():
+            return not future.cancelled()
+        future.cancel()
+        budget.waiters.remove(entry)
+        heapq.heapify(budget.waiters)
+        # Si bloqueaba la cabeza de la cola, los siguientes pueden tener cupo ya
+        self._pump(budget)
+        return False
+
+    def update(self, model: str, headers):
+        """Sincroniza las cubetas con las cabeceras de una respuesta y despierta la cola."""
+        budget = self._budget(model)
+        budget.requests.update(
+            _header(headers, "x-ratelimit-limit-requests", parse_int),
+            _header(headers, "x-ratelimit-remaining-requests", parse_int),
+            _header(headers, "x-ratelimit-reset-requests", reset_seconds),
+        )
+        budget.tokens.update(
+            _header(headers, "x-ratelimit-limit-tokens", parse_int),
+            _header(headers, "x-ratelimit-remaining-tokens", parse_int),
+            _header(headers, "x-ratelimit-reset-tokens", reset_seconds),
+        )
+        self._pump(budget)
+
+    def _pump(self, budget: ModelBudget):
+        """Concede turnos en orden de prioridad mientras haya cupo; si no, reprograma al reinicio."""
+        if budget.timer:
+            budget.timer.cancel()
+            budget.timer = None
+        while budget.waiters:
+            _, _, tokens, future = budget.waiters[0]
+            if future.done():
+                heapq.heappop(budget.waiters)
+                continue
+            if not budget.try_take(tokens):
+                budget.timer = asyncio.get_running_loop().call_later(budget.wait_time(), self._pump, budget)
+                return
+            heapq.heappop(budget.waiters)
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "models": {
+                model: {
+                    "requests_remaining": b.requests.remaining,
+                    "tokens_remaining": b.tokens.remaining,
+                    "waiting": len(b.waiters),
+                }
+                for model, b in self._budgets.items()
+            },
+            "waited": self.waited,
+            "timeouts": self.timeouts,
+            "shed": dict(self.shed),
+        }
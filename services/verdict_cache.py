@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from config.settings import (
+    VERDICT_CACHE_MAX_ENTRIES, VERDICT_CACHE_TTL_HIGH, VERDICT_CACHE_TTL_MED,
+    VERDICT_CACHE_TTL_LOW, VERDICT_CACHE_PERSIST
+)
+from services.database_service import db_pool
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Caracteres invisibles usados para evadir filtros (zero-width, BOM, etc.)
+_INVISIBLE_RE = re.compile(r"[\u200b-\u200f\u2060-\u2064\ufeff\u00ad]")
+_WHITESPACE_RE = re.compile(r"\s+")
+_URL_RE = re.compile(
+    r"(?:https?://)?(?:www\.)?"
+    r"((?:[a-z0-9-]+\.)+[a-z]{2,})"   # Host
+    r"(/[^\s?#]*)?"                   # Ruta
+    r"(?:\?([^\s#]*))?(?:#\S*)?",     # Query (sin rastreo) y fragmento (se descarta)
+    re.IGNORECASE
+)
+# Parámetros de rastreo: no cambian el destino del enlace (el resto de la query sí: ?v=, ?id=)
+_TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "si",
+})
+
+# Limpieza periódica del nivel SQLite (cada N escrituras)
+_PURGE_EVERY = 500
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name.startswith("utm_") or name in _TRACKING_PARAMS
+
+def normalize_text(text: str) -> str:
+    """
+    Forma canónica de un mensaje: NFKC, minúsculas, espacios plegados y URLs canónicas.
+    En las URLs solo el host pasa a minúsculas: ruta y query distinguen mayúsculas (bit.ly/AbC, ?v=).
+    """
+    text = unicodedata.normalize("NFKC", text)
+    text = _INVISIBLE_RE.sub("", text)
+
+    def _canonical_url(match):
+        host = match.group(1).lower()
+        path = (match.group(2) or "").rstrip("/")
+        params = [
+            param for param in (match.group(3) or "").split("&")
+            if param and not _is_tracking_param(param.split("=", 1)[0])
+        ]
+        return f"{host}{path}?{'&'.join(params)}" if params else f"{host}{path}"
+
+    parts = []
+    last = 0
+    for match in _URL_RE.finditer(text):
+        parts.append(text[last:match.start()].casefold())
+        parts.append(_canonical_url(match))
+        last = match.end()
+    parts.append(text[last:].casefold())
+    return _WHITESPACE_RE.sub(" ", "".join(parts)).strip()
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+class VerdictCache:
+    """
+    Caché de veredictos de classify_message por hash del texto normalizado.
+    Nivel 1: LRU en memoria. Nivel 2 (opcional): tabla SQLite que sobrevive reinicios.
+    Cada nivel de riesgo tiene su propio TTL; los errores de API nunca se guardan.
+    """
+    def __init__(self, persist: bool = VERDICT_CACHE_PERSIST):
+        self.persist = persist
+        self.ttls = {
+            "HIGH": VERDICT_CACHE_TTL_HIGH,
+            "MED": VERDICT_CACHE_TTL_MED,
+            "LOW": VERDICT_CACHE_TTL_LOW,
+        }
+        self._memory = TTLCache(max_entries=VERDICT_CACHE_MAX_ENTRIES, ttl=VERDICT_CACHE_TTL_LOW)
+        self._writes = 0
+        self.persistent_hits = 0
+
+    def peek(self, text: str, key: str = None):
+        """Consulta solo el nivel en memoria (sin I/O)."""
+        verdict = self._memory.get(key or text_hash(text))
+        return dict(verdict) if verdict is not None else None
+
+    async def get(self, text: str, key: str = None):
+        """Devuelve una copia del veredicto guardado (memoria y luego SQLite) o None."""
+        key = key or text_hash(text)
+        verdict = self.peek(text, key=key)
+        if verdict is not None:
+            return verdict
+
+        if not self.persist:
+            return None
+
+        try:
+            async with db_pool.reader() as db:
+                async with db.execute(
+                    "SELECT verdict, expires_at FROM verdict_cache WHERE text_hash = ? AND expires_at > ?",
+                    (key, time.time())
+                ) as cursor:
+                    row = await cursor.fetchone()
+        except Exception as e:
+            logger.warning(f"Error leyendo caché de veredictos: {e}")
+            return None
+
+        if not row:
+            return None
+
+        verdict = json.loads(row["verdict"])
+        # Promover al nivel en memoria con el TTL restante
+        self._memory.set(key, verdict, ttl=row["expires_at"] - time.time())
+        self.persistent_hits += 1
+        return dict(verdict)
+
+    async def set(self, text: str, verdict: dict, key: str = None):
+        risk = verdict.get("risk")
+        if risk not in self.ttls or verdict.get("category") == "ERROR":
+            return
+
+        key = key or text_hash(text)
+        ttl = self.ttls[risk]
+        self._memory.set(key, dict(verdict), ttl=ttl)
+
+        if not self.persist:
+            return
+
+        try:
+            async with db_pool.writer() as db:
+                await db.execute(
+                    "INSERT OR REPLACE INTO verdict_cache (text_hash, verdict, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(verdict, ensure_ascii=False), time.time() + ttl)
+                )
+                self._writes += 1
+                if self._writes % _PURGE_EVERY == 0:
+                    await db.execute("DELETE FROM verdict_cache WHERE expires_at <= ?", (time.time(),))
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Error guardando veredicto en caché: {e}")
+
+    def stats(self) -> dict:
+        stats = self._memory.stats()
+        stats["persistent_hits"] = self.persistent_hits
+        return stats
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Las pruebas importan los módulos del bot desde la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
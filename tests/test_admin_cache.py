@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+
+from core.admin_cache import ChatAdminCache
+from utils import cache as cache_module
+from utils.cache import TTLCache
+
+CHAT = -100
+
+class _Bot:
+    def __init__(self, admins=(1, 2), fail=False):
+        self.admins = admins
+        self.fail = fail
+        self.roster_calls = 0
+        self.member_calls = 0
+
+    async def get_chat_administrators(self, chat_id):
+        self.roster_calls += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("Telegram caído")
+        return [SimpleNamespace(user=SimpleNamespace(id=user_id)) for user_id in self.admins]
+
+    async def get_chat_member(self, chat_id, user_id):
+        self.member_calls += 1
+        return SimpleNamespace(status="administrator" if user_id in self.admins else "member")
+
+def _member_update(old, new):
+    return SimpleNamespace(
+        chat=SimpleNamespace(id=CHAT),
+        old_chat_member=SimpleNamespace(status=old),
+        new_chat_member=SimpleNamespace(status=new),
+    )
+
+def test_concurrent_misses_share_one_fetch():
+    cache = ChatAdminCache()
+    bot = _Bot()
+
+    async def _run():
+        return await asyncio.gather(*(cache.is_admin(CHAT, user_id, bot) for user_id in (1, 2, 3, 1)))
+
+    assert asyncio.run(_run()) == [True, True, False, True]
+    assert bot.roster_calls == 1
+    assert asyncio.run(cache.is_admin(CHAT, 2, bot)) and bot.roster_calls == 1  # Servido de caché
+
+def test_admin_status_change_invalidates_roster():
+    cache = ChatAdminCache()
+    bot = _Bot()
+    asyncio.run(cache.is_admin(CHAT, 1, bot))
+
+    assert not cache.handle_member_update(_member_update("member", "restricted"))
+    assert cache.handle_member_update(_member_update("member", "administrator"))
+    bot.admins = (1, 2, 3)
+    assert asyncio.run(cache.is_admin(CHAT, 3, bot))
+    assert bot.roster_calls == 2
+
+def test_fetch_error_falls_back_to_single_member_check():
+    cache = ChatAdminCache()
+    bot = _Bot(fail=True)
+    assert asyncio.run(cache.is_admin(CHAT, 1, bot))
+    assert not asyncio.run(cache.is_admin(CHAT, 9, bot))
+    assert bot.member_calls == 2 and cache.stats()["fetch_errors"] == 2
+
+def test_roster_expires_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    cache = ChatAdminCache(ttl=60)
+    bot = _Bot()
+    asyncio.run(cache.is_admin(CHAT, 1, bot))
+    now[0] += 61
+    asyncio.run(cache.is_admin(CHAT, 1, bot))
+    assert bot.roster_calls == 2
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_cache_respects_memory_ceiling():
+    cache = TTLCache(max_entries=100, ttl=60, max_bytes=2000)
+    for key in range(20):
+        cache.set(key, "x" * 200)
+    assert cache.bytes_used <= 2000 and len(cache) < 20
+    assert 19 in cache
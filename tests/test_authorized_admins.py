@@ -0,0 +1,67 @@
+import asyncio
+
+from core import security_service as security_module
+from core.security_service import SecurityService
+from services import database_service
+from services.database_service import DatabasePool
+
+def test_admin_changes_propagate_between_processes(monkeypatch, tmp_path):
+    pool = DatabasePool(str(tmp_path / "velzar_test.db"), readers=1)
+    monkeypatch.setattr(database_service, "db_pool", pool)
+    monkeypatch.setattr(security_module, "SHARED_STATE_SYNC_INTERVAL", 0.01)
+
+    async def _settle():
+        await asyncio.sleep(0.1)  # Varios ciclos de sincronización
+
+    async def _run():
+        await database_service.init_db()
+        # Dos instancias = dos procesos worker con la misma base de datos
+        first, second = SecurityService(), SecurityService()
+        for service in (first, second):
+            await service.load_authorized_admins()
+        sync = asyncio.create_task(second._sync_loop())
+        try:
+            await first.add_authorized_admin(42, added_by=1)
+            assert 42 in first.authorized_admins  # Escritura propia: visible al instante
+            await _settle()
+            seen_after_add = 42 in second.authorized_admins
+
+            await second.remove_authorized_admin(42)
+            await first.load_authorized_admins()
+            seen_after_remove = 42 in first.authorized_admins
+            versions = (first.authorized_admins_version, second.authorized_admins_version)
+        finally:
+            sync.cancel()
+            await asyncio.gather(sync, return_exceptions=True)
+            await pool.close()
+        return seen_after_add, seen_after_remove, versions
+
+    seen_after_add, seen_after_remove, versions = asyncio.run(_run())
+    assert seen_after_add and not seen_after_remove
+    assert versions == (2, 2)
+
+def test_sync_skips_reload_when_version_is_unchanged(monkeypatch, tmp_path):
+    pool = DatabasePool(str(tmp_path / "velzar_test.db"), readers=1)
+    monkeypatch.setattr(database_service, "db_pool", pool)
+    monkeypatch.setattr(security_module, "SHARED_STATE_SYNC_INTERVAL", 0.01)
+    loads = []
+
+    async def _run():
+        await database_service.init_db()
+        service = SecurityService()
+        await service.load_authorized_admins()
+        original = service.load_authorized_admins
+
+        async def _counting_load():
+            loads.append(1)
+            await original()
+
+        service.load_authorized_admins = _counting_load
+        sync = asyncio.create_task(service._sync_loop())
+        await asyncio.sleep(0.1)
+        sync.cancel()
+        await asyncio.gather(sync, return_exceptions=True)
+        await pool.close()
+
+    asyncio.run(_run())
+    assert loads == []
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from services.batch_classifier import BatchClassifier
+from services.venice_service import API_FAILURE_VERDICT, VeniceService
+
+def _run_batch(monkeypatch, responder, texts):
+    venice = VeniceService()
+    calls = []
+
+    async def _post_request(endpoint, payload, policy=None, **kwargs):
+        calls.append(payload)
+        return responder(payload)
+
+    monkeypatch.setattr(venice, "_post_request", _post_request)
+    batcher = BatchClassifier(venice, window_ms=1000, max_size=len(texts))
+
+    async def _classify_all():
+        return await asyncio.gather(*(batcher.classify(text, "m") for text in texts))
+
+    return asyncio.run(_classify_all()), calls
+
+def test_api_failure_does_not_fan_out(monkeypatch):
+    texts = [f"mensaje {i}" for i in range(10)]
+    verdicts, calls = _run_batch(monkeypatch, lambda payload: None, texts)
+    assert len(calls) == 1
+    assert all(verdict == API_FAILURE_VERDICT for verdict in verdicts)
+
+def test_http_error_does_not_fan_out(monkeypatch):
+    texts = ["a", "b", "c"]
+    verdicts, calls = _run_batch(monkeypatch, lambda payload: {"error": 429, "details": ""}, texts)
+    assert len(calls) == 1
+    assert [v["category"] for v in verdicts] == ["ERROR"] * 3
+
+def test_partial_parse_falls_back_per_message(monkeypatch):
+    texts = ["a", "b", "c"]
+
+    def responder(payload):
+        content = payload["messages"][-1]["content"]
+        if content.startswith("["):
+            # El lote solo clasifica el primer mensaje
+            answer = json.dumps([{"index": 0, "risk": "LOW", "category": "SAFE", "reason": "ok"}])
+        else:
+            answer = json.dumps({"risk": "HIGH", "category": "SPAM", "reason": "individual"})
+        return {"choices": [{"message": {"content": answer}}]}
+
+    verdicts, calls = _run_batch(monkeypatch, responder, texts)
+    assert len(calls) == 3  # 1 lote + 2 individuales
+    assert [v["risk"] for v in verdicts] == ["LOW", "HIGH", "HIGH"]
+
+def test_close_flushes_pending_batch_and_keeps_cache(monkeypatch):
+    venice = VeniceService()
+    cache = venice.verdict_cache
+
+    async def _post_request(endpoint, payload, policy=None, **kwargs):
+        return None
+
+    monkeypatch.setattr(venice, "_post_request", _post_request)
+    venice.batcher = BatchClassifier(venice, window_ms=60000, max_size=10)
+
+    async def _run():
+        pending = asyncio.create_task(venice.batcher.classify("hola", "m"))
+        await asyncio.sleep(0)
+        await venice.close()
+        return await asyncio.wait_for(pending, 1)
+
+    assert asyncio.run(_run()) == API_FAILURE_VERDICT
+    assert venice.verdict_cache is cache
@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+
+from telegram.constants import ChatType
+
+from core.handlers import chat_handler
+
+class _Message:
+    def __init__(self, text):
+        self.text = text
+        self.from_user = SimpleNamespace(id=7, is_bot=False)
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+def test_reply_is_generated_outside_the_handler(monkeypatch):
+    monkeypatch.setattr(chat_handler, "CHAT_STREAMING_ENABLED", False)
+    message = _Message("hola")
+    update = SimpleNamespace(
+        message=message,
+        effective_chat=SimpleNamespace(id=7, type=ChatType.PRIVATE),
+        effective_user=SimpleNamespace(id=7),
+    )
+    tasks = []
+
+    async def _run():
+        gate = asyncio.Event()
+
+        async def _generate(history):
+            await gate.wait()  # El modelo tarda: el handler no debe esperarlo
+            return "respuesta"
+
+        async def _typing(**kwargs):
+            pass
+
+        venice = SimpleNamespace(generate_chat_reply=_generate)
+        context = SimpleNamespace(
+            bot=SimpleNamespace(id=1, username="VelzarBot", send_chat_action=_typing),
+            bot_data={"security": SimpleNamespace(venice=venice)},
+            application=SimpleNamespace(create_task=lambda coro, update=None: tasks.append(asyncio.create_task(coro))),
+        )
+        await asyncio.wait_for(chat_handler.chat_reply_handler(update, context), 0.5)
+        assert message.replies == [] and len(tasks) == 1
+
+        gate.set()
+        await tasks[0]
+
+    asyncio.run(_run())
+    assert message.replies == ["respuesta"]
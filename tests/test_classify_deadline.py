@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+from aiohttp import web
+
+from services import venice_service
+from services.retry_policy import CLASSIFY_POLICY, CHAT_POLICY
+from services.venice_service import VeniceService
+
+DEADLINE = 0.6
+
+async def _slow_failing_api(request):
+    await asyncio.sleep(0.2)
+    return web.Response(status=503, text="overloaded")
+
+async def _hanging_api(request):
+    await asyncio.sleep(5)
+    return web.Response(status=503, text="overloaded")
+
+async def _with_api(monkeypatch, venice, action, handler=_slow_failing_api):
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", handler)
+    runner = web.AppRunner(app, shutdown_timeout=0.1)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    monkeypatch.setattr(venice_service, "VENICE_API_BASE", f"http://127.0.0.1:{port}/api/v1")
+    try:
+        return await action()
+    finally:
+        await venice.close()
+        await runner.cleanup()
+
+def _classify(monkeypatch, batched: bool, texts):
+    monkeypatch.setattr(CLASSIFY_POLICY, "deadline", DEADLINE)
+    venice = VeniceService()
+    venice.verdict_cache.peek = lambda *args, **kwargs: None
+
+    async def _no_cache(*args, **kwargs):
+        return None
+
+    venice.verdict_cache.get = _no_cache
+    if not batched:
+        venice.batcher = None
+
+    async def _run():
+        started = time.monotonic()
+        verdicts = await asyncio.gather(*(venice.classify_message(text) for text in texts))
+        return verdicts, time.monotonic() - started
+
+    return asyncio.run(_with_api(monkeypatch, venice, _run))
+
+def test_single_classification_shares_one_deadline_across_models(monkeypatch):
+    verdicts, elapsed = _classify(monkeypatch, batched=False, texts=["hola"])
+    assert verdicts[0]["category"] == "ERROR"
+    assert elapsed < DEADLINE + 0.3
+
+def test_batched_classification_shares_one_deadline(monkeypatch):
+    verdicts, elapsed = _classify(monkeypatch, batched=True, texts=["uno", "dos", "tres"])
+    assert all(verdict["category"] == "ERROR" for verdict in verdicts)
+    assert elapsed < DEADLINE + 0.3
+
+def _chat(monkeypatch, call):
+    monkeypatch.setattr(CHAT_POLICY, "deadline", DEADLINE)
+    venice = VeniceService()
+    assert len(venice.chat_router.ranked()) > 1  # Sin deadline compartido cada modelo tendría el suyo
+
+    async def _run():
+        started = time.monotonic()
+        result = await call(venice)
+        return result, time.monotonic() - started
+
+    return asyncio.run(_with_api(monkeypatch, venice, _run, handler=_hanging_api))
+
+def test_chat_reply_shares_one_deadline_across_models(monkeypatch):
+    reply, elapsed = _chat(monkeypatch, lambda venice: venice.generate_chat_reply([{"role": "user", "content": "hola"}]))
+    assert reply is None
+    assert elapsed < DEADLINE + 0.3
+
+def test_summary_shares_one_deadline_across_models(monkeypatch):
+    summary, elapsed = _chat(monkeypatch, lambda venice: venice.summarize_conversation(None, [("user", "hola")]))
+    assert summary is None
+    assert elapsed < DEADLINE + 0.3
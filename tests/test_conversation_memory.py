@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+
+from core.conversation_memory import ConversationMemory
+from services import database_service
+from services.database_service import DatabasePool
+
+def _venice(summaries):
+    async def summarize_conversation(previous, turns, max_tokens):
+        summaries.append((previous, list(turns)))
+        return f"resumen de {len(turns)} turnos"
+
+    return SimpleNamespace(summarize_conversation=summarize_conversation)
+
+def _with_db(monkeypatch, tmp_path, action):
+    async def _run():
+        pool = DatabasePool(str(tmp_path / "velzar_test.db"), readers=1)
+        monkeypatch.setattr(database_service, "db_pool", pool)
+        await database_service.init_db()
+        try:
+            return await action()
+        finally:
+            await pool.close()
+
+    return asyncio.run(_run())
+
+def test_over_budget_folds_oldest_pairs_into_summary(monkeypatch, tmp_path):
+    summaries = []
+    reply = "x" * 40  # 14 tokens; cada intercambio suma 20
+
+    async def _action():
+        memory = ConversationMemory(_venice(summaries), token_budget=50, summary_tokens=50, max_active=10, ttl=3600)
+        for n in range(3):
+            await memory.record(1, 7, f"pregunta {n}", reply)
+        await asyncio.gather(*memory._tasks)
+        prompt = await memory.build_prompt(1, 7, "nueva")
+        return memory, prompt
+
+    memory, prompt = _with_db(monkeypatch, tmp_path, _action)
+    conversation = memory._active[(1, 7)]
+
+    assert memory.stats()["summaries"] == 1
+    assert conversation.tokens <= 50 // 2
+    assert len(conversation.turns) % 2 == 0
+    evicted = summaries[0][1]
+    assert len(evicted) == 4 and evicted[0] == ("user", "pregunta 0") and evicted[-1][0] == "assistant"
+    assert prompt[0]["role"] == "system" and "resumen de" in prompt[0]["content"]
+    assert prompt[-1] == {"role": "user", "content": "nueva"}
+
+def test_cold_conversations_spill_to_sqlite_and_reload(monkeypatch, tmp_path):
+    async def _action():
+        memory = ConversationMemory(_venice([]), token_budget=1000, max_active=1, ttl=3600)
+        await memory.record(1, 7, "me llamo Ana", "hola Ana")
+        await memory.record(2, 8, "otro chat", "ok")  # Desaloja (1, 7)
+        spilled = memory.stats()["spills"]
+        prompt = await memory.build_prompt(1, 7, "¿cómo me llamo?")
+        return memory.stats(), spilled, prompt
+
+    stats, spilled, prompt = _with_db(monkeypatch, tmp_path, _action)
+
+    assert spilled == 1
+    assert stats["loads"] == 1 and stats["active"] == 1
+    assert [m["content"] for m in prompt] == ["me llamo Ana", "hola Ana", "¿cómo me llamo?"]
+
+def test_close_persists_and_expired_history_is_forgotten(monkeypatch, tmp_path):
+    async def _action():
+        memory = ConversationMemory(_venice([]), token_budget=1000, max_active=10, ttl=3600)
+        await memory.record(1, 7, "hola", "buenas")
+        await memory.close()
+
+        reloaded = ConversationMemory(_venice([]), token_budget=1000, max_active=10, ttl=3600)
+        kept = await reloaded.build_prompt(1, 7, "sigo aquí")
+
+        await database_service.save_conversation(3, 9, "viejo", "[]", 0.0)
+        expired = ConversationMemory(_venice([]), token_budget=1000, max_active=10, ttl=60)
+        await expired.start()
+        forgotten = await database_service.load_conversation(3, 9)
+        return kept, forgotten
+
+    kept, forgotten = _with_db(monkeypatch, tmp_path, _action)
+
+    assert [m["content"] for m in kept] == ["hola", "buenas", "sigo aquí"]
+    assert forgotten is None
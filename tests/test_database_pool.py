@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from services.database_service import DatabasePool
+
+def _with_pool(tmp_path, action):
+    async def _run():
+        pool = DatabasePool(str(tmp_path / "velzar_test.db"), readers=2)
+        async with pool.writer() as db:
+            await db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+            await db.commit()
+        try:
+            return await action(pool)
+        finally:
+            await pool.close()
+
+    return asyncio.run(_run())
+
+async def _count(pool):
+    async with pool.reader() as db:
+        async with db.execute("SELECT COUNT(*) FROM items") as cursor:
+            return (await cursor.fetchone())[0]
+
+def test_readers_see_committed_writes_and_are_read_only(tmp_path):
+    async def _action(pool):
+        async with pool.writer() as db:
+            await db.execute("INSERT INTO items (id) VALUES (1)")
+            await db.commit()
+        async with pool.reader() as db:
+            with pytest.raises(Exception):
+                await db.execute("INSERT INTO items (id) VALUES (2)")
+        return await _count(pool)
+
+    assert _with_pool(tmp_path, _action) == 1
+
+def test_writer_rolls_back_on_error(tmp_path):
+    async def _action(pool):
+        with pytest.raises(RuntimeError):
+            async with pool.writer() as db:
+                await db.execute("INSERT INTO items (id) VALUES (1)")
+                raise RuntimeError("fallo")
+        async with pool.writer() as db:
+            assert not db.in_transaction
+        return await _count(pool)
+
+    assert _with_pool(tmp_path, _action) == 0
+
+def test_writer_rolls_back_when_cancelled(tmp_path):
+    async def _action(pool):
+        inserted = asyncio.Event()
+
+        async def _write():
+            async with pool.writer() as db:
+                await db.execute("INSERT INTO items (id) VALUES (1)")
+                inserted.set()
+                await asyncio.sleep(10)
+                await db.commit()
+
+        task = asyncio.create_task(_write())
+        await inserted.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        async with pool.writer() as db:
+            assert not db.in_transaction  # El siguiente escritor no hereda la transacción
+            await db.commit()
+        return await _count(pool)
+
+    assert _with_pool(tmp_path, _action) == 0
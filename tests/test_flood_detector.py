@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+from core import flood_detector
+from core.flood_detector import FloodDetector
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def _detector(monkeypatch, **kwargs):
+    clock = _Clock()
+    monkeypatch.setattr(flood_detector, "time", SimpleNamespace(monotonic=clock))
+    return FloodDetector(**kwargs), clock
+
+def test_flood_detected_within_window(monkeypatch):
+    detector, clock = _detector(monkeypatch, max_messages=3, window=5)
+    assert not any(detector.hit(1, 1) for _ in range(3))
+    assert detector.hit(1, 1)
+    clock.now += 10
+    assert not detector.hit(1, 1)
+
+def test_resized_window_keeps_history_and_recency(monkeypatch):
+    detector, clock = _detector(monkeypatch, max_messages=5, window=5, max_keys=2)
+    detector.hit(1, 1)
+    clock.now += 1
+    detector.hit(1, 2)
+    clock.now += 1
+    # El chat baja su umbral: el buffer de (1, 1) se redimensiona y pasa a ser el más reciente
+    assert detector.hit(1, 1, max_messages=1)
+    assert list(detector._rings) == [(1, 2), (1, 1)]
+
+    detector.hit(1, 3)  # Capacidad: se descarta el menos reciente, no el usuario activo
+    assert (1, 1) in detector._rings and (1, 2) not in detector._rings
+    assert detector.stats()["evictions"] == 1
+
+def test_sweep_removes_only_idle_keys(monkeypatch):
+    detector, clock = _detector(monkeypatch, idle_ttl=60)
+    detector.hit(1, 1)
+    detector.hit(1, 2)
+    clock.now += 50
+    detector.hit(1, 1, max_messages=2)  # Actividad reciente (con redimensión) en (1, 1)
+    clock.now += 20
+    assert detector.sweep() == 1
+    assert list(detector._rings) == [(1, 1)]
@@ -0,0 +1,59 @@
+import asyncio
+
+from telegram.error import BadRequest
+
+from core.log_aggregator import LogAggregator, SEVERITY_HIGH
+
+class _Bot:
+    """Rechaza todo Markdown como lo haría Telegram con una entidad rota."""
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.documents = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        await asyncio.sleep(self.delay)
+        if parse_mode:
+            raise BadRequest("Can't parse entities: can't find end of the entity")
+        self.sent.append(text)
+
+    async def send_document(self, chat_id, document, caption=None, parse_mode=None):
+        if parse_mode:
+            raise BadRequest("Can't parse entities")
+        self.documents.append(document)
+
+def test_digest_falls_back_to_plain_text():
+    bot = _Bot()
+    logs = LogAggregator(interval=60, max_events=25)
+
+    async def _run():
+        for i in range(3):
+            logs.log(bot, -100, "ban", f"#BAN | User: user_{i} | Reason: spam")
+        await logs.flush_all(bot)
+
+    asyncio.run(_run())
+    assert len(bot.sent) == 1 and "user_2" in bot.sent[0]
+    assert logs.failures == 0
+
+def test_large_batch_document_falls_back_without_caption_markdown():
+    bot = _Bot()
+    logs = LogAggregator(interval=60, max_events=2)
+
+    async def _run():
+        for i in range(5):
+            logs.log(bot, -100, "ban", f"#BAN | User: user_{i}")
+        await logs.flush_all(bot)
+
+    asyncio.run(_run())
+    assert len(bot.documents) == 1 and logs.documents == 1
+
+def test_flush_all_waits_for_immediate_sends():
+    bot = _Bot(delay=0.05)
+    logs = LogAggregator(interval=60)
+
+    async def _run():
+        logs.log(bot, -100, "lockdown", "🚨 #LOCKDOWN", severity=SEVERITY_HIGH)
+        await logs.flush_all(bot)
+        return list(bot.sent)
+
+    assert asyncio.run(_run()) == ["🚨 #LOCKDOWN"]
@@ -0,0 +1,144 @@
+import asyncio
+
+from services import model_router
+from services.model_router import CLOSED, HALF_OPEN, OPEN, ModelRouter
+from services.venice_service import VeniceService
+
+def _open(router, model):
+    for _ in range(model_router.ROUTER_FAILURE_THRESHOLD):
+        router.record(model, False, 0.1)
+
+def _cool_down(router, model):
+    router.health[model].open_until = 0.0
+
+def test_breaker_opens_and_skips_the_model():
+    router = ModelRouter(["a", "b"], hedge=False)
+    _open(router, "a")
+    assert router.health["a"].state == OPEN
+    assert router.ranked() == ["b"]
+
+    calls = []
+
+    async def _func(model):
+        calls.append(model)
+        return "ok"
+
+    assert asyncio.run(router.call(_func)) == "ok"
+    assert calls == ["b"]
+
+def test_half_open_admits_a_single_probe():
+    router = ModelRouter(["a"], hedge=False)
+    _open(router, "a")
+    _cool_down(router, "a")
+
+    assert router.begin("a") and router.health["a"].state == HALF_OPEN
+    assert not router.begin("a")  # La segunda petición no prueba a la vez
+    router.record("a", True, 0.1)
+    assert router.health["a"].state == CLOSED and router.begin("a")
+
+def test_failed_probe_doubles_the_cooldown():
+    router = ModelRouter(["a"], hedge=False)
+    _open(router, "a")
+    first = router.health["a"].cooldown
+    _cool_down(router, "a")
+    assert router.begin("a")
+    router.record("a", False, 0.1)
+    assert router.health["a"].state == OPEN and router.health["a"].cooldown == first * 2
+
+def test_call_falls_over_to_next_model():
+    router = ModelRouter(["a", "b"], hedge=False)
+
+    async def _func(model):
+        return None if model == "a" else f"respuesta de {model}"
+
+    assert asyncio.run(router.call(_func)) == "respuesta de b"
+    assert router.health["a"].failures == 1
+
+def test_concurrent_calls_probe_a_recovering_model_once():
+    router = ModelRouter(["a", "b"], hedge=False)
+    _open(router, "a")
+    _open(router, "b")
+    _cool_down(router, "a")  # Solo 'a' está disponible (half-open)
+    calls = []
+
+    async def _func(model):
+        calls.append(model)
+        await asyncio.sleep(0.01)
+        return model
+
+    async def _run():
+        return await asyncio.gather(router.call(_func), router.call(_func), router.call(_func))
+
+    assert asyncio.run(_run()) == ["a", None, None]
+    assert calls == ["a"] and router.rejected == 2
+
+def test_hedge_uses_backup_when_primary_exceeds_p95(monkeypatch):
+    monkeypatch.setattr(model_router, "ROUTER_HEDGE_MIN_DELAY", 0.01)
+    router = ModelRouter(["a", "b"], hedge=True)
+    for _ in range(model_router.ROUTER_MIN_SAMPLES):
+        router.record("a", True, 0.01)
+
+    async def _func(model):
+        await asyncio.sleep(1.0 if model == "a" else 0.01)
+        return model
+
+    async def _run():
+        started = asyncio.get_running_loop().time()
+        result = await router.call(_func)
+        return result, asyncio.get_running_loop().time() - started
+
+    result, elapsed = asyncio.run(_run())
+    assert result == "b" and elapsed < 0.5
+    assert router.hedges == 1 and router.hedge_wins == 1
+
+def _recovering_primary(venice):
+    """Todos los modelos de chat abiertos salvo el primario, ya en half-open."""
+    router = venice.chat_router
+    for model in router.models:
+        _open(router, model)
+    primary = router.models[0]
+    _cool_down(router, primary)
+    return router, primary
+
+def test_streaming_respects_the_half_open_probe():
+    venice = VeniceService()
+    router, primary = _recovering_primary(venice)
+    streamed = []
+
+    async def _stream(payload, deadline=None):
+        streamed.append(payload["model"])
+        yield "hola"
+
+    venice._stream_completion = _stream
+
+    async def _run():
+        assert router.begin(primary)  # Otra petición ya está probando el modelo
+        return [delta async for delta in venice.stream_chat_reply([{"role": "user", "content": "hi"}])]
+
+    assert asyncio.run(_run()) == []  # El único modelo disponible ya está en prueba
+    assert streamed == []
+    assert router.health[primary].probing  # La prueba ajena sigue en curso
+
+def test_abandoned_stream_releases_the_probe():
+    venice = VeniceService()
+    router, primary = _recovering_primary(venice)
+
+    async def _stream(payload, deadline=None):
+        await asyncio.sleep(10)
+        yield "nunca"
+
+    venice._stream_completion = _stream
+
+    async def _consume():
+        async for _ in venice.stream_chat_reply([{"role": "user", "content": "hi"}]):
+            pass
+
+    async def _run():
+        task = asyncio.create_task(_consume())
+        await asyncio.sleep(0.01)
+        assert router.health[primary].probing
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(_run())
+    assert not router.health[primary].probing and router.begin(primary)
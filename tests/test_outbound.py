@@ -0,0 +1,41 @@
+import asyncio
+
+from telegram.error import BadRequest
+
+from core import outbound
+from core.outbound import NoticeCoalescer, OutboundScheduler
+
+def test_global_bucket_is_split_between_workers(monkeypatch):
+    monkeypatch.setattr(outbound, "WORKER_PROCESSES", 4)
+    monkeypatch.setattr(outbound, "OUTBOUND_GLOBAL_RATE", 30.0)
+    monkeypatch.setattr(outbound, "OUTBOUND_GLOBAL_BURST", 30.0)
+    scheduler = OutboundScheduler()
+    assert scheduler._global.rate == 7.5
+    assert scheduler._global.capacity == 7.5
+
+def test_single_process_keeps_full_account_rate(monkeypatch):
+    monkeypatch.setattr(outbound, "WORKER_PROCESSES", 1)
+    monkeypatch.setattr(outbound, "OUTBOUND_GLOBAL_RATE", 30.0)
+    assert OutboundScheduler()._global.rate == 30.0
+
+class _Bot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        if parse_mode:
+            raise BadRequest("Can't parse entities")
+        self.sent.append(text)
+
+def test_coalesced_notice_falls_back_to_plain_text():
+    bot = _Bot()
+    notices = NoticeCoalescer(window=60, max_lines=10)
+
+    async def _run():
+        notices.announce(bot, -100, "🛡️ BANNED: user_one")
+        notices.announce(bot, -100, "🛡️ BANNED: user_two")
+        await notices.flush_all(bot)
+
+    asyncio.run(_run())
+    assert len(bot.sent) == 1 and "user_two" in bot.sent[0]
+    assert notices.messages == 1
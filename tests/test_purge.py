@@ -0,0 +1,123 @@
+import asyncio
+from types import SimpleNamespace
+
+from core.message_tracker import MessageTracker
+from core.handlers import admin_handler
+
+CHAT = -100
+
+def _tracker_with(ids):
+    tracker = MessageTracker(per_chat=1000, max_chats=10)
+    for message_id in ids:
+        tracker.record(CHAT, message_id)
+    return tracker
+
+def test_purge_targets_rejects_non_positive_counts(monkeypatch):
+    monkeypatch.setattr(admin_handler, "message_tracker", _tracker_with(range(1, 301)))
+    assert admin_handler._purge_targets(CHAT, 301, -5) == []
+    assert admin_handler._purge_targets(CHAT, 301, 0) == []
+
+def test_purge_targets_newest_first_and_bounded(monkeypatch):
+    monkeypatch.setattr(admin_handler, "message_tracker", _tracker_with(range(1, 301)))
+    assert admin_handler._purge_targets(CHAT, 301, 5) == [300, 299, 298, 297, 296]
+
+def test_purge_targets_skip_already_deleted(monkeypatch):
+    tracker = _tracker_with(range(50, 61))
+    tracker.discard(CHAT, [60, 58, 50, 49])
+    monkeypatch.setattr(admin_handler, "message_tracker", tracker)
+    targets = admin_handler._purge_targets(CHAT, 61, 12)
+    assert 60 not in targets and 58 not in targets and 50 not in targets
+    assert 49 not in targets  # Ya borrado bajo el historial conocido: no se rellena con él
+    assert len(targets) == 12
+    assert targets[:3] == [59, 57, 56]
+
+class _Message:
+    message_id = 301
+
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+def test_purge_command_negative_count_shows_usage(monkeypatch):
+    async def _allowed(update, context):
+        return True
+
+    bot = SimpleNamespace(delete_messages=None, send_message=None)
+    message = _Message()
+    update = SimpleNamespace(message=message, effective_chat=SimpleNamespace(id=CHAT))
+    context = SimpleNamespace(args=["-5"], bot=bot)
+    monkeypatch.setattr(admin_handler, "_check_admin", _allowed)
+
+    asyncio.run(admin_handler.purge_command(update, context))
+    assert message.replies == ["Uso: /purge <cantidad>"]
+
+def test_scheduler_forgets_deleted_messages(monkeypatch):
+    from core import outbound
+    tracker = _tracker_with(range(1, 11))
+    monkeypatch.setattr(outbound, "message_tracker", tracker)
+    scheduler = outbound.OutboundScheduler()
+
+    async def _delete():
+        return True
+
+    async def _run():
+        await scheduler.process_request(_delete, (), {}, "deleteMessage", {"chat_id": CHAT, "message_id": 10}, None)
+        await scheduler.shutdown()
+
+    asyncio.run(_run())
+    assert 10 in tracker.deleted(CHAT)
+    assert tracker.recent(CHAT, 11, 3) == [9, 8, 7]
+
+class _Status:
+    def __init__(self):
+        self.text = None
+        self.deleted = False
+
+    async def edit_text(self, text):
+        self.text = text
+
+    async def delete(self):
+        self.deleted = True
+
+class _JobQueue:
+    def __init__(self):
+        self.jobs = []
+
+    def run_once(self, callback, when, data=None, chat_id=None):
+        self.jobs.append((callback, when, data))
+
+def test_purge_reports_requested_and_defers_status_cleanup(monkeypatch):
+    async def _allowed(update, context):
+        return True
+
+    status = _Status()
+
+    async def _send_message(chat_id, text):
+        return status
+
+    async def _delete_messages(chat_id, ids):
+        return True  # Telegram no informa de los ids omitidos
+
+    monkeypatch.setattr(admin_handler, "_check_admin", _allowed)
+    monkeypatch.setattr(admin_handler, "message_tracker", _tracker_with(range(1, 301)))
+    bot = SimpleNamespace(delete_messages=_delete_messages, send_message=_send_message)
+    update = SimpleNamespace(message=_Message(), effective_chat=SimpleNamespace(id=CHAT))
+    jobs = _JobQueue()
+    context = SimpleNamespace(args=["5"], bot=bot, job_queue=jobs)
+
+    async def _run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await admin_handler.purge_command(update, context)
+        return loop.time() - started
+
+    assert asyncio.run(_run()) < 1  # El handler no espera al borrado del resumen
+    assert "Se solicitó borrar 5 mensajes" in status.text
+    assert not status.deleted
+
+    callback, when, data = jobs.jobs[0]
+    assert when == admin_handler.PURGE_STATUS_TTL and data is status
+    asyncio.run(callback(SimpleNamespace(job=SimpleNamespace(data=data))))
+    assert status.deleted
@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+from telegram import ChatPermissions
+
+from core.raid_detector import RaidDetector
+
+CHAT = -100
+ORIGINAL = ChatPermissions(can_send_messages=True, can_invite_users=False)
+
+class _Bot:
+    def __init__(self, permissions=ORIGINAL, fail_restrict=False, fail_get_chat=False):
+        self.permissions = permissions
+        self.fail_restrict = fail_restrict
+        self.fail_get_chat = fail_get_chat
+        self.applied = []
+
+    async def get_chat(self, chat_id):
+        if self.fail_get_chat:
+            raise RuntimeError("sin acceso")
+        return SimpleNamespace(permissions=self.permissions)
+
+    async def set_chat_permissions(self, chat_id, permissions):
+        if self.fail_restrict and permissions == ChatPermissions.no_permissions():
+            raise RuntimeError("Not enough rights")
+        self.applied.append(permissions)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        pass
+
+def test_failed_restriction_does_not_mark_lockdown_active():
+    raid = RaidDetector()
+    bot = _Bot(fail_restrict=True)
+    assert asyncio.run(raid.lockdown(CHAT, bot, "prueba")) is False
+    assert not raid.is_active(CHAT)
+    assert raid.stats()["active_lockdowns"] == 0
+
+def test_unreadable_permissions_skip_lockdown():
+    raid = RaidDetector()
+    for bot in (_Bot(fail_get_chat=True), _Bot(permissions=None)):
+        assert asyncio.run(raid.lockdown(CHAT, bot, "prueba")) is False
+        assert bot.applied == [] and not raid.is_active(CHAT)
+
+def test_lift_restores_the_original_permissions():
+    raid = RaidDetector()
+    bot = _Bot()
+
+    async def _run():
+        assert await raid.lockdown(CHAT, bot, "prueba")
+        assert raid.is_active(CHAT)
+        await raid.lift_all(bot)
+
+    asyncio.run(_run())
+    assert bot.applied == [ChatPermissions.no_permissions(), ORIGINAL]
+    assert not raid.is_active(CHAT)
@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+from core.review_queue import AIReviewQueue
+
+def _security(classify, applied):
+    async def _apply_verdict(update, context, analysis):
+        applied.append((update, analysis))
+
+    return SimpleNamespace(venice=SimpleNamespace(classify_message=classify), _apply_verdict=_apply_verdict)
+
+def test_submit_before_start_is_rejected_without_counting():
+    async def _classify(text):
+        return {"risk": "LOW"}
+
+    queue = AIReviewQueue(_security(_classify, []), workers=1, max_queue=2)
+    assert queue.submit("upd", None, "hola") is False
+    assert queue.stats()["submitted"] == 0
+
+def test_workers_classify_and_apply_verdict():
+    applied = []
+
+    async def _classify(text):
+        return {"risk": "HIGH", "reason": text}
+
+    async def _run():
+        queue = AIReviewQueue(_security(_classify, applied), workers=2, max_queue=4)
+        await queue.start()
+        try:
+            assert queue.submit("upd-1", None, "spam") is True
+            await asyncio.wait_for(queue._queue.join(), 1)
+        finally:
+            await queue.stop()
+        return queue.stats()
+
+    stats = asyncio.run(_run())
+    assert applied == [("upd-1", {"risk": "HIGH", "reason": "spam"})]
+    assert stats["submitted"] == 1 and stats["processed"] == 1 and stats["failed"] == 0
+
+def test_full_queue_rejects_and_failures_are_counted():
+    release = None
+
+    async def _classify(text):
+        await release.wait()
+        raise RuntimeError("Venice caído")
+
+    async def _run():
+        nonlocal release
+        release = asyncio.Event()
+        queue = AIReviewQueue(_security(_classify, []), workers=1, max_queue=1)
+        await queue.start()
+        try:
+            assert queue.submit("a", None, "uno") is True
+            await asyncio.sleep(0)  # el worker toma "a" y se bloquea
+            assert queue.submit("b", None, "dos") is True
+            assert queue.submit("c", None, "tres") is False
+            release.set()
+            await asyncio.wait_for(queue._queue.join(), 1)
+        finally:
+            await queue.stop()
+        return queue.stats()
+
+    stats = asyncio.run(_run())
+    assert stats == {"queue_depth": 0, "submitted": 2, "rejected": 1, "processed": 0, "failed": 2}
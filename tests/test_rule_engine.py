@@ -0,0 +1,71 @@
+import random
+import re
+
+from core.rule_engine import DEFAULT_RULES, Rule, RuleMatcher, extract_literals, validate_pattern
+
+def _naive_candidates(matcher, text):
+    """Referencia: una búsqueda por literal, sin distinguir mayúsculas (el prefiltro debe coincidir exactamente)."""
+    found = set(matcher._always)
+    for literal, indexes in matcher._by_literal.items():
+        if re.search(re.escape(literal), text, re.IGNORECASE):
+            found.update(indexes)
+    return sorted(found)
+
+def _legacy_match(rules, text):
+    """Comportamiento previo al prefiltro: cada regla con re.IGNORECASE, en orden de prioridad."""
+    for rule in sorted(rules, key=lambda rule: rule.priority):
+        if re.search(rule.pattern, text, re.IGNORECASE):
+            return rule
+    return None
+
+OVERLAPPING_RULES = list(DEFAULT_RULES) + [
+    Rule("bit", r"bit"),
+    Rule("bitcoin_x", r"bitcoinx"),
+    Rule("coin", r"coin"),
+    Rule("dot", r"t\.me/\+"),
+    Rule("inv", r"inversi[oó]n"),
+    Rule("alt", r"(spam|spammer|spa)\d"),
+    Rule("always", r"\d{5,}"),
+] + [Rule(f"kw{i}", rf"\bspamword{i}\b") for i in range(50)]
+
+def test_prefilter_matches_naive_substring_checks():
+    matcher = RuleMatcher(OVERLAPPING_RULES)
+    alphabet = ["bit", "coin", "bitcoin", "x", "spa", "m", "mer", "t.me/+", "inversión", "spamword1",
+                "spamword12", " ", "a", "ó", "1", "giveaway", "USDT"]
+    rng = random.Random(7)
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        assert matcher.candidates(text) == _naive_candidates(matcher, text), text
+
+def test_match_respects_priority_and_prefix_literals():
+    matcher = RuleMatcher([Rule("long", r"bitcoinx", priority=1), Rule("short", r"bit", priority=2)])
+    assert matcher.match("compra BITCOINX ya").name == "long"
+    assert matcher.match("un bit de info").name == "short"
+    assert matcher.match("nada que ver") is None
+
+def test_crypto_scam_keeps_unbounded_gap():
+    matcher = RuleMatcher(DEFAULT_RULES)
+    text = "bitcoin " + "relleno " * 100 + "ganancia garantizada"
+    assert matcher.match(text).name == "crypto_scam"
+
+def test_named_groups_allowed():
+    assert validate_pattern(r"(?P<dominio>bit\.ly)/\w+") is None
+    assert extract_literals(r"(?P<dominio>bit\.ly)") == {"bit.ly"}
+
+def test_unicode_case_variants_match_like_legacy_loop():
+    matcher = RuleMatcher(DEFAULT_RULES)
+    for text in ("paſſive income now", "PASSİVE income", "DOUBLİNG", "ınvest", "BİTCOİN ganancia GARANTİZADA",
+                 "\u212aey", "passive income", "nada que ver"):
+        expected = _legacy_match(DEFAULT_RULES, text)
+        assert matcher.match(text) == expected, text
+
+def test_prefilter_equivalent_to_legacy_on_case_variants():
+    rules = OVERLAPPING_RULES + [Rule("sharp", r"straße"), Rule("dotted", r"İstanbul"), Rule("long_s", r"ſpam")]
+    matcher = RuleMatcher(rules)
+    alphabet = ["bit", "BİT", "coın", "ſpa", "SPA", "m", "straße", "STRASSE", "ẞ", "istanbul", "İSTANBUL",
+                "ınvest", "passİve income", "DOUBLıNG", "\u212a", "k", " ", "1"]
+    rng = random.Random(11)
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 10)))
+        assert matcher.candidates(text) == _naive_candidates(matcher, text), text
+        assert matcher.match(text) == _legacy_match(rules, text), text
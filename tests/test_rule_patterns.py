@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.rule_engine import DEFAULT_RULES, MAX_PATTERN_LENGTH, validate_pattern
+from core.handlers import admin_handler
+
+@pytest.mark.parametrize("pattern", [
+    r"(a+)+$",
+    r"(?:a*)*b",
+    r"(\w+\s?)+$",
+    r"(a|aa)+$",
+    r"(x)\1",
+    "a" * (MAX_PATTERN_LENGTH + 1),
+    r"(unclosed",
+])
+def test_validate_pattern_rejects_unsafe(pattern):
+    assert validate_pattern(pattern) is not None
+
+@pytest.mark.parametrize("pattern", [
+    r"gana\s+dinero",
+    r"(https?://)?bit\.ly",
+    r"(ab){2,}",
+    r"[a-z]+@gmail\.com",
+])
+def test_validate_pattern_accepts_safe(pattern):
+    assert validate_pattern(pattern) is None
+
+def test_default_rules_pass_validation():
+    for rule in DEFAULT_RULES:
+        assert validate_pattern(rule.pattern) is None, rule.name
+
+class _Message:
+    text = "/addrule ban spam"
+
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+def test_addrule_requires_bot_admin(monkeypatch):
+    async def _chat_admin(update, context):
+        return True
+
+    added = []
+
+    async def _add_rule(*args):
+        added.append(args)
+        return 1
+
+    security = SimpleNamespace(authorized_admins=frozenset(), rules=SimpleNamespace(add_rule=_add_rule))
+    message = _Message()
+    update = SimpleNamespace(
+        message=message, effective_chat=SimpleNamespace(id=-100), effective_user=SimpleNamespace(id=42)
+    )
+    context = SimpleNamespace(args=["ban", "spam"], bot_data={"security": security})
+    monkeypatch.setattr(admin_handler, "_check_admin", _chat_admin)
+    monkeypatch.setattr(admin_handler, "ADMIN_USER_ID", 1)
+
+    asyncio.run(admin_handler.addrule_command(update, context))
+    assert not added and message.replies[0].startswith("⛔")
+
+    security.authorized_admins = frozenset({42})
+    asyncio.run(admin_handler.addrule_command(update, context))
+    assert len(added) == 1
+
+def test_delrule_requires_bot_admin_like_addrule(monkeypatch):
+    async def _chat_admin(update, context):
+        return True
+
+    removed = []
+
+    async def _remove_rule(chat_id, rule_id):
+        removed.append(rule_id)
+        return True
+
+    security = SimpleNamespace(authorized_admins=frozenset(), rules=SimpleNamespace(remove_rule=_remove_rule))
+    message = _Message()
+    update = SimpleNamespace(
+        message=message, effective_chat=SimpleNamespace(id=-100), effective_user=SimpleNamespace(id=42)
+    )
+    context = SimpleNamespace(args=["#3"], bot_data={"security": security})
+    monkeypatch.setattr(admin_handler, "_check_admin", _chat_admin)
+    monkeypatch.setattr(admin_handler, "ADMIN_USER_ID", 1)
+
+    asyncio.run(admin_handler.delrule_command(update, context))
+    assert not removed and message.replies[0].startswith("⛔")
+
+    security.authorized_admins = frozenset({42})
+    asyncio.run(admin_handler.delrule_command(update, context))
+    assert removed == [3]
@@ -0,0 +1,43 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core import security_service as security_module
+from core.security_service import SecurityService
+
+class _Chat:
+    id = -100
+
+    def __init__(self):
+        self.banned = []
+
+    async def ban_member(self, user_id):
+        self.banned.append(user_id)
+
+class _Message:
+    async def delete(self):
+        pass
+
+@pytest.mark.parametrize("action,logged", [("delete", False), ("ban", True)])
+def test_ban_log_only_for_punishments(monkeypatch, action, logged):
+    ban_logs = []
+    actions = []
+
+    async def _add_ban_log(*args):
+        ban_logs.append(args)
+
+    async def _log_action(context, chat_id, user, action, reason):
+        actions.append(action)
+
+    monkeypatch.setattr(security_module, "add_ban_log", _add_ban_log)
+    service = SecurityService()
+    monkeypatch.setattr(service, "_log_action", _log_action)
+    monkeypatch.setattr(service.notices, "announce", lambda *args: None)
+    update = SimpleNamespace(
+        effective_chat=_Chat(), effective_user=SimpleNamespace(id=7, first_name="spam"), effective_message=_Message()
+    )
+
+    asyncio.run(service._punish_user(update, SimpleNamespace(bot=None), "Regla #1", action))
+    assert bool(ban_logs) == logged
+    assert actions == [action]  # El canal de auditoría sí registra el borrado
@@ -0,0 +1,67 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from telegram import Update
+
+from core.sharding import ShardRouter, shard_for, shard_key
+
+def _update(update_id: int, chat_id: int, user_id: int = 7) -> Update:
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "supergroup", "title": "Velzar"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Ana"},
+            "text": "hola",
+        },
+    }, None)
+
+class _FakeQueue:
+    def __init__(self):
+        self.items = []
+
+    def put(self, payload):
+        self.items.append(payload)
+
+def _router(workers: int, alive: bool = True) -> ShardRouter:
+    router = ShardRouter(workers, queue_size=4)
+    router._queues = [_FakeQueue() for _ in range(workers)]
+    router._processes = [SimpleNamespace(is_alive=lambda: alive) for _ in range(workers)]
+    return router
+
+def test_shard_key_prefers_chat_then_user():
+    assert shard_key(_update(1, -1001)) == -1001
+    assert shard_key(SimpleNamespace(effective_chat=None, effective_user=SimpleNamespace(id=42))) == 42
+    assert shard_key(SimpleNamespace(effective_chat=None, effective_user=None)) == 0
+
+def test_same_chat_always_lands_on_same_shard():
+    shards = {shard_for(_update(n, -1005, user_id=n), 3) for n in range(1, 20)}
+    assert shards == {-1005 % 3}
+    assert all(0 <= shard_for(_update(1, chat_id), 3) < 3 for chat_id in (-1001, -1002, 5, 6))
+
+def test_route_serializes_update_to_its_worker():
+    router = _router(3)
+    update = _update(10, -1004)
+
+    asyncio.run(router.route(update, None))
+
+    index = -1004 % 3
+    payload = router._queues[index].items[0]
+    assert Update.de_json(json.loads(payload), None).effective_chat.id == -1004
+    assert router.stats()["routed"] == [1 if i == index else 0 for i in range(3)]
+    assert router.restarts == 0
+
+def test_route_respawns_dead_worker_unless_stopping():
+    router = _router(2, alive=False)
+    spawned = []
+    router._spawn = spawned.append
+
+    asyncio.run(router.route(_update(1, 4), None))
+    assert spawned == [0] and router.restarts == 1
+
+    router._stopping = True
+    asyncio.run(router.route(_update(2, 4), None))
+    assert spawned == [0] and router.restarts == 1
+    assert router.routed == [2, 0]
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from utils.concurrency import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def _factory():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def _run():
+        return await asyncio.gather(*(flight.do("k", _factory) for _ in range(5)))
+
+    assert asyncio.run(_run()) == ["ok"] * 5
+    assert len(calls) == 1 and flight.coalesced == 4
+
+def test_leader_cancellation_does_not_cancel_followers():
+    flight = SingleFlight()
+    calls = []
+
+    async def _factory():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def _run():
+        leader = asyncio.create_task(flight.do("k", _factory))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.do("k", _factory)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    # Un seguidor relevó al líder y los demás comparten su resultado
+    assert asyncio.run(_run()) == [2, 2, 2]
+    assert len(calls) == 2 and flight.takeovers == 3
+    assert flight.inflight == 0
+
+def test_follower_cancellation_leaves_leader_running():
+    flight = SingleFlight()
+
+    async def _factory():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def _run():
+        leader = asyncio.create_task(flight.do("k", _factory))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", _factory))
+        await asyncio.sleep(0)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert asyncio.run(_run()) == "ok"
+    assert flight.takeovers == 0
@@ -0,0 +1,73 @@
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+from services import venice_service
+from services.retry_policy import CHAT_POLICY
+from services.venice_service import VeniceService
+
+DEADLINE = 0.8
+
+def _sse(text):
+    return f"data: {json.dumps({'choices': [{'delta': {'content': text}}]})}\n\n".encode()
+
+async def _collect(monkeypatch, handler):
+    monkeypatch.setattr(CHAT_POLICY, "deadline", DEADLINE)
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", handler)
+    runner = web.AppRunner(app, shutdown_timeout=0.1)  # Sin esperar a los handlers colgados
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    monkeypatch.setattr(venice_service, "VENICE_API_BASE", f"http://127.0.0.1:{port}/api/v1")
+
+    venice = VeniceService()
+    started = time.monotonic()
+    try:
+        parts = [delta async for delta in venice.stream_chat_reply([{"role": "user", "content": "hola"}], model="m")]
+        return "".join(parts), time.monotonic() - started
+    finally:
+        await venice.close()
+        await runner.cleanup()
+
+def test_retries_failures_before_first_chunk(monkeypatch):
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        if len(calls) == 1:
+            return web.Response(status=503)
+        response = web.StreamResponse()
+        await response.prepare(request)
+        await response.write(_sse("hola "))
+        await response.write(_sse("mundo"))
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    monkeypatch.setattr(CHAT_POLICY, "base_delay", 0.01)  # El backoff no debe competir con el deadline
+    text, _ = asyncio.run(_collect(monkeypatch, handler))
+    assert text == "hola mundo" and len(calls) == 2
+
+def test_stalled_stream_is_cut_at_the_deadline(monkeypatch):
+    async def handler(request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        await response.write(_sse("parcial"))
+        await asyncio.sleep(30)
+        return response
+
+    text, elapsed = asyncio.run(_collect(monkeypatch, handler))
+    assert text == "parcial"
+    assert elapsed < DEADLINE + 0.4
+
+def test_silent_server_is_bounded_by_the_deadline(monkeypatch):
+    async def handler(request):
+        await asyncio.sleep(30)
+        return web.Response(status=200)
+
+    text, elapsed = asyncio.run(_collect(monkeypatch, handler))
+    assert text == ""
+    assert elapsed < DEADLINE + 0.4
@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+
+from core.update_processor import ChatOrderedUpdateProcessor
+
+def _update(chat_id):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), effective_user=None)
+
+def test_updates_of_one_chat_run_in_arrival_order():
+    processor = ChatOrderedUpdateProcessor(concurrency=8, backlog=64)
+    order = []
+
+    async def _handle(index, delay):
+        await asyncio.sleep(delay)
+        order.append(index)
+
+    async def _run():
+        # El primero es el más lento: sin candado por chat terminaría último
+        delays = [0.03, 0.0, 0.01, 0.0]
+        await asyncio.gather(*(
+            processor.process_update(_update(-100), _handle(i, d)) for i, d in enumerate(delays)
+        ))
+
+    asyncio.run(_run())
+    assert order == [0, 1, 2, 3]
+    assert processor.stats()["active_chats"] == 0 and processor.processed == 4
+
+def test_slow_chat_does_not_block_other_chats():
+    processor = ChatOrderedUpdateProcessor(concurrency=8, backlog=64)
+    finished = []
+
+    async def _handle(name, delay):
+        await asyncio.sleep(delay)
+        finished.append(name)
+
+    async def _run():
+        slow = asyncio.create_task(processor.process_update(_update(1), _handle("lento", 0.2)))
+        await asyncio.sleep(0)
+        started = asyncio.get_running_loop().time()
+        await processor.process_update(_update(2), _handle("rápido", 0.0))
+        elapsed = asyncio.get_running_loop().time() - started
+        assert processor.queue_depths() == [(1, 1)]
+        await slow
+        return elapsed
+
+    assert asyncio.run(_run()) < 0.1
+    assert finished == ["rápido", "lento"]
+    assert processor.max_depth == 1
@@ -0,0 +1,43 @@
+import asyncio
+
+from services import database_service
+from services.database_service import DatabasePool, WriteBehindBuffer
+from utils.cache import TTLCache
+
+def _setup(monkeypatch, tmp_path):
+    pool = DatabasePool(str(tmp_path / "velzar_test.db"), readers=1)
+    buffer = WriteBehindBuffer(pool, flush_interval=60, max_pending=100)
+    buffer._task = object()  # Bucle activo simulado: los cambios quedan en el buffer
+    monkeypatch.setattr(database_service, "db_pool", pool)
+    monkeypatch.setattr(database_service, "write_buffer", buffer)
+    monkeypatch.setattr(database_service, "user_cache", TTLCache(max_entries=100, ttl=600))
+    return pool, buffer
+
+def test_cache_fill_includes_unflushed_trust_changes(monkeypatch, tmp_path):
+    pool, buffer = _setup(monkeypatch, tmp_path)
+
+    async def _run():
+        await database_service.init_db()
+        await database_service.get_or_create_user(1, "alice")
+        database_service.user_cache.clear()  # Expiró de la caché; los cambios siguen sin volcar
+
+        for _ in range(3):
+            await database_service.update_trust_score(1, increment=True)
+        fresh = (await database_service.get_or_create_user(1, "alice"))["trust_score"]
+        cached = (await database_service.get_user(1))["trust_score"]
+
+        await database_service.update_trust_score(1, reset=True)
+        database_service.user_cache.clear()
+        after_reset = (await database_service.get_user(1))["trust_score"]
+        await pool.close()
+        return fresh, cached, after_reset
+
+    assert asyncio.run(_run()) == (3, 3, 0)
+
+def test_pending_trust_counts_the_flush_in_progress():
+    buffer = WriteBehindBuffer(pool=None)
+    buffer._flushing = {1: (False, 2)}
+    buffer._trust = {1: (False, -1), 2: (True, 4)}
+    assert buffer.pending_trust(1, 10) == 11
+    assert buffer.pending_trust(2, 10) == 4
+    assert buffer.pending_trust(3, 10) == 10
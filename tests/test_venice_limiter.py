@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from services.retry_policy import PRIORITY_MODERATION, PRIORITY_CHAT, PRIORITY_IMAGE, retry_after_seconds
+from services.venice_limiter import AdaptiveLimiter, VeniceBusyError
+from utils.ratelimit_headers import parse_int, reset_seconds
+
+MODEL = "venice-uncensored"
+
+def _exhausted(limiter, limit=10, reset=60):
+    limiter.update(MODEL, {
+        "x-ratelimit-limit-requests": str(limit),
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": str(reset),
+    })
+
+def _refill(limiter, remaining):
+    budget = limiter._budget(MODEL)
+    budget.requests.remaining = remaining
+    limiter._pump(budget)
+
+def test_header_parsing_is_shared():
+    assert parse_int("10.0") == 10
+    assert parse_int("n/a") is None
+    assert reset_seconds("2.5") == 2.5
+    assert reset_seconds("basura") == 0.0
+    assert retry_after_seconds({"Retry-After": "3"}) == 3.0
+
+def test_waiters_are_served_by_priority():
+    limiter = AdaptiveLimiter()
+    order = []
+
+    async def _wait(priority):
+        assert await limiter.acquire(MODEL, priority, 0, timeout=2)
+        order.append(priority)
+
+    async def _run():
+        _exhausted(limiter)
+        tasks = [asyncio.create_task(_wait(p)) for p in (PRIORITY_IMAGE, PRIORITY_CHAT, PRIORITY_MODERATION)]
+        await asyncio.sleep(0)
+        _refill(limiter, 3)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(_run())
+    assert order == [PRIORITY_MODERATION, PRIORITY_CHAT, PRIORITY_IMAGE]
+
+def test_chat_is_shed_when_budget_is_nearly_gone():
+    limiter = AdaptiveLimiter()
+    _exhausted(limiter)
+    with pytest.raises(VeniceBusyError):
+        limiter.admit(PRIORITY_CHAT, [MODEL])
+    limiter.admit(PRIORITY_MODERATION, [MODEL])  # La moderación nunca se descarta
+
+def test_timed_out_waiter_leaves_the_queue():
+    limiter = AdaptiveLimiter()
+
+    async def _run():
+        _exhausted(limiter)
+        assert not await limiter.acquire(MODEL, PRIORITY_MODERATION, 0, timeout=0.01)
+        assert limiter._budget(MODEL).waiters == []
+
+    asyncio.run(_run())
+    assert limiter.timeouts == 1
+
+def test_cancelled_waiter_does_not_hold_a_slot():
+    limiter = AdaptiveLimiter()
+
+    async def _run():
+        _exhausted(limiter)
+        cancelled = asyncio.create_task(limiter.acquire(MODEL, PRIORITY_MODERATION, 0, timeout=5))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(limiter.acquire(MODEL, PRIORITY_CHAT, 0, timeout=5))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert len(limiter._budget(MODEL).waiters) == 1
+
+        # El único turno disponible es para quien sigue esperando
+        _refill(limiter, 1)
+        assert await asyncio.wait_for(waiting, 1)
+
+    asyncio.run(_run())
+
+def test_slot_granted_to_a_cancelled_waiter_is_returned():
+    limiter = AdaptiveLimiter()
+
+    async def _run():
+        _exhausted(limiter)
+        task = asyncio.create_task(limiter.acquire(MODEL, PRIORITY_MODERATION, 0, timeout=5))
+        await asyncio.sleep(0)
+        _refill(limiter, 1)   # Concede el turno...
+        task.cancel()         # ...pero la tarea se cancela antes de usarlo
+        try:
+            granted = await task
+        except asyncio.CancelledError:
+            granted = False
+        # O la llamada se quedó el turno (wait_for de 3.11 prioriza el resultado) o volvió a la cubeta
+        assert limiter._budget(MODEL).requests.remaining == (0 if granted else 1)
+
+    asyncio.run(_run())
+
+def test_give_back_restores_budget_without_exceeding_limit():
+    limiter = AdaptiveLimiter()
+    _exhausted(limiter, limit=2)
+    budget = limiter._budget(MODEL)
+    budget.requests.remaining = 1
+    assert budget.try_take(0)
+    budget.give_back(0)
+    budget.give_back(0)
+    assert budget.requests.remaining == 2
@@ -0,0 +1,41 @@
+import asyncio
+
+from aiohttp import web
+
+from services import venice_service
+from services.venice_service import VeniceService
+
+def test_calls_reuse_one_session_and_keep_alive_connection(monkeypatch):
+    peers = []
+
+    async def _chat(request):
+        peers.append(request.transport.get_extra_info("peername"))
+        return web.json_response({"choices": [{"message": {"content": "hola"}}]})
+
+    async def _run():
+        app = web.Application()
+        app.router.add_post("/api/v1/chat/completions", _chat)
+        runner = web.AppRunner(app, shutdown_timeout=0.1)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        monkeypatch.setattr(venice_service, "VENICE_API_BASE", f"http://127.0.0.1:{port}/api/v1")
+
+        venice = VeniceService()
+        try:
+            # Sin start(): la sesión se crea perezosamente en la primera llamada
+            replies = [await venice.generate_chat_reply([{"role": "user", "content": "hi"}]) for _ in range(3)]
+            session = venice._session
+            await venice.start()  # Idempotente: no reemplaza la sesión abierta
+            same_session = venice._session is session
+            await venice.close()
+            closed = session.closed and venice._session is None
+        finally:
+            await runner.cleanup()
+        return replies, same_session, closed
+
+    replies, same_session, closed = asyncio.run(_run())
+    assert replies == ["hola"] * 3
+    assert same_session and closed
+    assert len(set(peers)) == 1  # Las tres peticiones viajaron por la misma conexión keep-alive
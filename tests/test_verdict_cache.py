@@ -0,0 +1,18 @@
+from services.verdict_cache import normalize_text, text_hash
+
+def test_different_query_targets_are_not_collapsed():
+    assert text_hash("https://youtube.com/watch?v=A") != text_hash("https://youtube.com/watch?v=B")
+    assert text_hash("drive.google.com/open?id=abc") != text_hash("drive.google.com/open?id=xyz")
+
+def test_path_and_query_keep_their_case():
+    assert text_hash("bit.ly/AbC") != text_hash("bit.ly/abc")
+    assert text_hash("youtube.com/watch?v=A") != text_hash("youtube.com/watch?v=a")
+
+def test_tracking_params_and_fragment_are_dropped():
+    canonical = normalize_text("Mira youtube.com/watch?v=A")
+    assert normalize_text("MIRA https://www.YouTube.com/watch?v=A&utm_source=tg&fbclid=1#t=30") == canonical
+    assert normalize_text("mira http://youtube.com/watch?utm_medium=x&v=A") == canonical
+    assert normalize_text("example.com/a/?utm_campaign=spam") == "example.com/a"
+
+def test_text_outside_urls_is_folded():
+    assert normalize_text("GANA\u200b  Dinero\nYA") == "gana dinero ya"
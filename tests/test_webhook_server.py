@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core import webhook_server
+from core.webhook_server import SECRET_HEADER, WebhookServer
+
+UPDATE = {"update_id": 1, "message": {"message_id": 1, "date": 0, "chat": {"id": 5, "type": "private"}, "text": "hola"}}
+
+class _Request:
+    def __init__(self, headers, body=UPDATE):
+        self.headers = headers
+        self._body = body
+
+    async def json(self, loads=None):
+        return self._body
+
+class _App:
+    """Lo mínimo de telegram.ext.Application que usan el servidor y el ciclo de vida."""
+    def __init__(self, fail_post_init: bool = False):
+        self.bot = None
+        self.bot_data = {}
+        self.update_queue = asyncio.Queue()
+        self.update_processor = SimpleNamespace(pending=0)
+        self.running = False
+        self.calls = []
+        self.fail_post_init = fail_post_init
+
+    async def initialize(self):
+        self.calls.append("initialize")
+
+    async def post_init(self, app):
+        self.calls.append("post_init")
+        if self.fail_post_init:
+            raise RuntimeError("arranque fallido")
+
+    async def start(self):
+        self.calls.append("start")
+        self.running = True
+
+    async def stop(self):
+        self.calls.append("stop")
+        self.running = False
+
+    async def post_stop(self, app):
+        self.calls.append("post_stop")
+
+    async def shutdown(self):
+        self.calls.append("shutdown")
+
+    async def post_shutdown(self, app):
+        self.calls.append("post_shutdown")
+
+def _status(server, headers):
+    return asyncio.run(server._handle(_Request(headers))).status
+
+def test_rejects_everything_without_configured_secret():
+    server = WebhookServer(_App(), secret_token=None)
+    assert _status(server, {}) == 403
+    assert _status(server, {SECRET_HEADER: ""}) == 403
+
+def test_checks_secret_header():
+    app = _App()
+    server = WebhookServer(app, secret_token="s3cret")
+    assert _status(server, {SECRET_HEADER: "wrong"}) == 403
+    assert _status(server, {SECRET_HEADER: "s3cret"}) == 200
+    assert app.update_queue.qsize() == 1 and server.rejected_auth == 1
+
+def test_run_webhook_refuses_to_start_without_secret(monkeypatch):
+    monkeypatch.setattr(webhook_server, "WEBHOOK_SECRET", None)
+    app = _App()
+    webhook_server.run_webhook(app)
+    assert app.calls == []
+
+def test_failed_startup_still_runs_cleanup(monkeypatch):
+    monkeypatch.setattr(webhook_server, "WEBHOOK_SECRET", "s3cret")
+    app = _App(fail_post_init=True)
+    with pytest.raises(RuntimeError):
+        asyncio.run(webhook_server._serve(app))
+    assert app.calls == ["initialize", "post_init", "post_stop", "shutdown", "post_shutdown"]
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+import pytest
+
+from services.database_service import DatabasePool, WriteBehindBuffer
+
+async def _pool(tmp_path):
+    pool = DatabasePool(str(tmp_path / "velzar_test.db"), readers=1)
+    async with pool.writer() as db:
+        await db.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY, trust_score INTEGER DEFAULT 0)")
+        await db.execute(
+            "CREATE TABLE bans (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, chat_id INTEGER,"
+            " reason TEXT, admin_id INTEGER, timestamp TIMESTAMP)"
+        )
+        await db.executemany("INSERT INTO users (user_id, trust_score) VALUES (?, ?)", [(1, 5), (2, 0)])
+        await db.commit()
+    return pool
+
+async def _scores(pool):
+    async with pool.reader() as db:
+        async with db.execute("SELECT user_id, trust_score FROM users ORDER BY user_id") as cursor:
+            return {row[0]: row[1] for row in await cursor.fetchall()}
+
+class _BrokenPool:
+    """Pool cuyo escritor falla siempre (DB bloqueada)."""
+    @asynccontextmanager
+    async def writer(self):
+        raise RuntimeError("database is locked")
+        yield
+
+def test_changes_are_merged_and_drained_on_stop(tmp_path, caplog):
+    async def _run():
+        pool = await _pool(tmp_path)
+        buffer = WriteBehindBuffer(pool, flush_interval=60, max_pending=100)
+        await buffer.start()
+        for _ in range(3):
+            await buffer.add_trust_change(1, delta=1)
+        await buffer.add_trust_change(2, reset=True)
+        await buffer.add_ban(2, -100, "spam", 0)
+        assert await _scores(pool) == {1: 5, 2: 0}  # Nada escrito aún
+
+        await buffer.stop()
+        scores = await _scores(pool)
+        await pool.close()
+        return buffer, scores
+
+    with caplog.at_level(logging.INFO):
+        buffer, scores = asyncio.run(_run())
+    assert scores == {1: 8, 2: 0}
+    assert buffer.depth == 0
+    assert buffer.flush_count == 1 and buffer.rows_flushed == 3  # 3 incrementos -> un solo UPDATE
+    assert "Write-behind detenido" in caplog.text
+
+def test_failed_flush_requeues_without_losing_newer_changes():
+    async def _run():
+        buffer = WriteBehindBuffer(_BrokenPool(), flush_interval=60, max_pending=100)
+        buffer._task = object()  # Simula el bucle activo: no vuelca en cada cambio
+        await buffer.add_trust_change(1, delta=2)
+        await buffer.add_ban(1, -100, "spam", 0)
+        with pytest.raises(RuntimeError):
+            await buffer.flush()
+        await buffer.add_trust_change(1, delta=1)
+        return buffer
+
+    buffer = asyncio.run(_run())
+    assert buffer._trust == {1: (False, 3)}
+    assert len(buffer._bans) == 1
+    assert buffer.flush_errors == 1
+
+def test_background_flush_errors_are_logged(caplog):
+    async def _run():
+        buffer = WriteBehindBuffer(_BrokenPool(), flush_interval=60, max_pending=2)
+        buffer._task = object()
+        await buffer.add_trust_change(1, delta=1)
+        await buffer.add_trust_change(2, delta=1)  # Alcanza max_pending: volcado en segundo plano
+        task = buffer._pending_flush
+        await task
+        return buffer, task
+
+    with caplog.at_level(logging.ERROR):
+        buffer, task = asyncio.run(_run())
+    assert task.exception() is None  # Nada de "Task exception was never retrieved"
+    assert "Error volcando write-behind" in caplog.text
+    assert buffer.depth == 2 and buffer._pending_flush is None
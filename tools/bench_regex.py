@@ -0,0 +1,61 @@
+import os
+import random
+import re
+import sys
+import timeit
+
+# Permitir ejecutar desde la raíz o desde tools/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.rule_engine import RuleMatcher, Rule, DEFAULT_RULES
+
+# Patrones de la Capa 2 tal como estaban antes del motor de reglas (bucle + '.*')
+LEGACY_PATTERNS = [
+    r'(https?://)?(t\.me/\+|bit\.ly|tinyurl\.com|is\.gd)',
+    r'(inversión|ganancia|rentabilidad|profit|bitcoin|crypto|usdt).*(garantizada|segura|gratis|giveaway)',
+    r'(invest|make money|passive income|doubling)',
+    r'\b(est[uú]pido|idiota|pendejo|imb[eé]cil|mierda|puto|verga|chinga|zorra|malparido)\b',
+]
+
+WORDS = "hola grupo gracias mañana reunión proyecto código bitcoin crypto precio ganancia foto video".split()
+
+def synthetic_rules(count: int):
+    """Reglas de palabra clave adicionales para simular un pack grande."""
+    return [Rule(f"kw{i}", rf"\bspamword{i}\b") for i in range(count)]
+
+def sample_texts(n: int, length: int):
+    rng = random.Random(42)
+    return [" ".join(rng.choice(WORDS) for _ in range(length)) for _ in range(n)]
+
+def bench(extra_rules: int, texts, repeat: int = 3):
+    patterns = LEGACY_PATTERNS + [rule.pattern for rule in synthetic_rules(extra_rules)]
+    legacy = [re.compile(p, re.IGNORECASE) for p in patterns]
+    matcher = RuleMatcher(list(DEFAULT_RULES) + synthetic_rules(extra_rules))
+
+    def run_legacy():
+        for text in texts:
+            for pattern in legacy:
+                if pattern.search(text):
+                    break
+
+    def run_matcher():
+        for text in texts:
+            matcher.match(text)
+
+    t_legacy = min(timeit.repeat(run_legacy, number=1, repeat=repeat))
+    t_matcher = min(timeit.repeat(run_matcher, number=1, repeat=repeat))
+    return t_legacy, t_matcher
+
+def main():
+    print("⏱️ BENCHMARK CAPA 2 (Bucle de patrones vs Prefiltro de literales)")
+    print("----------------------------------------------------------------")
+    for length, label in ((20, "mensajes cortos"), (300, "captions largos")):
+        texts = sample_texts(200, length)
+        print(f"\n📝 200 {label} (~{length} palabras)")
+        for extra in (0, 50, 200):
+            t_legacy, t_matcher = bench(extra, texts)
+            total = len(DEFAULT_RULES) + extra
+            print(f"   {total:>4} reglas | bucle: {t_legacy * 1000:8.1f} ms | prefiltro: {t_matcher * 1000:8.1f} ms | x{t_legacy / t_matcher:5.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Telegram falso para pruebas locales del modo webhook.
+
+1. Servidor Bot API mínimo (responde OK a cualquier método):
+       python tools/fake_telegram.py api --port 8081
+   y arranca el bot con TELEGRAM_API_BASE=http://127.0.0.1:8081/bot
+
+2. Cliente que envía updates al webhook local (como haría Telegram):
+       python tools/fake_telegram.py send --url http://127.0.0.1:8443/telegram --secret X --count 500 --chats 20
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from aiohttp import ClientSession, web
+
+# --- SERVIDOR BOT API FALSO ---
+
+BOT_USER = {"id": 1000, "is_bot": True, "first_name": "Velzar", "username": "velzar_fake_bot",
+            "can_join_groups": True, "can_read_all_group_messages": True, "supports_inline_queries": False}
+
+_message_ids = itertools.count(1)
+
+async def _api_method(request: web.Request) -> web.Response:
+    method = request.match_info["method"]
+    try:
+        params = await request.post() if request.content_type != "application/json" else await request.json()
+    except Exception:
+        params = {}
+    request.app["calls"][method] = request.app["calls"].get(method, 0) + 1
+
+    if method == "getMe":
+        result = BOT_USER
+    elif method in ("sendMessage", "sendPhoto", "sendDocument", "editMessageText"):
+        chat_id = int(params.get("chat_id", 0) or 0)
+        result = {"message_id": next(_message_ids), "date": int(time.time()),
+                  "chat": {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private"},
+                  "from": BOT_USER, "text": params.get("text", "")}
+    elif method == "getChatAdministrators":
+        result = []
+    elif method == "getChatMember":
+        result = {"status": "member", "user": {"id": int(params.get("user_id", 0) or 0),
+                                               "is_bot": False, "first_name": "user"}}
+    elif method == "getChat":
+        chat_id = int(params.get("chat_id", 0) or 0)
+        result = {"id": chat_id, "type": "supergroup", "title": "Fake", "accent_color_id": 0,
+                  "max_reaction_count": 11, "permissions": {"can_send_messages": True}}
+    else:
+        result = True
+    return web.json_response({"ok": True, "result": result})
+
+async def _print_calls(app):
+    yield
+    print("📊 Llamadas recibidas:", dict(sorted(app["calls"].items())))
+
+def run_api(port: int):
+    app = web.Application()
+    app["calls"] = {}
+    app.router.add_post("/bot{token}/{method}", _api_method)
+    app.cleanup_ctx.append(_print_calls)
+    print(f"🤖 Bot API falsa en http://127.0.0.1:{port}/bot")
+    web.run_app(app, host="127.0.0.1", port=port, print=None)
+
+# --- CLIENTE DE UPDATES ---
+
+def make_update(update_id: int, chat_id: int, user_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": f"Chat {chat_id}"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": text,
+        },
+    }
+
+async def send_updates(url: str, secret: str, count: int, chats: int, concurrency: int, text: str):
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    statuses = {}
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _post(session, i):
+        chat_id = -1000000000000 - (i % chats)
+        payload = make_update(i + 1, chat_id, 5000 + (i % (chats * 3)), f"{text} #{i}")
+        async with semaphore:
+            started = time.perf_counter()
+            async with session.post(url, json=payload, headers=headers) as resp:
+                statuses[resp.status] = statuses.get(resp.status, 0) + 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    async with ClientSession() as session:
+        await asyncio.gather(*(_post(session, i) for i in range(count)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"📨 {count} updates en {elapsed:.2f}s ({count / elapsed:.0f}/s) | estados: {statuses} | "
+          f"p50 {p50:.1f} ms | p99 {p99:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Telegram falso para pruebas locales")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    api = sub.add_parser("api", help="Servidor Bot API falso")
+    api.add_argument("--port", type=int, default=8081)
+
+    send = sub.add_parser("send", help="Envía updates al webhook local")
+    send.add_argument("--url", default="http://127.0.0.1:8443/telegram")
+    send.add_argument("--secret", default="")
+    send.add_argument("--count", type=int, default=100)
+    send.add_argument("--chats", type=int, default=10)
+    send.add_argument("--concurrency", type=int, default=40)
+    send.add_argument("--text", default="hola a todos")
+
+    args = parser.parse_args()
+    if args.command == "api":
+        run_api(args.port)
+    else:
+        asyncio.run(send_updates(args.url, args.secret, args.count, args.chats, args.concurrency, args.text))
+
+if __name__ == "__main__":
+    main()
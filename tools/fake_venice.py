@@ -0,0 +1,79 @@
+"""
+Servidor Venice falso para pruebas locales (sin red ni costo de tokens).
+
+    python tools/fake_venice.py --port 8765 --ttft 0.8 --token-delay 0.05
+    VENICE_API_BASE=http://127.0.0.1:8765/api/v1 python main.py
+
+- chat/completions con "stream": true -> respuesta SSE palabra por palabra.
+- Clasificación (individual o en lote) -> JSON; los textos con "spam" salen HIGH.
+- Cualquier otra conversación -> respuesta fija completa.
+"""
+import argparse
+import asyncio
+import json
+import time
+from aiohttp import web
+
+REPLY = (
+    "Soy Velzar, el guardián de este grupo. Este es un mensaje de prueba generado por el "
+    "servidor falso para medir el tiempo hasta el primer token y las ediciones progresivas. "
+    "**Todo en orden.**"
+)
+
+def _classify(text: str) -> dict:
+    risk = "HIGH" if "spam" in text.lower() else "LOW"
+    return {"risk": risk, "category": "SPAM" if risk == "HIGH" else "SAFE", "reason": "Servidor falso"}
+
+def _completion_content(payload: dict) -> str:
+    system = payload["messages"][0]["content"] if payload.get("messages") else ""
+    user = payload["messages"][-1]["content"] if payload.get("messages") else ""
+    if "auditar" not in system:
+        return REPLY
+    try:
+        items = json.loads(user)
+        if isinstance(items, list):
+            return json.dumps([dict(index=item["index"], **_classify(item["text"])) for item in items])
+    except (json.JSONDecodeError, TypeError, KeyError):
+        pass
+    return json.dumps(_classify(user))
+
+async def chat_completions(request: web.Request) -> web.StreamResponse:
+    payload = await request.json()
+    config = request.app["config"]
+    request.app["stats"]["requests"] += 1
+
+    if not payload.get("stream"):
+        await asyncio.sleep(config.latency)
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": _completion_content(payload)}}]})
+
+    request.app["stats"]["streams"] += 1
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+
+    await asyncio.sleep(config.ttft)
+    words = REPLY.split(" ")
+    for i, word in enumerate(words):
+        chunk = {"choices": [{"index": 0, "delta": {"content": word + (" " if i < len(words) - 1 else "")}}]}
+        await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+        await asyncio.sleep(config.token_delay)
+    await response.write(b"data: [DONE]\n\n")
+    await response.write_eof()
+    return response
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Venice falso (JSON + SSE)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="Segundos por respuesta completa")
+    parser.add_argument("--ttft", type=float, default=0.5, help="Segundos hasta el primer token (streaming)")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="Segundos entre fragmentos")
+    args = parser.parse_args()
+
+    app = web.Application()
+    app["config"] = args
+    app["stats"] = {"requests": 0, "streams": 0, "started": time.time()}
+    app.router.add_post("/api/v1/chat/completions", chat_completions)
+    print(f"🧪 Venice falso en http://127.0.0.1:{args.port}/api/v1")
+    web.run_app(app, host="127.0.0.1", port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
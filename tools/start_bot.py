@@ -1,17 +1,25 @@
+import argparse
+import os
 import subprocess
 import sys
 import time
 
-def start_bot():
+def start_bot(mode=None):
     print("🚀 INICIANDO VELZAR SYSTEM...")
     print("----------------------------")
 
+    # Modo de ingesta: el argumento tiene prioridad sobre BOT_MODE del .env
+    env = os.environ.copy()
+    if mode:
+        env["BOT_MODE"] = mode
+        print(f"📡 Modo: {mode}")
+
     restart_count = 0
 
     while True:
         try:
             # Ejecutar main.py usando el mismo intérprete de Python
-            process = subprocess.Popen([sys.executable, "main.py"])
+            process = subprocess.Popen([sys.executable, "main.py"], env=env)
             process.wait() # Esperar a que termine o falle
 
             # Si llega aquí, el bot se cerró
@@ -33,4 +41,6 @@ def start_bot():
             break
 
 if __name__ == "__main__":
-    start_bot()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Lanzador seguro de Velzar")
+    parser.add_argument("--mode", choices=["polling", "webhook"], help="Modo de ingesta de updates")
+    start_bot(parser.parse_args().mode)
\ No newline at end of file
@@ -0,0 +1,110 @@
+import sys
+import time
+from collections import OrderedDict
+
+def estimate_size(value) -> int:
+    """Estimación aproximada (bytes) de un valor simple: dicts, listas, tuplas y escalares."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(v) for v in value)
+    return size
+
+class TTLCache:
+    """
+    Caché LRU en memoria con expiración por tiempo (TTL).
+    Limitada por número de entradas y por un techo aproximado de memoria:
+    al superar cualquiera de los dos se descartan las entradas menos usadas.
+    """
+    def __init__(self, max_entries: int = 1000, ttl: float = 300.0, max_bytes: int = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes  # 0 = sin techo de memoria
+        self._data = OrderedDict()  # {key: (expires_at, size, value)}
+        self.bytes_used = 0
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, touch=False) is not None
+
+    def get(self, key, default=None, touch: bool = True):
+        """Devuelve el valor si existe y no ha expirado (y lo marca como reciente)."""
+        entry = self._data.get(key)
+        if entry is None:
+            if touch:
+                self.misses += 1
+            return default
+
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            if touch:
+                self.misses += 1
+            return default
+
+        if touch:
+            self._data.move_to_end(key)
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        """Guarda un valor. `ttl` permite sobrescribir la expiración por defecto."""
+        if key in self._data:
+            self._remove(key)
+
+        size = sys.getsizeof(key) + estimate_size(value)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, size, value)
+        self.bytes_used += size
+        self._enforce_limits()
+
+    def pop(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        self._remove(key)
+        return entry[2]
+
+    def clear(self):
+        self._data.clear()
+        self.bytes_used = 0
+
+    def purge_expired(self) -> int:
+        """Elimina todas las entradas expiradas. Retorna cuántas se borraron."""
+        now = time.monotonic()
+        expired = [k for k, (expires_at, _, _) in self._data.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        return len(expired)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes_used,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self.bytes_used -= size
+
+    def _enforce_limits(self):
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes and self.bytes_used > self.max_bytes)
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.evictions += 1
@@ -0,0 +1,67 @@
+import asyncio
+
+class SingleFlight:
+    """
+    Coalesce llamadas concurrentes idénticas: mientras una petición con cierta clave
+    está en curso, las demás esperan su resultado en lugar de repetirla.
+    """
+    def __init__(self):
+        self._inflight = {}  # {key: Future}
+
+        # Métricas
+        self.executed = 0   # Llamadas que realmente se ejecutaron
+        self.coalesced = 0  # Llamadas que reutilizaron una en curso
+        self.takeovers = 0  # Seguidores que reintentaron tras cancelarse su líder
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key, factory):
+        """
+        Ejecuta `factory()` una sola vez por clave en curso y comparte el resultado.
+        Si la llamada líder se cancela, los seguidores no heredan la cancelación:
+        uno de ellos toma el relevo y vuelve a ejecutar `factory()`.
+        """
+        while True:
+            pending = self._inflight.get(key)
+            if pending is None:
+                return await self._lead(key, factory)
+
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                if not pending.cancelled() or (hasattr(task, "cancelling") and task.cancelling()):
+                    raise  # Cancelaron a este seguidor, no al líder
+                self.takeovers += 1
+
+    async def _lead(self, key, factory):
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.executed += 1
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Marcar como recuperada aunque nadie más espere
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.executed + self.coalesced
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "takeovers": self.takeovers,
+            "inflight": self.inflight,
+            "coalesce_rate": round(self.coalesced / total, 3) if total else 0.0,
+        }
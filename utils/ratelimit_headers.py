@@ -0,0 +1,21 @@
+import time
+
+# --- CABECERAS DE LÍMITE (Retry-After, x-ratelimit-*) ---
+
+def parse_int(value):
+    """Valor entero de una cabecera (acepta "10" o "10.0"); None si no es numérico."""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def reset_seconds(value) -> float:
+    """Cabecera de reinicio: segundos restantes o marca de tiempo Unix (ambos formatos en uso)."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if number > 1e9:
+        number = number / 1000 if number > 1e12 else number  # Epoch en ms o s
+        return max(0.0, number - time.time())
+    return max(0.0, number)